@@ -17,5 +17,26 @@ COL_ANALYSIS_AI_IMAGE = "analysis_ai_image"
 COL_ANALYSIS_MANIPULATION = "analysis_manipulation"
 COL_ANALYSIS_SOURCES = "analysis_sources"
 COL_CRON_TASKS = "cron_tasks"
+COL_DEAD_LETTER_TASKS = "dead_letter_tasks"
+COL_TASK_FAIRNESS = "task_fairness"
+COL_TASK_BATCHES = "task_batches"
 COL_REPORTS_NLP = "reports_nlp"
-COL_REPORTS_IMAGE = "reports_image"
\ No newline at end of file
+COL_REPORTS_IMAGE = "reports_image"
+COL_ANALYSIS_CACHE = "analysis_cache"
+COL_CACHE_STATS = "cache_stats"
+COL_MODEL_INFO = "model_info"
+COL_IMAGE_CACHE = "image_cache"
+
+AI_TEXT_INFERENCE_TIERS = ("fast", "standard", "thorough")
+AI_TEXT_DEFAULT_TIER = "standard"
+
+ANALYSIS_CACHE_SIZE = int(os.getenv("ANALYSIS_CACHE_SIZE", "256"))
+ANALYSIS_CACHE_TTL_SEC = int(os.getenv("ANALYSIS_CACHE_TTL_SEC", str(7 * 24 * 3600)))
+
+TASK_WAIT_MAX_SEC = float(os.getenv("TASK_WAIT_MAX_SEC", "30"))
+TASK_EVENTS_MAX_SEC = float(os.getenv("TASK_EVENTS_MAX_SEC", "300"))
+TASK_EVENTS_KEEPALIVE_SEC = float(os.getenv("TASK_EVENTS_KEEPALIVE_SEC", "15"))
+TASK_WATCH_POLL_INTERVAL_SEC = float(os.getenv("TASK_WATCH_POLL_INTERVAL_SEC", "0.5"))
+
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+BATCH_MAX_FILE_BYTES = int(os.getenv("BATCH_MAX_FILE_BYTES", str(20 * 1024 * 1024)))
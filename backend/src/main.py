@@ -1,7 +1,7 @@
 from flask import Flask, Blueprint
 from flask_cors import CORS
 
-from routes import user_bp, admin_bp, social_bp, image_bp, manipulation_bp, find_sources_bp, ai_text_bp
+from routes import user_bp, admin_bp, social_bp, image_bp, manipulation_bp, find_sources_bp, ai_text_bp, tasks_bp, batch_bp
 from common.python import db
 
 import config
@@ -24,6 +24,8 @@ register_route("/analysis/find_sources", find_sources_bp)
 register_route("/analysis/ai", ai_text_bp)
 register_route("/admin", admin_bp)
 register_route("/social", social_bp)
+register_route("/tasks", tasks_bp)
+register_route("/batch", batch_bp)
 
 @app.route("/")
 def index():
@@ -5,3 +5,5 @@ from .find_sources import find_sources_bp
 from .ai_text import ai_text_bp
 from .admin import admin_bp
 from .social import social_bp
+from .tasks import tasks_bp
+from .batch import batch_bp
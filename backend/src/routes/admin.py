@@ -1,8 +1,13 @@
 from datetime import datetime
 from flask import Blueprint, jsonify, request
+from werkzeug.exceptions import BadRequest
+from bson import ObjectId
+from bson.errors import InvalidId
 from keycloak_client import role_required, get_keycloak_admin
 from common.python import db
-from config import DB_NAME, COL_ANALYSIS_AI_TEXT, COL_ANALYSIS_AI_IMAGE, COL_ANALYSIS_MANIPULATION, COL_ANALYSIS_SOURCES, COL_USERS, COL_REPORTS_IMAGE, COL_REPORTS_NLP
+from common.python.task_queue import PRIORITY_INTERACTIVE
+from utils import task_queue
+from config import DB_NAME, COL_ANALYSIS_AI_TEXT, COL_ANALYSIS_AI_IMAGE, COL_ANALYSIS_MANIPULATION, COL_ANALYSIS_SOURCES, COL_USERS, COL_REPORTS_IMAGE, COL_REPORTS_NLP, COL_CACHE_STATS, COL_CRON_TASKS, COL_DEAD_LETTER_TASKS
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -20,6 +25,113 @@ def get_system_stats():
         "status": "Healthy"
     })
 
+@admin_bp.route('/cache/stats', methods=['GET'])
+@role_required('admin')
+def get_cache_stats():
+    database = db.get_client().get_database(DB_NAME)
+    stats = {}
+
+    for doc in database[COL_CACHE_STATS].find():
+        # hits_* fields depend on the cache (memory/db for text, exact/perceptual for images)
+        hit_counters = {key: value for key, value in doc.items() if key.startswith("hits_")}
+        hits = sum(hit_counters.values())
+        misses = doc.get("misses", 0)
+        stats[doc["_id"]] = {
+            **hit_counters,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None,
+            # Entries dropped by size-based eviction (caches with a max entry count, e.g. llm)
+            "evicted": doc.get("evicted", 0),
+            "updated_at": doc.get("updatedAt"),
+        }
+
+    return jsonify(stats)
+
+def parse_dead_letter_id(task_id):
+    try:
+        return ObjectId(task_id)
+    except (InvalidId, TypeError):
+        raise BadRequest("Invalid task id.")
+
+def serialize_dead_letter(doc, with_payload=False):
+    result = {
+        "id": str(doc["_id"]),
+        "name": doc.get("name"),
+        "attempts": doc.get("attempts"),
+        "reason": doc.get("reason"),
+        "last_error": doc.get("lastError"),
+        "created_at": doc.get("createdAt"),
+        "failed_at": doc.get("failedAt"),
+    }
+    if with_payload:
+        result["payload"] = {key: str(value) if isinstance(value, ObjectId) else value for key, value in (doc.get("payload") or {}).items()}
+    return result
+
+@admin_bp.route('/dead_letter', methods=['GET'])
+@role_required('admin')
+def get_dead_letter_tasks():
+    database = db.get_client().get_database(DB_NAME)
+    query = {"name": request.args["name"]} if request.args.get("name") else {}
+    limit = min(request.args.get("limit", 100, type=int), 1000)
+
+    cursor = database[COL_DEAD_LETTER_TASKS].find(query, {"payload": 0}).sort("failedAt", -1).limit(limit)
+    return jsonify([serialize_dead_letter(doc) for doc in cursor])
+
+@admin_bp.route('/dead_letter/<task_id>', methods=['GET'])
+@role_required('admin')
+def get_dead_letter_task(task_id):
+    database = db.get_client().get_database(DB_NAME)
+    doc = database[COL_DEAD_LETTER_TASKS].find_one({"_id": parse_dead_letter_id(task_id)})
+
+    if doc:
+        return jsonify(serialize_dead_letter(doc, with_payload=True))
+    return jsonify({"error": "Task not found"}), 404
+
+@admin_bp.route('/dead_letter/<task_id>/requeue', methods=['POST'])
+@role_required('admin')
+def requeue_dead_letter_task(task_id):
+    database = db.get_client().get_database(DB_NAME)
+    task_id = parse_dead_letter_id(task_id)
+    doc = database[COL_DEAD_LETTER_TASKS].find_one({"_id": task_id})
+
+    if not doc:
+        return jsonify({"error": "Task not found"}), 404
+
+    task = database[COL_CRON_TASKS].find_one({"_id": task_id}, {"status": 1})
+    if task and task.get("status") != "error":
+        return jsonify({"error": f"Task is already {task.get('status')}"}), 409
+
+    # Same id, so clients still waiting on the task see it finish; attempts start from scratch
+    requeued = {
+        "name": doc.get("name"),
+        "payload": doc.get("payload"),
+        "status": "scheduled",
+        "userId": doc.get("userId"),
+        "priority": doc.get("priority", PRIORITY_INTERACTIVE),
+        "fairSeq": task_queue.next_fair_seq(database, doc.get("userId")),
+        "createdAt": doc.get("createdAt") or datetime.utcnow(),
+        "requeuedAt": datetime.utcnow(),
+    }
+    # Still counted in its batch's status
+    for field in ("batchId", "batchIndex", "batchItem"):
+        if field in doc:
+            requeued[field] = doc[field]
+
+    database[COL_CRON_TASKS].replace_one({"_id": task_id}, requeued, upsert=True)
+    database[COL_DEAD_LETTER_TASKS].delete_one({"_id": task_id})
+
+    return jsonify({"message": "Task requeued", "taskId": str(task_id)}), 200
+
+@admin_bp.route('/dead_letter/<task_id>', methods=['DELETE'])
+@role_required('admin')
+def delete_dead_letter_task(task_id):
+    database = db.get_client().get_database(DB_NAME)
+    result = database[COL_DEAD_LETTER_TASKS].delete_one({"_id": parse_dead_letter_id(task_id)})
+
+    if result.deleted_count:
+        return jsonify({"message": "Task discarded"}), 200
+    return jsonify({"error": "Task not found"}), 404
+
 @admin_bp.route('/users', methods=['GET'])
 @role_required('admin')
 def get_all_users():
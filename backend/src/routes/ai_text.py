@@ -1,14 +1,68 @@
+from datetime import datetime
+
 from flask import Blueprint, jsonify, g, current_app
 from werkzeug.exceptions import BadRequest, InternalServerError
 from bson import ObjectId
 
 from keycloak_client import require_auth, role_required
 from common.python import db
-from config import DB_NAME, COL_CRON_TASKS, COL_ANALYSIS_AI_TEXT, COL_USERS
-from utils import extract_request_text
+from common.python.analysis_cache import AI_TEXT_MODEL_INFO_ID, ResultCache, ai_text_cache_key
+from config import (
+    DB_NAME, COL_CRON_TASKS, COL_ANALYSIS_AI_TEXT, COL_USERS, COL_ANALYSIS_CACHE, COL_CACHE_STATS, COL_MODEL_INFO,
+    AI_TEXT_INFERENCE_TIERS, AI_TEXT_DEFAULT_TIER, ANALYSIS_CACHE_SIZE, ANALYSIS_CACHE_TTL_SEC
+)
+from common.python.task_queue import PRIORITY_INTERACTIVE
+from utils import extract_request_text, extract_request_option, task_queue
 
 ai_text_bp = Blueprint("ai", __name__)
 
+text_result_cache = ResultCache(
+    "ai_text",
+    COL_ANALYSIS_CACHE,
+    COL_CACHE_STATS,
+    maxsize=ANALYSIS_CACHE_SIZE,
+    ttl_seconds=ANALYSIS_CACHE_TTL_SEC,
+)
+
+
+def complete_from_cache(database, text, tier, user_id):
+    """Returns the id of an already completed task if this exact analysis is cached, otherwise None."""
+    # Published by the cron worker when it loads the model; until then there is nothing to match against
+    model_info = database[COL_MODEL_INFO].find_one({"_id": AI_TEXT_MODEL_INFO_ID})
+
+    if not model_info:
+        return None
+
+    cached = text_result_cache.get(database, ai_text_cache_key(text, tier, model_info))
+
+    if cached is None:
+        return None
+
+    now = datetime.utcnow()
+    analysis = database[COL_ANALYSIS_AI_TEXT].insert_one({
+        **cached,
+        "user_id": user_id,
+        "timestamp": now,
+        "action": "text_analysis",
+        "cache_hit": True,
+    })
+
+    result = database[COL_CRON_TASKS].insert_one({
+        "name": "analyze",
+        "payload": {
+            "text": text,
+            "user_id": user_id,
+            "tier": tier,
+        },
+        "status": "success",
+        "createdAt": now,
+        "completedAt": now,
+        "cacheHit": True,
+        "return_value": analysis.inserted_id,
+    })
+
+    return result.inserted_id
+
 @ai_text_bp.route("/", methods=["POST"])
 @require_auth
 def create_analysis():
@@ -17,18 +71,37 @@ def create_analysis():
     if not text:
         raise BadRequest("No text or file provided for analysis.")
 
-    result = db.get_database(DB_NAME)[COL_CRON_TASKS].insert_one({
-        "name": "analyze",
-        "payload": {
+    tier = extract_request_option("tier", AI_TEXT_DEFAULT_TIER)
+
+    if tier not in AI_TEXT_INFERENCE_TIERS:
+        raise BadRequest(f"Unknown inference tier '{tier}'. Expected one of: {', '.join(AI_TEXT_INFERENCE_TIERS)}.")
+
+    database = db.get_database(DB_NAME)
+    cached_task_id = complete_from_cache(database, text, tier, g.user.get("sub"))
+
+    if cached_task_id is not None:
+        return jsonify({
+            "success": True,
+            "taskId": str(cached_task_id),
+            "cached": True
+        })
+
+    task_id = task_queue.schedule(
+        database,
+        "analyze",
+        {
             "text": text,
             "user_id": g.user.get("sub"),
+            "tier": tier,
         },
-        "status": "scheduled"
-    })
+        user_id=g.user.get("sub"),
+        priority=PRIORITY_INTERACTIVE,
+    )
 
     return jsonify({
         "success": True,
-        "taskId": str(result.inserted_id)
+        "taskId": str(task_id),
+        "cached": False
     })
 
 
@@ -66,6 +139,7 @@ def get_analysis(task_id):
             "ai_probability": analysis_data.get("ai_probability"),
             "segments": analysis_data.get("segments"),
             "overall": analysis_data.get("overall"),
+            "inference_tier": analysis_data.get("inference_tier"),
             "user_id": analysis_data.get("user_id")
         }
     })
@@ -83,7 +157,7 @@ def get_ai_predictions():
         database = db.get_database(DB_NAME)
         collection = database[COL_ANALYSIS_AI_TEXT]
 
-        cursor = collection.find({"user_id": user_id}).sort("_id", -1)
+        cursor = collection.find({"user_id": user_id, "partial": {"$ne": True}}).sort("_id", -1)
 
         results = [
             {
@@ -129,7 +203,7 @@ def get_ai_predictions_for_user(user_id):
         database = db.get_database(DB_NAME)
         collection = database[COL_ANALYSIS_AI_TEXT]
 
-        cursor = collection.find({"user_id": user_id}).sort("_id", -1)
+        cursor = collection.find({"user_id": user_id, "partial": {"$ne": True}}).sort("_id", -1)
 
         results = [
             {
@@ -159,7 +233,7 @@ def get_ai_predictions_all_users():
         collection = database[COL_ANALYSIS_AI_TEXT]
         users_map = {u.get("keycloakId"): u.get("username") for u in database[COL_USERS].find({"keycloakId": {"$exists": True}})}
 
-        cursor = collection.find().sort("_id", -1)
+        cursor = collection.find({"partial": {"$ne": True}}).sort("_id", -1)
 
         results = []
         for doc in cursor:
@@ -0,0 +1,304 @@
+import io
+import mimetypes
+import shutil
+import tempfile
+import zipfile
+from datetime import datetime
+from pathlib import Path
+
+from flask import Blueprint, jsonify, request, g, current_app
+from werkzeug.exceptions import BadRequest, NotFound
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from keycloak_client import require_auth
+from common.python import db
+from common.python.blob_store import store_blob, delete_blob
+from common.python.task_queue import PRIORITY_BULK
+from utils import extract_text, extract_request_option, task_queue
+from config import (
+    DB_NAME, COL_CRON_TASKS, COL_TASK_BATCHES, AI_TEXT_INFERENCE_TIERS, AI_TEXT_DEFAULT_TIER, BATCH_MAX_ITEMS,
+    BATCH_MAX_FILE_BYTES
+)
+
+batch_bp = Blueprint("batch", __name__)
+
+# Batch type -> cron task analyzing each item
+BATCH_TASKS = {
+    "ai": "analyze",
+    "manipulation": "analyze_manipulation",
+    "image": "analyze_image",
+}
+
+TASK_STATUSES = ("scheduled", "in_progress", "success", "error")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp", ".gif", ".tif", ".tiff")
+
+
+def parse_batch_id(batch_id):
+    try:
+        return ObjectId(batch_id)
+    except (InvalidId, TypeError):
+        raise BadRequest("Invalid batch id.")
+
+
+def stream_size(stream):
+    position = stream.tell()
+    stream.seek(0, io.SEEK_END)
+    size = stream.tell()
+    stream.seek(position)
+    return size
+
+
+def iter_uploads():
+    """
+    Yields (filename, stream, size) for every file sent in the ``files`` field, unpacking zip archives.
+    Members of an archive over BATCH_MAX_FILE_BYTES are yielded without a stream, so they can be reported.
+    """
+    for file in request.files.getlist("files"):
+        if file.filename == "":
+            continue
+
+        if Path(file.filename).suffix.lower() != ".zip":
+            yield file.filename, file.stream, stream_size(file.stream)
+            continue
+
+        # zipfile needs a real seekable file, which werkzeug's spooled upload isn't on Python 3.10
+        spooled = tempfile.TemporaryFile()
+        shutil.copyfileobj(file.stream, spooled)
+        spooled.seek(0)
+
+        try:
+            archive = zipfile.ZipFile(spooled)
+        except zipfile.BadZipFile:
+            spooled.close()
+            raise BadRequest(f"'{file.filename}' is not a valid zip archive.")
+
+        with spooled, archive:
+            for info in archive.infolist():
+                name = info.filename
+                if info.is_dir() or name.startswith("__MACOSX/") or Path(name).name.startswith("."):
+                    continue
+
+                if info.file_size > BATCH_MAX_FILE_BYTES:
+                    yield name, None, info.file_size
+                    continue
+
+                # Reading is capped at the declared size, so a forged header can't inflate past the limit
+                with archive.open(info) as member:
+                    yield name, io.BytesIO(member.read()), info.file_size
+
+
+def check_batch_size(count):
+    if count > BATCH_MAX_ITEMS:
+        raise BadRequest(f"Too many items in one batch (max {BATCH_MAX_ITEMS}).")
+
+
+def collect_texts():
+    """Returns ([(label, text)], rejected items) from a JSON ``texts`` list and/or uploaded files."""
+    items = []
+    rejected = []
+
+    json_payload = request.get_json(silent=True) or {}
+    texts = json_payload.get("texts")
+
+    if texts is not None:
+        if not isinstance(texts, list):
+            raise BadRequest("'texts' must be a list of strings.")
+
+        check_batch_size(len(texts))
+
+        for index, text in enumerate(texts):
+            text = str(text or "").strip()
+            if text:
+                items.append((None, text))
+            else:
+                rejected.append({"item": index, "reason": "Empty text."})
+
+    for filename, stream, size in iter_uploads():
+        if size > BATCH_MAX_FILE_BYTES:
+            rejected.append({"item": filename, "reason": "File is too large."})
+            continue
+
+        try:
+            text = extract_text(stream, filename=filename).strip()
+        except ValueError as e:
+            rejected.append({"item": filename, "reason": str(e)})
+            continue
+        except Exception as e:
+            current_app.logger.exception(f"Text extraction failed for {filename}: {e}")
+            rejected.append({"item": filename, "reason": "Failed to extract text."})
+            continue
+
+        if not text:
+            rejected.append({"item": filename, "reason": "No text found."})
+            continue
+
+        items.append((filename, text))
+        check_batch_size(len(items))
+
+    return items, rejected
+
+
+def collect_images(database):
+    """
+    Streams every uploaded image to GridFS, as the single image endpoint does. Returns
+    ([(label, task id, blob id, sha256)], rejected items).
+    """
+    items = []
+    rejected = []
+
+    try:
+        for filename, stream, size in iter_uploads():
+            if size > BATCH_MAX_FILE_BYTES:
+                rejected.append({"item": filename, "reason": "File is too large."})
+                continue
+
+            if Path(filename).suffix.lower() not in IMAGE_EXTENSIONS:
+                rejected.append({"item": filename, "reason": "Unsupported file type."})
+                continue
+
+            check_batch_size(len(items) + 1)
+
+            task_id = ObjectId()
+            blob_id, sha256 = store_blob(
+                database,
+                stream,
+                filename=filename,
+                task_id=task_id,
+                metadata={"content_type": mimetypes.guess_type(filename)[0]},
+            )
+            items.append((filename, task_id, blob_id, sha256))
+    except BadRequest:
+        for _, _, blob_id, _ in items:
+            delete_blob(database, blob_id)
+        raise
+
+    return items, rejected
+
+
+@batch_bp.route("/<batch_type>", methods=["POST"])
+@require_auth
+def create_batch(batch_type):
+    """
+    Submits many texts or files as one batch: a JSON list of ``texts``, several ``files`` (multipart),
+    or zip archives of them. All tasks are inserted at once under one batch id, at bulk priority.
+    """
+    task_name = BATCH_TASKS.get(batch_type)
+
+    if task_name is None:
+        raise NotFound(f"Unknown batch type '{batch_type}'. Expected one of: {', '.join(BATCH_TASKS)}.")
+
+    tier = extract_request_option("tier", AI_TEXT_DEFAULT_TIER)
+
+    if batch_type == "ai" and tier not in AI_TEXT_INFERENCE_TIERS:
+        raise BadRequest(f"Unknown inference tier '{tier}'. Expected one of: {', '.join(AI_TEXT_INFERENCE_TIERS)}.")
+
+    user_id = g.user.get("sub")
+    database = db.get_database(DB_NAME)
+    task_ids = None
+
+    if batch_type == "image":
+        items, rejected = collect_images(database)
+        labels = [filename for filename, _, _, _ in items]
+        task_ids = [task_id for _, task_id, _, _ in items]
+        payloads = [
+            {"filename": filename, "blob_id": blob_id, "sha256": sha256, "user_id": user_id}
+            for filename, _, blob_id, sha256 in items
+        ]
+    else:
+        items, rejected = collect_texts()
+        labels = [label for label, _ in items]
+        payloads = [{"text": text, "user_id": user_id} for _, text in items]
+
+        if batch_type == "ai":
+            for payload in payloads:
+                payload["tier"] = tier
+
+    if not payloads:
+        return jsonify({
+            "success": False,
+            "message": "No texts or files provided for analysis.",
+            "rejected": rejected
+        }), 400
+
+    batch_id = database[COL_TASK_BATCHES].insert_one({
+        "type": batch_type,
+        "name": task_name,
+        "userId": user_id,
+        "total": len(payloads),
+        "rejected": rejected,
+        "createdAt": datetime.utcnow(),
+    }).inserted_id
+
+    task_ids = task_queue.schedule_many(
+        database,
+        task_name,
+        payloads,
+        user_id=user_id,
+        priority=PRIORITY_BULK,
+        batch_id=batch_id,
+        task_ids=task_ids,
+        labels=labels,
+    )
+
+    return jsonify({
+        "success": True,
+        "batchId": str(batch_id),
+        "total": len(task_ids),
+        "taskIds": [str(task_id) for task_id in task_ids],
+        "rejected": rejected
+    })
+
+
+@batch_bp.route("/<batch_id>", methods=["GET"])
+@require_auth
+def get_batch(batch_id):
+    """Aggregated progress of a batch; with ``?tasks=true`` also the status of every task in it."""
+    batch_id = parse_batch_id(batch_id)
+    database = db.get_database(DB_NAME)
+    batch = database[COL_TASK_BATCHES].find_one({"_id": batch_id})
+
+    roles = g.user.get("realm_access", {}).get("roles", [])
+    if not batch or (batch.get("userId") != g.user.get("sub") and "admin" not in roles):
+        raise NotFound("Batch not found.")
+
+    counts = {status: 0 for status in TASK_STATUSES}
+    for doc in database[COL_CRON_TASKS].aggregate([
+        {"$match": {"batchId": batch_id}},
+        {"$group": {"_id": "$status", "count": {"$sum": 1}}},
+    ]):
+        counts[doc["_id"]] = doc["count"]
+
+    total = batch.get("total", 0)
+    finished = counts["success"] + counts["error"]
+
+    response = {
+        "success": True,
+        "batchId": str(batch_id),
+        "type": batch.get("type"),
+        "total": total,
+        "counts": counts,
+        "completed": finished >= total,
+        "percent": round(100 * finished / total, 1) if total else 100.0,
+        "rejected": batch.get("rejected", []),
+        "createdAt": batch.get("createdAt"),
+    }
+
+    if request.args.get("tasks", "").lower() in ("1", "true"):
+        cursor = database[COL_CRON_TASKS].find(
+            {"batchId": batch_id},
+            {"status": 1, "batchIndex": 1, "batchItem": 1, "return_value": 1},
+        ).sort("batchIndex", 1)
+
+        response["tasks"] = [
+            {
+                "taskId": str(task["_id"]),
+                "index": task.get("batchIndex"),
+                "item": task.get("batchItem"),
+                "status": task.get("status"),
+                "resultId": str(task["return_value"]) if task.get("return_value") is not None else None,
+            }
+            for task in cursor
+        ]
+
+    return jsonify(response)
@@ -5,7 +5,8 @@ from bson import ObjectId
 from keycloak_client import require_auth, role_required
 from common.python import db
 from config import DB_NAME, COL_CRON_TASKS, COL_ANALYSIS_SOURCES
-from utils import extract_request_text
+from common.python.task_queue import PRIORITY_INTERACTIVE
+from utils import extract_request_text, extract_request_option, task_queue
 
 find_sources_bp = Blueprint("find_sources", __name__)
 
@@ -17,18 +18,24 @@ def create_find_sources_analisys():
     if not text:
         raise BadRequest("No text or file provided for analysis.")
 
-    result = db.get_database(DB_NAME)[COL_CRON_TASKS].insert_one({
-        "name": "find_sources",
-        "payload": {
+    # Asks the LLM again even if the same text was analyzed before
+    bypass_cache = extract_request_option("bypass_cache", "false").lower() in ("1", "true", "yes")
+
+    task_id = task_queue.schedule(
+        db.get_database(DB_NAME),
+        "find_sources",
+        {
             "text": text,
             "user_id": g.user.get("sub"),
+            "bypass_cache": bypass_cache,
         },
-        "status": "scheduled"
-    })
+        user_id=g.user.get("sub"),
+        priority=PRIORITY_INTERACTIVE,
+    )
 
     return jsonify({
         "success": True,
-        "taskId": str(result.inserted_id)
+        "taskId": str(task_id)
     })
 
 
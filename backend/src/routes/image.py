@@ -1,14 +1,64 @@
 from flask import Blueprint, jsonify, request, current_app, g
 from werkzeug.exceptions import BadRequest, InternalServerError
 from bson import ObjectId
-import base64
+from datetime import datetime
 
 from common.python import db
+from common.python.blob_store import store_blob, delete_blob
+from common.python.image_cache import AI_IMAGE_MODEL_INFO_ID, ImageResultCache
+from common.python.task_queue import PRIORITY_INTERACTIVE
 from keycloak_client import require_auth, require_auth_optional, role_required
-from config import DB_NAME, COL_CRON_TASKS, COL_ANALYSIS_AI_IMAGE, COL_USERS
+from utils import task_queue
+from config import (
+    DB_NAME, COL_CRON_TASKS, COL_ANALYSIS_AI_IMAGE, COL_USERS, COL_IMAGE_CACHE, COL_CACHE_STATS, COL_MODEL_INFO,
+    ANALYSIS_CACHE_TTL_SEC
+)
 
 image_bp = Blueprint("image", __name__)
 
+image_result_cache = ImageResultCache(COL_IMAGE_CACHE, COL_CACHE_STATS, ttl_seconds=ANALYSIS_CACHE_TTL_SEC)
+
+
+def complete_from_cache(database, sha256, filename, user_id):
+    """
+    Returns the id of an already completed task if these exact bytes were analyzed by the current model,
+    otherwise None. Re-encoded copies (perceptual hash) are matched later by the cron worker.
+    """
+    model_info = database[COL_MODEL_INFO].find_one({"_id": AI_IMAGE_MODEL_INFO_ID})
+
+    if not model_info:
+        return None
+
+    cached = image_result_cache.find_exact(database, model_info["identity"], sha256)
+
+    if cached is None:
+        return None
+
+    now = datetime.utcnow()
+    analysis = database[COL_ANALYSIS_AI_IMAGE].insert_one({
+        **cached,
+        "filename": filename,
+        "user_id": user_id,
+        "timestamp": now,
+        "action": "image_analysis",
+        "cache_hit": True,
+    })
+
+    result = database[COL_CRON_TASKS].insert_one({
+        "name": "analyze_image",
+        "payload": {
+            "filename": filename,
+            "user_id": user_id,
+        },
+        "status": "success",
+        "createdAt": now,
+        "completedAt": now,
+        "cacheHit": True,
+        "return_value": analysis.inserted_id,
+    })
+
+    return result.inserted_id
+
 @image_bp.route("/detect", methods=["POST"])
 @require_auth_optional
 def detect_ai_image():
@@ -21,23 +71,48 @@ def detect_ai_image():
         raise BadRequest("No file selected for uploading.")
     
     try:
-        contents = file.read()
-        encoded_image = base64.b64encode(contents).decode("utf-8")
         user_id = g.user.get("sub") if g.user else None
+        database = db.get_database(DB_NAME)
 
-        result = db.get_database(DB_NAME)[COL_CRON_TASKS].insert_one({
-            "name": "analyze_image",
-            "payload": {
+        # The upload is streamed to GridFS and only referenced from the task, so large images
+        # don't bloat cron_tasks; the id is allocated up front to tag the blob with its task
+        task_id = ObjectId()
+        blob_id, sha256 = store_blob(
+            database,
+            file.stream,
+            filename=file.filename,
+            task_id=task_id,
+            metadata={"content_type": file.mimetype},
+        )
+
+        cached_task_id = complete_from_cache(database, sha256, file.filename, user_id)
+
+        if cached_task_id is not None:
+            delete_blob(database, blob_id)
+            return jsonify({
+                "success": True,
+                "taskId": str(cached_task_id),
+                "cached": True
+            })
+
+        task_queue.schedule(
+            database,
+            "analyze_image",
+            {
                 "filename": file.filename,
-                "image_base64": encoded_image,
+                "blob_id": blob_id,
+                "sha256": sha256,
                 "user_id": user_id,
             },
-            "status": "scheduled"
-        })
+            user_id=user_id,
+            priority=PRIORITY_INTERACTIVE,
+            task_id=task_id,
+        )
 
         return jsonify({
             "success": True,
-            "taskId": str(result.inserted_id)
+            "taskId": str(task_id),
+            "cached": False
         })
     except Exception as e:
         current_app.logger.exception(f"Error queuing image for analysis: {str(e)}")
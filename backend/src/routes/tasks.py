@@ -0,0 +1,210 @@
+import time
+
+from flask import Blueprint, Response, g, jsonify, request, current_app, stream_with_context
+from werkzeug.exceptions import BadRequest, NotFound
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from common.python import db
+from keycloak_client import require_auth_optional
+from task_watcher import TaskWatcher
+from config import (
+    DB_NAME, COL_CRON_TASKS, COL_ANALYSIS_AI_TEXT, COL_ANALYSIS_AI_IMAGE, COL_ANALYSIS_MANIPULATION,
+    COL_ANALYSIS_SOURCES, TASK_WAIT_MAX_SEC, TASK_EVENTS_MAX_SEC, TASK_EVENTS_KEEPALIVE_SEC,
+    TASK_WATCH_POLL_INTERVAL_SEC
+)
+
+tasks_bp = Blueprint("tasks", __name__)
+
+# Where each cron job stores the document its task's return_value points to
+ANALYSIS_COLLECTIONS = {
+    "analyze": COL_ANALYSIS_AI_TEXT,
+    "analyze_image": COL_ANALYSIS_AI_IMAGE,
+    "analyze_manipulation": COL_ANALYSIS_MANIPULATION,
+    "find_sources": COL_ANALYSIS_SOURCES,
+}
+
+FINISHED_STATUSES = ("success", "error")
+
+task_watcher = TaskWatcher(
+    lambda: db.get_database(DB_NAME)[COL_CRON_TASKS],
+    poll_interval=TASK_WATCH_POLL_INTERVAL_SEC,
+)
+
+
+def parse_task_id(task_id):
+    try:
+        return ObjectId(task_id)
+    except (InvalidId, TypeError):
+        raise BadRequest("Invalid task id.")
+
+
+def serialize_value(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, dict):
+        return {key: serialize_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [serialize_value(item) for item in value]
+    return value
+
+
+def load_task(database, task_id):
+    task = database[COL_CRON_TASKS].find_one({"_id": task_id}, {"payload": 0})
+
+    if not task:
+        raise NotFound("Task not found.")
+
+    return task
+
+
+def authorize_task(database, task_id):
+    """
+    Only the user who created a task (or an admin) may read it. Tasks created without logging in
+    (anonymous image detection) stay readable by anyone who has their id. Other users get a 404,
+    so task ids can't be probed.
+    """
+    task = database[COL_CRON_TASKS].find_one({"_id": task_id}, {"userId": 1, "payload.user_id": 1})
+
+    if not task:
+        raise NotFound("Task not found.")
+
+    owner = task.get("userId") or (task.get("payload") or {}).get("user_id")
+    if owner is None:
+        return
+
+    user = g.user or {}
+    roles = user.get("realm_access", {}).get("roles", [])
+    if owner != user.get("sub") and "admin" not in roles:
+        raise NotFound("Task not found.")
+
+
+def build_task_state(database, task):
+    status = task.get("status")
+    state = {
+        "success": True,
+        "taskId": str(task["_id"]),
+        "name": task.get("name"),
+        "status": status,
+        "completed": status in FINISHED_STATUSES,
+    }
+
+    if status == "error":
+        state["message"] = "Task failed."
+
+    if status == "scheduled" and task.get("notBefore") is not None:
+        # Failed with a transient error, waiting for its backoff before the next attempt
+        state["retryAt"] = task["notBefore"]
+        state["attempts"] = task.get("attempts")
+
+    # Long documents publish partial results while the task is still running
+    progress = task.get("progress")
+    collection_name = ANALYSIS_COLLECTIONS.get(task.get("name"))
+
+    if progress and status not in FINISHED_STATUSES:
+        state["progress"] = {
+            "percent": progress.get("percent"),
+            "processedChunks": progress.get("processed_chunks"),
+            "totalChunks": progress.get("total_chunks"),
+        }
+        if progress.get("analysis_id") is not None and collection_name is not None:
+            partial_data = database[collection_name].find_one({"_id": progress["analysis_id"]})
+            state["partial"] = serialize_value(partial_data) if partial_data else None
+
+    analysis_id = task.get("return_value")
+
+    if status == "success" and analysis_id is not None and collection_name is not None:
+        analysis_data = database[collection_name].find_one({"_id": analysis_id})
+        state["data"] = serialize_value(analysis_data) if analysis_data else None
+
+    return state
+
+
+@tasks_bp.route("/<task_id>", methods=["GET"])
+@require_auth_optional
+def get_task(task_id):
+    """
+    Task status with optional long-polling: with ``?wait=<seconds>`` the request is held until the task
+    finishes (or the timeout passes), instead of the client polling every few hundred milliseconds.
+    """
+    task_id = parse_task_id(task_id)
+
+    try:
+        wait = min(max(float(request.args.get("wait", 0)), 0), TASK_WAIT_MAX_SEC)
+    except ValueError:
+        raise BadRequest("'wait' must be a number of seconds.")
+
+    database = db.get_database(DB_NAME)
+    authorize_task(database, task_id)
+
+    if wait <= 0:
+        return jsonify(build_task_state(database, load_task(database, task_id)))
+
+    deadline = time.monotonic() + wait
+
+    with task_watcher.subscribe(task_id) as subscription:
+        task = load_task(database, task_id)
+
+        while task.get("status") not in FINISHED_STATUSES:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if subscription.wait(remaining):
+                task = load_task(database, task_id)
+
+    return jsonify(build_task_state(database, task))
+
+
+@tasks_bp.route("/<task_id>/events", methods=["GET"])
+@require_auth_optional
+def stream_task_events(task_id):
+    """
+    Server-Sent Events stream: a ``status`` event whenever the task's status changes, a ``progress``
+    event with the partial analysis whenever more of a long document is done, and a single ``result``
+    event with the analysis once it finishes, after which the stream is closed.
+    """
+    task_id = parse_task_id(task_id)
+    database = db.get_database(DB_NAME)
+    # Fail with a regular 404 before the stream starts
+    authorize_task(database, task_id)
+
+    def format_event(event, data):
+        return f"event: {event}\ndata: {current_app.json.dumps(data)}\n\n"
+
+    def generate():
+        deadline = time.monotonic() + TASK_EVENTS_MAX_SEC
+
+        with task_watcher.subscribe(task_id) as subscription:
+            last_status = None
+            last_progress = None
+
+            while True:
+                task = database[COL_CRON_TASKS].find_one({"_id": task_id}, {"payload": 0})
+
+                if task is None:
+                    yield format_event("error", {"success": False, "message": "Task not found."})
+                    return
+
+                if task.get("status") in FINISHED_STATUSES:
+                    yield format_event("result", build_task_state(database, task))
+                    return
+
+                if task.get("status") != last_status:
+                    last_status = task.get("status")
+                    yield format_event("status", build_task_state(database, task))
+                elif task.get("progress") != last_progress:
+                    yield format_event("progress", build_task_state(database, task))
+                last_progress = task.get("progress")
+
+                # Wait for a change, sending a comment line now and then so proxies keep the connection open
+                while not subscription.wait(min(TASK_EVENTS_KEEPALIVE_SEC, max(deadline - time.monotonic(), 0))):
+                    if time.monotonic() >= deadline:
+                        yield format_event("timeout", {"success": False, "message": "Task is not completed yet."})
+                        return
+                    yield ": keepalive\n\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,135 @@
+import sys
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+from bson import ObjectId
+from pymongo.collection import Collection
+from pymongo.errors import OperationFailure, PyMongoError
+
+
+class Subscription:
+    def __init__(self, task_id: ObjectId):
+        self.task_id = task_id
+        self._event = threading.Event()
+
+    def notify(self) -> None:
+        self._event.set()
+
+    def wait(self, timeout: float) -> bool:
+        """True if the task changed within ``timeout`` seconds."""
+        changed = self._event.wait(timeout)
+        self._event.clear()
+        return changed
+
+
+class TaskWatcher:
+    """
+    One watcher per backend process shared by every long-poll / SSE client.
+
+    Follows cron_tasks through a change stream and notifies the subscriptions of changed tasks.
+    Without change streams (standalone server) it falls back to a single batched query over all
+    currently watched task ids every ``poll_interval`` seconds, however many clients are waiting.
+    """
+
+    def __init__(self, get_collection: Callable[[], Collection], *, poll_interval: float = 0.5):
+        self.get_collection = get_collection
+        self.poll_interval = poll_interval
+        self.mode = "starting"
+        self._subscriptions: dict[ObjectId, set[Subscription]] = {}
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="task-watcher", daemon=True)
+                self._thread.start()
+
+    @contextmanager
+    def subscribe(self, task_id: ObjectId) -> Iterator[Subscription]:
+        """Subscribe *before* reading the task, so a change right after the read isn't missed."""
+        self._ensure_started()
+        subscription = Subscription(task_id)
+        with self._lock:
+            self._subscriptions.setdefault(task_id, set()).add(subscription)
+        try:
+            yield subscription
+        finally:
+            with self._lock:
+                subscribers = self._subscriptions.get(task_id)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscriptions[task_id]
+
+    def _notify(self, task_id: ObjectId) -> None:
+        with self._lock:
+            subscribers = list(self._subscriptions.get(task_id, ()))
+        for subscription in subscribers:
+            subscription.notify()
+
+    def _run(self) -> None:
+        if not self._watch():
+            self._poll()
+
+    def _watch(self) -> bool:
+        """Returns False if change streams are not available and polling should be used instead."""
+        pipeline = [{"$match": {"operationType": {"$in": ["insert", "update", "replace"]}}}]
+        resume_token = None
+        connected_once = False
+
+        while True:
+            try:
+                with self.get_collection().watch(pipeline, resume_after=resume_token) as stream:
+                    connected_once = True
+                    self.mode = "change_stream"
+                    for change in stream:
+                        resume_token = stream.resume_token
+                        self._notify(change["documentKey"]["_id"])
+            except OperationFailure:
+                if not connected_once:
+                    self.mode = "polling"
+                    return False
+                print(f"[task-watcher] Change stream failed, reconnecting:\n{traceback.format_exc()}", file=sys.stderr)
+                resume_token = None
+                time.sleep(1)
+            except PyMongoError:
+                print(f"[task-watcher] Change stream interrupted, reconnecting:\n{traceback.format_exc()}", file=sys.stderr)
+                time.sleep(1)
+            except Exception:
+                print(traceback.format_exc(), file=sys.stderr)
+                self.mode = "polling"
+                return False
+
+    def _poll(self) -> None:
+        last_seen: dict[ObjectId, tuple] = {}
+
+        while True:
+            time.sleep(self.poll_interval)
+
+            with self._lock:
+                task_ids = list(self._subscriptions)
+            if not task_ids:
+                last_seen.clear()
+                continue
+
+            try:
+                tasks = self.get_collection().find(
+                    {"_id": {"$in": task_ids}},
+                    {"status": 1, "completedAt": 1, "progress.percent": 1},
+                )
+                current = {
+                    task["_id"]: (task.get("status"), task.get("completedAt"), task.get("progress"))
+                    for task in tasks
+                }
+            except PyMongoError:
+                print(f"[task-watcher] Poll failed:\n{traceback.format_exc()}", file=sys.stderr)
+                continue
+
+            for task_id, state in current.items():
+                if last_seen.get(task_id) != state:
+                    self._notify(task_id)
+            last_seen = current
@@ -4,6 +4,11 @@ from pathlib import Path
 from flask import request, current_app
 from werkzeug.exceptions import InternalServerError
 
+from common.python.task_queue import TaskQueue
+from config import COL_CRON_TASKS, COL_TASK_FAIRNESS
+
+task_queue = TaskQueue(COL_CRON_TASKS, COL_TASK_FAIRNESS)
+
 def extract_request_text():
     if "file" in request.files:
         file = request.files["file"]
@@ -19,6 +24,18 @@ def extract_request_text():
 
     return str(json_payload.get("text", "")).strip()
 
+def extract_request_option(name, default=None):
+    value = request.form.get(name) or request.args.get(name)
+
+    if value is None:
+        json_payload = request.get_json(silent=True) or {}
+        value = json_payload.get(name)
+
+    if value is None or str(value).strip() == "":
+        return default
+
+    return str(value).strip()
+
 def extract_text(source, filename=None) -> str:
   if filename is None:
     if hasattr(source, 'name'):
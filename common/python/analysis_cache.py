@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import sys
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any
+
+from pymongo.database import Database
+
+# Shared between backend and cron: both compute the same key for the same analysis, so a result
+# produced by one process can be reused by the other.
+
+AI_TEXT_MODEL_INFO_ID = "ai_text"
+
+
+def normalize_text(text: str) -> str:
+    return unicodedata.normalize("NFC", text).replace("\r\n", "\n").replace("\r", "\n").strip()
+
+
+def make_cache_key(namespace: str, *parts: Any) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, bytes):
+            digest.update(part)
+        else:
+            digest.update(json.dumps(part, sort_keys=True, default=str).encode("utf-8"))
+        digest.update(b"\x00")
+    return f"{namespace}:{digest.hexdigest()}"
+
+
+def ai_text_cache_key(text: str, tier: str, model_info: dict[str, Any]) -> str:
+    """
+    Key of an AI text analysis: normalized text, inference tier and everything the cron worker
+    published about the active model (checkpoint identity, temperature, segmentation params).
+    The tier is the one that actually runs (``effective_tiers``), so a fallback shares its key.
+    """
+    return make_cache_key(
+        "ai_text",
+        normalize_text(text).encode("utf-8"),
+        (model_info.get("effective_tiers") or {}).get(tier, tier),
+        model_info.get("identity"),
+        model_info.get("temperature"),
+        model_info.get("params"),
+    )
+
+
+def record_cache_event(
+    database: Database, stats_collection_name: str, namespace: str, field: str, amount: int = 1
+) -> None:
+    try:
+        database[stats_collection_name].update_one(
+            {"_id": namespace},
+            {"$inc": {field: amount}, "$set": {"updatedAt": datetime.now(timezone.utc)}},
+            upsert=True,
+        )
+    except Exception as e:
+        print(f"[cache:{namespace}] Failed to update stats: {e}", file=sys.stderr)
+
+
+class ResultCache:
+    """
+    Two-level result cache: an in-process LRU in front of a Mongo collection with a TTL index.
+
+    Hit/miss counters are kept per namespace in a stats collection, so they add up across all
+    backend and cron processes. With ``max_entries`` the oldest stored entries of the namespace are
+    also evicted once there are more of them, checked every ``TRIM_INTERVAL`` puts.
+    """
+
+    TRIM_INTERVAL = 100
+
+    def __init__(
+        self,
+        namespace: str,
+        collection_name: str,
+        stats_collection_name: str,
+        *,
+        maxsize: int = 256,
+        ttl_seconds: float = 7 * 24 * 3600,
+        max_entries: int | None = None,
+    ):
+        self.namespace = namespace
+        self.collection_name = collection_name
+        self.stats_collection_name = stats_collection_name
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._memory: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._indexes_ready = False
+        self._puts_since_trim = 0
+
+    def ensure_indexes(self, database: Database) -> None:
+        if self._indexes_ready:
+            return
+        database[self.collection_name].create_index(
+            [("createdAt", 1)], expireAfterSeconds=int(self.ttl_seconds)
+        )
+        if self.max_entries:
+            database[self.collection_name].create_index([("namespace", 1), ("createdAt", 1)])
+        self._indexes_ready = True
+
+    def _memory_get(self, key: str) -> Any | None:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            return value
+
+    def _memory_put(self, key: str, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._memory[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.maxsize:
+                self._memory.popitem(last=False)
+
+    def _count(self, database: Database, field: str, amount: int = 1) -> None:
+        record_cache_event(database, self.stats_collection_name, self.namespace, field, amount)
+
+    def get(self, database: Database, key: str) -> Any | None:
+        value = self._memory_get(key)
+        if value is not None:
+            self._count(database, "hits_memory")
+            return value
+
+        try:
+            doc = database[self.collection_name].find_one({"_id": key})
+        except Exception as e:
+            print(f"[cache:{self.namespace}] Lookup failed: {e}", file=sys.stderr)
+            doc = None
+
+        if doc is None:
+            self._count(database, "misses")
+            return None
+
+        self._memory_put(key, doc["value"])
+        self._count(database, "hits_db")
+        return doc["value"]
+
+    def put(self, database: Database, key: str, value: Any) -> None:
+        self._memory_put(key, value)
+        try:
+            self.ensure_indexes(database)
+            database[self.collection_name].replace_one(
+                {"_id": key},
+                {"_id": key, "namespace": self.namespace, "value": value, "createdAt": datetime.now(timezone.utc)},
+                upsert=True,
+            )
+        except Exception as e:
+            # A result that can't be cached (e.g. over the document size limit) is not an error
+            print(f"[cache:{self.namespace}] Failed to store result: {e}", file=sys.stderr)
+            return
+
+        self._trim(database)
+
+    def _trim(self, database: Database) -> None:
+        if not self.max_entries:
+            return
+
+        with self._lock:
+            self._puts_since_trim += 1
+            if self._puts_since_trim < self.TRIM_INTERVAL:
+                return
+            self._puts_since_trim = 0
+
+        try:
+            collection = database[self.collection_name]
+            excess = collection.count_documents({"namespace": self.namespace}) - self.max_entries
+            if excess <= 0:
+                return
+
+            oldest = [
+                doc["_id"]
+                for doc in collection.find({"namespace": self.namespace}, {"_id": 1}).sort("createdAt", 1).limit(excess)
+            ]
+            deleted = collection.delete_many({"_id": {"$in": oldest}}).deleted_count
+            self._count(database, "evicted", deleted)
+        except Exception as e:
+            print(f"[cache:{self.namespace}] Failed to evict old entries: {e}", file=sys.stderr)
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, BinaryIO
+
+from bson import ObjectId
+from gridfs import GridFSBucket
+from gridfs.errors import NoFile
+from pymongo.database import Database
+
+# Task inputs that are too large for a cron_tasks document (e.g. uploaded images) live in this
+# GridFS bucket; the task payload only keeps the blob id.
+
+TASK_BLOBS_BUCKET = "task_blobs"
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+FINISHED_TASK_STATUSES = ("success", "error")
+
+
+def _bucket(database: Database) -> GridFSBucket:
+    return GridFSBucket(database, bucket_name=TASK_BLOBS_BUCKET)
+
+
+def store_blob(
+    database: Database,
+    stream: BinaryIO,
+    *,
+    filename: str,
+    task_id: ObjectId,
+    metadata: dict[str, Any] | None = None,
+) -> tuple[ObjectId, str]:
+    """
+    Streams ``stream`` into GridFS chunk by chunk, without holding the whole upload in memory.
+    Returns the blob id and the SHA-256 of the content.
+    """
+    digest = hashlib.sha256()
+
+    with _bucket(database).open_upload_stream(
+        filename, metadata={**(metadata or {}), "task_id": task_id}
+    ) as upload:
+        while True:
+            chunk = stream.read(STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            upload.write(chunk)
+
+    return upload._id, digest.hexdigest()
+
+
+def read_blob(database: Database, blob_id: ObjectId) -> bytes:
+    with _bucket(database).open_download_stream(blob_id) as download:
+        return download.read()
+
+
+def delete_blob(database: Database, blob_id: ObjectId) -> None:
+    try:
+        _bucket(database).delete(blob_id)
+    except NoFile:
+        pass
+
+
+def collect_task_blobs(
+    database: Database,
+    tasks_collection_name: str,
+    *,
+    orphan_grace_seconds: float = 3600,
+    batch_size: int = 500,
+    retained_collection_name: str | None = None,
+) -> int:
+    """
+    Deletes blobs whose task has finished, and blobs whose task document never appeared
+    (e.g. the request failed after the upload) once they are older than ``orphan_grace_seconds``.
+    Blobs of tasks listed in ``retained_collection_name`` (e.g. dead-lettered tasks that may be
+    requeued) are kept. Returns the number of deleted blobs.
+    """
+    files = database[f"{TASK_BLOBS_BUCKET}.files"]
+    orphan_cutoff = datetime.now(timezone.utc) - timedelta(seconds=orphan_grace_seconds)
+    deleted = 0
+
+    cursor = files.find({}, {"metadata.task_id": 1, "uploadDate": 1}).batch_size(batch_size)
+    pending: list[dict[str, Any]] = []
+
+    def flush() -> int:
+        task_ids = [blob.get("metadata", {}).get("task_id") for blob in pending]
+        statuses = {
+            task["_id"]: task.get("status")
+            for task in database[tasks_collection_name].find({"_id": {"$in": task_ids}}, {"status": 1})
+        }
+        retained = set()
+        if retained_collection_name is not None:
+            retained = {
+                doc["_id"] for doc in database[retained_collection_name].find({"_id": {"$in": task_ids}}, {"_id": 1})
+            }
+        removed = 0
+        for blob, task_id in zip(pending, task_ids):
+            upload_date = blob.get("uploadDate")
+            if upload_date is not None and upload_date.tzinfo is None:
+                upload_date = upload_date.replace(tzinfo=timezone.utc)
+
+            if task_id in retained:
+                finished = False
+            elif task_id in statuses:
+                finished = statuses[task_id] in FINISHED_TASK_STATUSES
+            else:
+                finished = upload_date is not None and upload_date < orphan_cutoff
+
+            if finished:
+                delete_blob(database, blob["_id"])
+                removed += 1
+        pending.clear()
+        return removed
+
+    for blob in cursor:
+        pending.append(blob)
+        if len(pending) >= batch_size:
+            deleted += flush()
+
+    if pending:
+        deleted += flush()
+
+    return deleted
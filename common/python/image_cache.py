@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import hashlib
+import sys
+from datetime import datetime, timezone
+from typing import Any
+
+from pymongo.database import Database
+
+from .analysis_cache import record_cache_event
+
+AI_IMAGE_MODEL_INFO_ID = "ai_image"
+
+# Fields of an image analysis document that depend only on the image and model (safe to reuse)
+CACHED_IMAGE_FIELDS = ("ai_probability", "image_preview", "overall", "raw_predictions")
+
+DHASH_BANDS = 4
+DHASH_BAND_BITS = 16
+
+
+def image_sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def dhash_bands(dhash: int) -> list[int]:
+    # Band position is kept in the high bits, so only bands at the same position can match
+    mask = (1 << DHASH_BAND_BITS) - 1
+    return [
+        (band << DHASH_BAND_BITS) | ((dhash >> (band * DHASH_BAND_BITS)) & mask)
+        for band in range(DHASH_BANDS)
+    ]
+
+
+class ImageResultCache:
+    """
+    Image analysis results stored in Mongo, looked up by the exact SHA-256 of the uploaded bytes and,
+    when the caller can compute it, by a 64-bit difference hash (dHash) to catch re-encoded copies.
+
+    The dHash is split into four 16-bit bands kept in a multikey index: two hashes within
+    ``max_distance`` < 4 bits of each other always share at least one band, so candidates are found
+    with an indexed query and only they are compared bit by bit.
+    """
+
+    def __init__(
+        self,
+        collection_name: str,
+        stats_collection_name: str,
+        *,
+        max_distance: int = 3,
+        ttl_seconds: float = 7 * 24 * 3600,
+    ):
+        self.namespace = "ai_image"
+        self.collection_name = collection_name
+        self.stats_collection_name = stats_collection_name
+        self.max_distance = min(max_distance, DHASH_BANDS - 1)
+        self.ttl_seconds = ttl_seconds
+        self._indexes_ready = False
+
+    def ensure_indexes(self, database: Database) -> None:
+        if self._indexes_ready:
+            return
+        collection = database[self.collection_name]
+        collection.create_index([("model_identity", 1), ("sha256", 1)], unique=True)
+        collection.create_index([("model_identity", 1), ("dhash_bands", 1)])
+        collection.create_index([("createdAt", 1)], expireAfterSeconds=int(self.ttl_seconds))
+        self._indexes_ready = True
+
+    def _count(self, database: Database, field: str) -> None:
+        record_cache_event(database, self.stats_collection_name, self.namespace, field)
+
+    def _find_similar(self, database: Database, model_identity: str, dhash: int) -> dict[str, Any] | None:
+        candidates = database[self.collection_name].find({
+            "model_identity": model_identity,
+            "dhash_bands": {"$in": dhash_bands(dhash)},
+        })
+        best, best_distance = None, self.max_distance + 1
+        for candidate in candidates:
+            distance = bin(int(candidate["dhash"], 16) ^ dhash).count("1")
+            if distance < best_distance:
+                best, best_distance = candidate, distance
+        return best
+
+    def find_exact(self, database: Database, model_identity: str, sha256: str) -> dict[str, Any] | None:
+        try:
+            doc = database[self.collection_name].find_one({"model_identity": model_identity, "sha256": sha256})
+        except Exception as e:
+            print(f"[cache:{self.namespace}] Lookup failed: {e}", file=sys.stderr)
+            return None
+
+        if doc is None:
+            return None
+        self._count(database, "hits_exact")
+        return doc["value"]
+
+    def find_similar(self, database: Database, model_identity: str, dhash: int) -> dict[str, Any] | None:
+        try:
+            doc = self._find_similar(database, model_identity, dhash)
+        except Exception as e:
+            print(f"[cache:{self.namespace}] Lookup failed: {e}", file=sys.stderr)
+            return None
+
+        if doc is None:
+            return None
+        self._count(database, "hits_perceptual")
+        return doc["value"]
+
+    def record_miss(self, database: Database) -> None:
+        self._count(database, "misses")
+
+    def put(self, database: Database, model_identity: str, sha256: str, dhash: int | None, value: dict[str, Any]) -> None:
+        doc = {
+            "model_identity": model_identity,
+            "sha256": sha256,
+            "value": value,
+            "createdAt": datetime.now(timezone.utc),
+        }
+        if dhash is not None:
+            doc["dhash"] = f"{dhash:016x}"
+            doc["dhash_bands"] = dhash_bands(dhash)
+
+        try:
+            self.ensure_indexes(database)
+            database[self.collection_name].replace_one(
+                {"model_identity": model_identity, "sha256": sha256}, doc, upsert=True
+            )
+        except Exception as e:
+            print(f"[cache:{self.namespace}] Failed to store result: {e}", file=sys.stderr)
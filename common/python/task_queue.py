@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Any
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.database import Database
+
+# Shared between backend (which schedules tasks) and cron (which claims them).
+#
+# Tasks are claimed by priority first, then by a per-user fair sequence number: every user's tasks
+# are numbered 1, 2, 3... from the current virtual time, so 200 uploads of one user interleave with
+# the first task of everyone else instead of all running first.
+
+PRIORITY_INTERACTIVE = 10
+PRIORITY_BULK = 0
+
+# Sort of the claim query; backed by the (status, priority, fairSeq, createdAt) index
+CLAIM_SORT = [("priority", -1), ("fairSeq", 1), ("createdAt", 1)]
+
+VIRTUAL_TIME_ID = "virtual_time"
+ANONYMOUS_USER = "anonymous"
+
+
+def fairness_key(user_id: str | None) -> str:
+    return f"user:{user_id or ANONYMOUS_USER}"
+
+
+class TaskQueue:
+    def __init__(self, tasks_collection_name: str, fairness_collection_name: str):
+        self.tasks_collection_name = tasks_collection_name
+        self.fairness_collection_name = fairness_collection_name
+
+    def next_fair_seq(self, database: Database, user_id: str | None, count: int = 1) -> int:
+        """
+        The user's next sequence number: one after their previous task, but never behind the
+        virtual time, so a user who was idle doesn't get to jump ahead with a backlog of old numbers.
+        With ``count`` > 1 a run of consecutive numbers is reserved and the first one is returned.
+        """
+        fairness = database[self.fairness_collection_name]
+        clock = fairness.find_one({"_id": VIRTUAL_TIME_ID})
+        virtual_time = clock["seq"] if clock else 0
+
+        counter = fairness.find_one_and_update(
+            {"_id": fairness_key(user_id)},
+            [{"$set": {"seq": {"$add": [{"$max": [{"$ifNull": ["$seq", 0]}, virtual_time]}, count]}}}],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return counter["seq"] - count + 1
+
+    def schedule(
+        self,
+        database: Database,
+        name: str,
+        payload: dict[str, Any],
+        *,
+        user_id: str | None,
+        priority: int = PRIORITY_INTERACTIVE,
+        task_id: ObjectId | None = None,
+    ) -> ObjectId:
+        task = {
+            "name": name,
+            "payload": payload,
+            "status": "scheduled",
+            "userId": user_id,
+            "priority": priority,
+            "fairSeq": self.next_fair_seq(database, user_id),
+            "createdAt": datetime.now(timezone.utc),
+        }
+        if task_id is not None:
+            task["_id"] = task_id
+
+        return database[self.tasks_collection_name].insert_one(task).inserted_id
+
+    def schedule_many(
+        self,
+        database: Database,
+        name: str,
+        payloads: list[dict[str, Any]],
+        *,
+        user_id: str | None,
+        priority: int = PRIORITY_BULK,
+        batch_id: ObjectId | None = None,
+        task_ids: list[ObjectId] | None = None,
+        labels: list[str | None] | None = None,
+    ) -> list[ObjectId]:
+        """
+        Schedules a whole batch with one ``insert_many``. The tasks get consecutive fair sequence numbers,
+        so they still take turns with other users' tasks, and share ``batchId`` so workers can micro-batch them.
+        """
+        if not payloads:
+            return []
+
+        first_seq = self.next_fair_seq(database, user_id, count=len(payloads))
+        now = datetime.now(timezone.utc)
+        tasks = []
+
+        for index, payload in enumerate(payloads):
+            task = {
+                "name": name,
+                "payload": payload,
+                "status": "scheduled",
+                "userId": user_id,
+                "priority": priority,
+                "fairSeq": first_seq + index,
+                "createdAt": now,
+            }
+            if batch_id is not None:
+                task["batchId"] = batch_id
+                task["batchIndex"] = index
+            if labels is not None:
+                task["batchItem"] = labels[index]
+            if task_ids is not None:
+                task["_id"] = task_ids[index]
+            tasks.append(task)
+
+        return database[self.tasks_collection_name].insert_many(tasks).inserted_ids
+
+    def advance_virtual_time(self, database: Database, task: dict[str, Any]) -> None:
+        """Called when a task is claimed: virtual time follows the fair sequence of claimed tasks."""
+        if task.get("fairSeq") is None:
+            return
+        database[self.fairness_collection_name].update_one(
+            {"_id": VIRTUAL_TIME_ID},
+            {"$max": {"seq": task["fairSeq"]}},
+            upsert=True,
+        )
@@ -0,0 +1,73 @@
+import asyncio
+import threading
+from concurrent.futures import Future, wait
+from typing import Any, Coroutine
+
+
+class AsyncRunner:
+    """
+    One event loop in a background thread, shared by all workers of the process.
+
+    Workers hand async handlers (``task_async``) over with ``submit`` and go back to claiming, so many
+    LLM-bound tasks wait on the network concurrently without holding a worker thread each.
+    """
+
+    def __init__(self):
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._pending: set[Future] = set()
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="async-runner", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    @property
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def submit(self, coro: Coroutine[Any, Any, Any]) -> Future:
+        """Schedules ``coro`` on the loop; the returned future can be waited on or cancelled from any thread."""
+        self.start()
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._discard)
+
+        return future
+
+    def run(self, coro: Coroutine[Any, Any, Any], timeout: float | None = None) -> Any:
+        """Runs ``coro`` on the loop and blocks the calling thread until it's done."""
+        return self.submit(coro).result(timeout)
+
+    def _discard(self, future: Future) -> None:
+        with self._lock:
+            self._pending.discard(future)
+
+    def drain(self, timeout: float | None = None) -> None:
+        """Waits for submitted coroutines, cancelling those still running after ``timeout`` seconds."""
+        with self._lock:
+            pending = list(self._pending)
+
+        _, not_done = wait(pending, timeout)
+        for future in not_done:
+            future.cancel()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._thread = None
+        self._loop = None
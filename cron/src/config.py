@@ -1,3 +1,5 @@
+import os
+
 DB_NAME = "factify"
 
 COL_POSTS = "posts"
@@ -8,8 +10,21 @@ COL_ANALYSIS_AI_IMAGE = "analysis_ai_image"
 COL_ANALYSIS_MANIPULATION = "analysis_manipulation"
 COL_ANALYSIS_SOURCES = "analysis_sources"
 COL_CRON_TASKS = "cron_tasks"
+COL_DEAD_LETTER_TASKS = "dead_letter_tasks"
+COL_TASK_FAIRNESS = "task_fairness"
 COL_REPORTS_NLP = "reports_nlp"
 COL_REPORTS_IMAGE = "reports_image"
+COL_ANALYSIS_CACHE = "analysis_cache"
+COL_CACHE_STATS = "cache_stats"
+COL_LLM_CACHE = "llm_cache"
+COL_MODEL_INFO = "model_info"
+COL_IMAGE_CACHE = "image_cache"
 
 NLP_REPORTS_DIR = "/app/jobs/analyze/nlp/artifacts/reports"
-IMAGE_REPORTS_DIR = "/app/jobs/analyze_image/image_detection/artifacts/reports"
\ No newline at end of file
+IMAGE_REPORTS_DIR = "/app/jobs/analyze_image/image_detection/artifacts/reports"
+
+ANALYSIS_CACHE_SIZE = int(os.getenv("ANALYSIS_CACHE_SIZE", "256"))
+ANALYSIS_CACHE_TTL_SEC = int(os.getenv("ANALYSIS_CACHE_TTL_SEC", str(7 * 24 * 3600)))
+# Perceptual (dHash) tier of the image cache: max Hamming distance (0-3) to treat an upload as a re-encoded copy
+IMAGE_CACHE_DHASH_MAX_DISTANCE = int(os.getenv("IMAGE_CACHE_DHASH_MAX_DISTANCE", "3"))
+IMAGE_CACHE_PERCEPTUAL = os.getenv("IMAGE_CACHE_PERCEPTUAL", "false").lower() in ("1", "true", "yes")
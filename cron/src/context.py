@@ -1,8 +1,20 @@
+from bson import ObjectId
 from pymongo import MongoClient
+from pymongo.collection import Collection
 
-from llm import LLM
+from llm import LLM, AsyncLLM
 
 
 class TaskContext:
     db: MongoClient
     llm: LLM
+    # Shared by all async handlers (``task_async``) of the process
+    async_llm: AsyncLLM | None = None
+    # Set by the worker for the task being processed (not for micro-batches); async handlers get their own context
+    task_id: ObjectId | None = None
+    tasks: Collection | None = None
+
+    def update_task(self, update: dict) -> None:
+        """Applies ``update`` to the current task's document, e.g. to publish partial results."""
+        if self.tasks is not None and self.task_id is not None:
+            self.tasks.update_one({"_id": self.task_id}, update)
@@ -0,0 +1,123 @@
+import sys
+import threading
+import traceback
+
+from pymongo.collection import Collection
+from pymongo.errors import OperationFailure, PyMongoError
+
+# Changes that can make a task claimable: new scheduled tasks and tasks put back to "scheduled"
+WATCH_PIPELINE = [
+    {"$match": {"$or": [
+        {"operationType": "insert", "fullDocument.status": "scheduled"},
+        {"operationType": "update", "updateDescription.updatedFields.status": "scheduled"},
+        {"operationType": "replace", "fullDocument.status": "scheduled"},
+    ]}},
+]
+
+
+class TaskDispatcher:
+    """
+    Wakes idle workers when there may be something to claim.
+
+    In ``change_stream`` mode a watcher thread follows inserts into the tasks collection, so idle
+    workers just sleep until notified (with a long safety timeout) and issue almost no queries.
+    On a standalone server, where change streams aren't available, it falls back to ``polling``
+    with exponential backoff: quick re-checks right after activity, slowing down while idle.
+    """
+
+    def __init__(
+        self,
+        col: Collection,
+        stop_event: threading.Event,
+        *,
+        mode: str = "auto",
+        min_poll_interval: float = 0.1,
+        max_poll_interval: float = 2.0,
+        idle_timeout: float = 60.0,
+    ):
+        self.col = col
+        self.stop_event = stop_event
+        self.mode = "polling" if mode == "polling" else "starting"
+        self.min_poll_interval = min_poll_interval
+        self.max_poll_interval = max(min_poll_interval, max_poll_interval)
+        self.idle_timeout = idle_timeout
+        self._cond = threading.Condition()
+        self._generation = 0
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self.mode == "polling":
+            print("[dispatcher] Using polling (change streams disabled).")
+            return
+        self._thread = threading.Thread(target=self._watch_loop, name="dispatcher")
+        self._thread.start()
+
+    def stop(self) -> None:
+        self.notify()
+        if self._thread is not None:
+            self._thread.join()
+
+    def notify(self) -> None:
+        with self._cond:
+            self._generation += 1
+            self._cond.notify_all()
+
+    def generation(self) -> int:
+        """Taken by a worker *before* it tries to claim, so a notification in between isn't lost."""
+        with self._cond:
+            return self._generation
+
+    def wait(self, generation: int, idle_rounds: int) -> None:
+        if self.mode == "change_stream":
+            timeout = self.idle_timeout
+        else:
+            timeout = min(self.max_poll_interval, self.min_poll_interval * (2 ** min(idle_rounds, 16)))
+
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self._generation != generation or self.stop_event.is_set(),
+                timeout=timeout,
+            )
+
+    def _fall_back_to_polling(self, reason: str) -> None:
+        print(f"[dispatcher] Change streams unavailable ({reason}), falling back to polling.")
+        self.mode = "polling"
+        self.notify()
+
+    def _watch_loop(self) -> None:
+        resume_token = None
+        connected_once = False
+
+        while not self.stop_event.is_set():
+            try:
+                with self.col.watch(WATCH_PIPELINE, resume_after=resume_token, max_await_time_ms=1000) as stream:
+                    if not connected_once:
+                        print("[dispatcher] Watching tasks through a change stream.")
+                    connected_once = True
+                    self.mode = "change_stream"
+                    # Anything inserted before the stream opened (or while reconnecting) is picked up now
+                    self.notify()
+
+                    while not self.stop_event.is_set() and stream.alive:
+                        change = stream.try_next()
+                        resume_token = stream.resume_token
+                        if change is not None:
+                            self.notify()
+            except PyMongoError as e:
+                if not connected_once and isinstance(e, OperationFailure):
+                    # e.g. "The $changeStream stage is only supported on replica sets"
+                    self._fall_back_to_polling(str(e))
+                    return
+                print(f"[dispatcher] Change stream interrupted, reconnecting:\n{traceback.format_exc()}", file=sys.stderr)
+                if isinstance(e, OperationFailure):
+                    # The resume token may no longer be in the oplog
+                    resume_token = None
+                # Poll while the stream is down so tasks aren't stuck waiting for the idle timeout
+                self.mode = "polling"
+                self.notify()
+                self.stop_event.wait(1)
+            except Exception as e:
+                # Don't leave workers waiting for notifications that will never come
+                print(traceback.format_exc(), file=sys.stderr)
+                self._fall_back_to_polling(str(e))
+                return
@@ -1 +1 @@
-from .main import task
+from .main import task, task_batch, is_batchable, RETRY_POLICY
@@ -1,5 +1,90 @@
-from .nlp import predict_segmented_text
-from .nlp.detector.config import SEGMENT_MIN_WORDS, SEGMENT_STRIDE_WORDS, SEGMENT_WORD_TARGET
+from datetime import datetime
+
+from common.python.analysis_cache import AI_TEXT_MODEL_INFO_ID, ResultCache
+
+from config import COL_ANALYSIS_CACHE, COL_CACHE_STATS, COL_MODEL_INFO, ANALYSIS_CACHE_SIZE, ANALYSIS_CACHE_TTL_SEC
+from .nlp import predict_segmented_text, predict_segmented_text_streaming, predict_segmented_texts
+from .nlp.detector.inference import effective_inference_tier, inference_backend, inference_identity, load_inference_artifacts
+from .nlp.detector.config import (
+    INFERENCE_TIERS,
+    MC_DROPOUT_MAX_BATCH_ROWS,
+    MC_DROPOUT_MIN_PASSES,
+    MC_DROPOUT_PASS_GROUP,
+    MC_DROPOUT_SEED,
+    MC_DROPOUT_TOLERANCE,
+    SEGMENT_AI_THRESHOLD,
+    SEGMENT_CASCADE,
+    SEGMENT_CHUNKING,
+    SEGMENT_HUMAN_THRESHOLD,
+    SEGMENT_MIN_WORDS,
+    SEGMENT_STRIDE_WORDS,
+    SEGMENT_WORD_TARGET,
+    STREAM_CHUNK_BATCH_SIZE,
+    STUDENT_MODEL_PATH,
+)
+from .nlp.detector.model_utils import model_identity
+
+SEGMENT_PARAMS = {
+    "words_per_chunk": SEGMENT_WORD_TARGET,
+    "stride_words": SEGMENT_STRIDE_WORDS,
+    "min_words": SEGMENT_MIN_WORDS,
+    "max_length": 128,
+    "chunking": SEGMENT_CHUNKING,
+    "cascade": SEGMENT_CASCADE,
+}
+
+# Texts longer than one streamed chunk batch get partial results; shorter ones wouldn't show anything earlier
+STREAM_MIN_WORDS = SEGMENT_WORD_TARGET + SEGMENT_STRIDE_WORDS * (STREAM_CHUNK_BATCH_SIZE - 1)
+
+text_result_cache = ResultCache(
+    "ai_text",
+    COL_ANALYSIS_CACHE,
+    COL_CACHE_STATS,
+    maxsize=ANALYSIS_CACHE_SIZE,
+    ttl_seconds=ANALYSIS_CACHE_TTL_SEC,
+)
+
+_published_model_info = None
+
+
+def publish_model_info(database):
+    """
+    Publishes what identifies results of the loaded model, so the backend can compute the same
+    cache keys without loading the model itself. Done once per process.
+    """
+    global _published_model_info
+
+    if _published_model_info is None:
+        _, model = load_inference_artifacts()
+        info = {
+            "identity": inference_identity(),
+            "temperature": float(getattr(model, "_factify_temperature", 1.0)),
+            "params": {
+                **SEGMENT_PARAMS,
+                "ai_threshold": SEGMENT_AI_THRESHOLD,
+                "human_threshold": SEGMENT_HUMAN_THRESHOLD,
+                "inference_tiers": INFERENCE_TIERS,
+                "inference_backend": inference_backend(),
+                "mc_dropout_min_passes": MC_DROPOUT_MIN_PASSES,
+                "mc_dropout_pass_group": MC_DROPOUT_PASS_GROUP,
+                "mc_dropout_tolerance": MC_DROPOUT_TOLERANCE,
+                "mc_dropout_seed": MC_DROPOUT_SEED,
+                "mc_dropout_max_batch_rows": MC_DROPOUT_MAX_BATCH_ROWS,
+            },
+            # Results are keyed on the tier that actually runs, e.g. "standard" on an ONNX export without dropout is "fast"
+            "effective_tiers": {tier: effective_inference_tier(tier) for tier in INFERENCE_TIERS},
+        }
+        if SEGMENT_CASCADE and STUDENT_MODEL_PATH.exists():
+            # Cascaded results also depend on the student model
+            info["params"]["student_identity"] = model_identity(STUDENT_MODEL_PATH)
+        database[COL_MODEL_INFO].replace_one(
+            {"_id": AI_TEXT_MODEL_INFO_ID},
+            {"_id": AI_TEXT_MODEL_INFO_ID, **info, "updatedAt": datetime.utcnow()},
+            upsert=True,
+        )
+        _published_model_info = info
+
+    return _published_model_info
 
 
 # def helper_to_predict(text, segment_params):
@@ -57,15 +142,38 @@ from .nlp.detector.config import SEGMENT_MIN_WORDS, SEGMENT_STRIDE_WORDS, SEGMEN
 #
 #     return response, ai_prob_pct
 
-def helper_to_predict(text):
-    segmented = predict_segmented_text(
-        text,
-        words_per_chunk=SEGMENT_WORD_TARGET,
-        stride_words=SEGMENT_STRIDE_WORDS,
-        min_words=SEGMENT_MIN_WORDS,
-        max_length=128,
-    )
+def helper_to_predict(text, tier=None):
+    segmented = predict_segmented_text(text, **SEGMENT_PARAMS, tier=tier)
+
+    return build_response(text, segmented)
+
+
+def helper_to_predict_streaming(text, tier=None, on_batch=None):
+    segmented = predict_segmented_text_streaming(text, **SEGMENT_PARAMS, tier=tier, on_batch=on_batch)
+
+    return build_response(text, segmented)
+
+
+def helper_to_predict_batch(texts, tiers):
+    """Predicts several texts with one batched model run per tier; results keep the input order."""
+    results = [None] * len(texts)
+    positions_by_tier = {}
+    for position, tier in enumerate(tiers):
+        positions_by_tier.setdefault(tier, []).append(position)
+
+    for tier, positions in positions_by_tier.items():
+        segmented_list = predict_segmented_texts(
+            [texts[position] for position in positions],
+            **SEGMENT_PARAMS,
+            tier=tier,
+        )
+        for position, segmented in zip(positions, segmented_list):
+            results[position] = build_response(texts[position], segmented)
+
+    return results
+
 
+def build_response(text, segmented):
     overall = segmented["overall"]
     ai_prob = overall["prob_generated"]
     human_prob = overall["prob_human"]
@@ -79,6 +187,7 @@ def helper_to_predict(text):
         "prob_entropy": overall.get("prob_entropy"),
         "prob_variation_ratio": overall.get("prob_variation_ratio"),
         "mc_dropout_passes": segmented.get("mc_dropout_passes"),
+        "inference_tier": segmented.get("inference_tier"),
         "temperature": segmented.get("temperature"),
     }
 
@@ -93,6 +202,7 @@ def helper_to_predict(text):
         "segments": segmented["segments"],
         "segment_params": segmented["params"],
         "mc_dropout_passes": segmented.get("mc_dropout_passes"),
+        "inference_tier": segmented.get("inference_tier"),
         "temperature": segmented.get("temperature")
     }
 
@@ -1,37 +1,206 @@
 from datetime import datetime
 
+from pymongo.errors import ConnectionFailure
+
+from common.python.analysis_cache import ai_text_cache_key
+
 from context import TaskContext
+from retry import RetryPolicy
 from types_ import TaskPayload
-from .nlp.detector.model_utils import load_model_artifacts
-from .helpers import helper_to_predict
+from .nlp.detector.inference import load_inference_artifacts, resolve_inference_tier
+from .helpers import (
+    STREAM_MIN_WORDS, helper_to_predict, helper_to_predict_batch, helper_to_predict_streaming, publish_model_info,
+    text_result_cache
+)
 
 from config import DB_NAME, COL_ANALYSIS_AI_TEXT
 
+# Fields of an analysis document that depend only on the text, tier and model (safe to reuse)
+CACHED_FIELDS = ("text", "ai_probability", "segments", "overall", "inference_tier")
+
+# Tokenizer and model errors come from the text itself and would repeat; Mongo (cache, partial results,
+# insert) dropping the connection is the only failure another attempt can fix
+RETRY_POLICY = RetryPolicy(max_attempts=3, backoff_base_sec=2, retryable=(ConnectionFailure,))
+
+
 def task(payload: TaskPayload, ctx: TaskContext):
     text = payload["text"]
     user_id = payload["user_id"]
-
-    response, ai_prob_pct = helper_to_predict(text)
+    tier = resolve_inference_tier(payload.get("tier"))["tier"]
 
     database = ctx.db.get_database(DB_NAME)
     collection = database[COL_ANALYSIS_AI_TEXT]
-    doc = {
+
+    cache_key = ai_text_cache_key(text, tier, publish_model_info(database))
+    cached = text_result_cache.get(database, cache_key)
+
+    if cached is not None:
+        doc = build_cached_doc(cached, user_id)
+    elif ctx.task_id is not None and not is_batchable(payload):
+        analysis_id, doc = predict_streaming(text, user_id, tier, collection, ctx)
+        text_result_cache.put(database, cache_key, {field: doc[field] for field in CACHED_FIELDS})
+        return analysis_id
+    else:
+        response, ai_prob_pct = helper_to_predict(text, tier=tier)
+        doc = build_analysis_doc(text, user_id, response, ai_prob_pct)
+        text_result_cache.put(database, cache_key, {field: doc[field] for field in CACHED_FIELDS})
+
+    result = collection.insert_one(doc)
+
+    return result.inserted_id
+
+
+def is_batchable(payload: TaskPayload) -> bool:
+    """Long documents are streamed on their own instead of holding up a micro-batch of short texts."""
+    text = (payload or {}).get("text")
+    return not isinstance(text, str) or len(text.split()) <= STREAM_MIN_WORDS
+
+
+def partial_analysis_id(ctx: TaskContext):
+    """Analysis document started by an earlier attempt of the current task (crashed worker, expired lease)."""
+    if ctx.tasks is None or ctx.task_id is None:
+        return None
+    task_doc = ctx.tasks.find_one({"_id": ctx.task_id}, {"progress.analysis_id": 1})
+    return ((task_doc or {}).get("progress") or {}).get("analysis_id")
+
+
+def predict_streaming(text, user_id, tier, collection, ctx: TaskContext):
+    """
+    Inserts the analysis document up front and appends segments to it as chunk batches finish,
+    together with the running overall score and progress. The task gets the same progress and
+    the analysis id, so the task status endpoint can show the partial document.
+
+    The analysis id is stored on the task before any work starts, so a reclaimed task resets and
+    reuses the document of the attempt that died instead of leaving it behind as a partial orphan.
+    """
+    partial_doc = {
+        **build_analysis_doc(text, user_id, None, None),
+        "segments": [],
+        "partial": True,
+        "progress": 0.0,
+    }
+    analysis_id = partial_analysis_id(ctx)
+    if analysis_id is not None:
+        collection.replace_one({"_id": analysis_id}, partial_doc, upsert=True)
+    else:
+        analysis_id = collection.insert_one(partial_doc).inserted_id
+    ctx.update_task({"$set": {"progress": {"analysis_id": analysis_id, "percent": 0.0}}})
+
+    def on_batch(partial):
+        percent = round(100 * partial["processed_chunks"] / partial["total_chunks"], 1)
+        collection.update_one({"_id": analysis_id}, {
+            "$push": {"segments": {"$each": partial["segments"]}},
+            "$set": {
+                "overall": partial["overall"],
+                "ai_probability": round(partial["overall"]["prob_generated"] * 100, 2),
+                "progress": percent,
+            },
+        })
+        ctx.update_task({"$set": {"progress": {
+            "analysis_id": analysis_id,
+            "percent": percent,
+            "processed_chunks": partial["processed_chunks"],
+            "total_chunks": partial["total_chunks"],
+        }}})
+
+    try:
+        response, ai_prob_pct = helper_to_predict_streaming(text, tier=tier, on_batch=on_batch)
+    except Exception:
+        collection.delete_one({"_id": analysis_id})
+        raise
+
+    doc = build_analysis_doc(text, user_id, response, ai_prob_pct)
+    collection.update_one({"_id": analysis_id}, {"$set": doc, "$unset": {"partial": "", "progress": ""}})
+
+    return analysis_id, doc
+
+
+def task_batch(payloads: list[TaskPayload], ctx: TaskContext):
+    """
+    Micro-batched variant of `task` used by the cron worker when several analyze tasks are pending.
+
+    Cached texts are answered straight from the cache, the rest go through one batched model run,
+    and all documents are written with a single insert_many. Returns one entry per payload: the
+    inserted id, or the exception that failed that payload.
+    """
+    database = ctx.db.get_database(DB_NAME)
+    model_info = publish_model_info(database)
+
+    results: list = [None] * len(payloads)
+    docs = {}
+    pending = []
+    for position, payload in enumerate(payloads):
+        try:
+            text = payload["text"]
+            user_id = payload["user_id"]
+            tier = resolve_inference_tier(payload.get("tier"))["tier"]
+        except Exception as e:
+            results[position] = e
+            continue
+
+        cache_key = ai_text_cache_key(text, tier, model_info)
+        cached = text_result_cache.get(database, cache_key)
+        if cached is not None:
+            docs[position] = build_cached_doc(cached, user_id)
+        else:
+            pending.append((position, text, user_id, tier, cache_key))
+
+    if pending:
+        try:
+            predictions = helper_to_predict_batch(
+                [text for _, text, _, _, _ in pending],
+                [tier for _, _, _, tier, _ in pending],
+            )
+        except Exception:
+            # One bad text shouldn't fail the whole batch, so fall back to processing them one by one
+            for position, _, _, _, _ in pending:
+                try:
+                    results[position] = task(payloads[position], ctx)
+                except Exception as e:
+                    results[position] = e
+            predictions = None
+
+        if predictions is not None:
+            for (position, text, user_id, _, cache_key), (response, ai_prob_pct) in zip(pending, predictions):
+                doc = build_analysis_doc(text, user_id, response, ai_prob_pct)
+                text_result_cache.put(database, cache_key, {field: doc[field] for field in CACHED_FIELDS})
+                docs[position] = doc
+
+    if docs:
+        positions = list(docs)
+        inserted = database[COL_ANALYSIS_AI_TEXT].insert_many([docs[position] for position in positions])
+        for position, inserted_id in zip(positions, inserted.inserted_ids):
+            results[position] = inserted_id
+
+    return results
+
+
+def build_analysis_doc(text, user_id, response, ai_prob_pct):
+    return {
         "text": text,
         "ai_probability": ai_prob_pct,
         "user_id": user_id,
         "timestamp": datetime.utcnow(),
         "segments": response.get("segments") if response else None,
         "overall": response.get("overall") if response else None,
+        "inference_tier": response.get("inference_tier") if response else None,
         "action": "text_analysis"
     }
-    result = collection.insert_one(doc)
 
-    return result.inserted_id
+
+def build_cached_doc(cached, user_id):
+    return {
+        **cached,
+        "user_id": user_id,
+        "timestamp": datetime.utcnow(),
+        "action": "text_analysis",
+        "cache_hit": True,
+    }
 
 
 print("Loading NLP model artifacts...")
 try:
-    load_model_artifacts()
+    load_inference_artifacts()
     print("NLP model artifacts loaded successfully.")
 except Exception as e:
     print(f"Error loading NLP model artifacts: {e}")
@@ -6,21 +6,26 @@ from .detector.config import (
 )
 from .detector.data import EssayDataset, create_dataloaders as _create_dataloaders, prepare_splits as _prepare_splits
 from .detector.evaluation import evaluate_model, evaluate_saved_model
-from .detector.inference import predict_proba, predict_segmented_text
+from .detector.inference import predict_proba, predict_segmented_text, predict_segmented_text_streaming, predict_segmented_texts
 from .detector.model_utils import get_device as _device, load_model_artifacts
+from .detector.onnx_backend import export_onnx
 from .detector.reporting import plot_confusion_matrix as _plot_confusion_matrix, save_metrics as _save_metrics
-from .detector.training import TrainingArtifacts, train_model
+from .detector.training import TrainingArtifacts, distill_model, train_model
 
 __all__ = [
   "DEFAULT_DATA_PATH",
   "DEFAULT_MODEL_PATH",
   "EssayDataset",
   "TrainingArtifacts",
+  "distill_model",
   "evaluate_model",
   "evaluate_saved_model",
+  "export_onnx",
   "load_model_artifacts",
   "main",
   "predict_proba",
   "predict_segmented_text",
+  "predict_segmented_text_streaming",
+  "predict_segmented_texts",
   "train_model"
 ]
@@ -0,0 +1,72 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable
+
+import torch
+
+# Pola wyniku run_model_inference zapisywane per segment
+CHUNK_RESULT_FIELDS = ("mean_logits", "mean_probs", "raw_mean_probs", "std_probs", "entropy", "variation", "passes")
+
+
+def chunk_cache_key(text: str, model_identity: str, params: Dict[str, object]) -> str:
+    digest = hashlib.sha256()
+    digest.update(text.encode("utf-8"))
+    digest.update(b"\x00")
+    digest.update(model_identity.encode("utf-8"))
+    digest.update(b"\x00")
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ChunkResultCache:
+    """
+    LRU cache of per-chunk inference rows (one row of every field in CHUNK_RESULT_FIELDS, on CPU).
+
+    Overlapping windows of an edited document are mostly identical to the previous run, so only
+    chunks that were never seen with the same model and inference params have to go through the model.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._rows: "OrderedDict[str, Dict[str, torch.Tensor]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Dict[str, torch.Tensor] | None:
+        with self._lock:
+            row = self._rows.get(key)
+            if row is None:
+                self.misses += 1
+                return None
+            self._rows.move_to_end(key)
+            self.hits += 1
+            return row
+
+    def put_rows(self, keys: Iterable[str], inference: Dict[str, torch.Tensor]) -> None:
+        if self.maxsize <= 0:
+            return
+        cpu = {field: inference[field].detach().cpu() for field in CHUNK_RESULT_FIELDS}
+        with self._lock:
+            for idx, key in enumerate(keys):
+                # clone(): pojedynczy wiersz nie może trzymać przy życiu całego tensora batcha
+                self._rows[key] = {field: values[idx].clone() for field, values in cpu.items()}
+                self._rows.move_to_end(key)
+            while len(self._rows) > self.maxsize:
+                self._rows.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._rows.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": len(self._rows), "hits": self.hits, "misses": self.misses}
+
+
+def stack_rows(rows: list[Dict[str, torch.Tensor]]) -> Dict[str, torch.Tensor]:
+    return {field: torch.stack([row[field] for row in rows]) for field in CHUNK_RESULT_FIELDS}
@@ -1,13 +1,22 @@
 import re
+from array import array
+from bisect import bisect_left, bisect_right
 from dataclasses import dataclass
-from typing import Iterable, List
+from typing import List
 
 @dataclass(frozen=True, slots=True)
-class WordSpan:
-	index: int
-	start: int
-	end: int
-	is_sentence_end: bool
+class WordOffsets:
+	"""
+	Char offsets of all words of a text in flat arrays, instead of one object per word.
+	``sentence_cuts`` holds sorted word indices right after a sentence-ending word, i.e. the
+	places where a chunk may end on a sentence boundary.
+	"""
+	starts: array
+	ends: array
+	sentence_cuts: array
+
+	def __len__(self) -> int:
+		return len(self.starts)
 
 @dataclass(frozen=True, slots=True)
 class TextChunk:
@@ -20,63 +29,93 @@ class TextChunk:
 	word_count: int
 
 _WORD_PATTERN = re.compile(r"\S+")
-_SENTENCE_END_PATTERN = re.compile(r'[.!?]+["\')\]]*$')
-
-def iter_word_spans(text: str) -> Iterable[WordSpan]:
-	for idx, match in enumerate(_WORD_PATTERN.finditer(text)):
-		word_text = match.group()
-		is_end = bool(_SENTENCE_END_PATTERN.search(word_text))
-		yield WordSpan(index=idx, start=match.start(), end=match.end(), is_sentence_end=is_end)
-
-def find_nearest_sentence_boundary(spans: List[WordSpan], target_idx: int, 
+# Koniec słowa kończącego zdanie, szukany w całym tekście naraz zamiast osobno w każdym słowie
+_SENTENCE_END_PATTERN = re.compile(r'[.!?]+["\')\]]*(?!\S)')
+# Cięcie na granicy zdania nie może skrócić chunka poniżej tej części budżetu tokenów
+_TOKEN_SNAP_MIN_FILL = 0.75
+
+def word_offsets(text: str) -> WordOffsets:
+	starts = array("q")
+	ends = array("q")
+	for match in _WORD_PATTERN.finditer(text):
+		starts.append(match.start())
+		ends.append(match.end())
+
+	sentence_cuts = array("q")
+	for match in _SENTENCE_END_PATTERN.finditer(text):
+		# Dopasowanie kończy się razem ze słowem, więc jego koniec jest w ``ends``
+		sentence_cuts.append(bisect_left(ends, match.end()) + 1)
+
+	return WordOffsets(starts=starts, ends=ends, sentence_cuts=sentence_cuts)
+
+def find_nearest_sentence_boundary(words: WordOffsets, target_idx: int,
 	min_idx: int, max_idx: int) -> int:
-	best_idx = -1
-	min_dist = float('inf')
-
-	search_start = max(min_idx, 0)
-	search_end = min(max_idx, len(spans))
-
-	for i in range(search_start, search_end):
-		if spans[i].is_sentence_end:
-			cut_point = i + 1
-			dist = abs(cut_point - target_idx)
-			if dist < min_dist:
-				min_dist = dist
-				best_idx = cut_point
-			elif dist == min_dist:
-				best_idx = max(best_idx, cut_point)
-	
-	return best_idx if best_idx != -1 else target_idx
+	"""
+	Sentence cut nearest to ``target_idx`` after one of the words ``min_idx..max_idx - 1``
+	(the later one on a tie), or ``target_idx`` when there is none.
+	"""
+	cuts = words.sentence_cuts
+	lo = bisect_left(cuts, max(min_idx, 0) + 1)
+	hi = bisect_right(cuts, min(max_idx, len(words)))
+	if lo >= hi:
+		return target_idx
+
+	pos = bisect_left(cuts, target_idx, lo, hi)
+	if pos == hi:
+		return cuts[hi - 1]
+	if pos == lo:
+		return cuts[lo]
+
+	before, after = cuts[pos - 1], cuts[pos]
+	return after if after - target_idx <= target_idx - before else before
+
+def last_sentence_boundary(words: WordOffsets, min_cut: int, max_cut: int) -> int:
+	"""Latest sentence cut in ``min_cut..max_cut``, or -1."""
+	cuts = words.sentence_cuts
+	pos = bisect_right(cuts, max_cut) - 1
+	return cuts[pos] if pos >= 0 and cuts[pos] >= min_cut else -1
+
+def _make_chunk(text: str, words: WordOffsets, index: int, word_start: int, word_end: int) -> TextChunk:
+	start_char = words.starts[word_start]
+	end_char = words.ends[word_end - 1]
+	return TextChunk(
+		index=index,
+		start=start_char,
+		end=end_char,
+		text=text[start_char:end_char],
+		word_start=word_start,
+		word_end=word_end,
+		word_count=word_end - word_start
+	)
 
 def build_chunks(text: str, *, words_per_chunk: int, stride_words: int | None = None,
 	min_words: int = 1) -> List[TextChunk]:
-	
+
 	if words_per_chunk <= 0:
 		raise ValueError("words_per_chunk must be positive")
 
 	resolved_stride = stride_words if stride_words is not None else words_per_chunk
 	resolved_stride = max(1, resolved_stride)
 
-	spans = list(iter_word_spans(text))
-	total_words = len(spans)
-	
-	if not spans:
+	words = word_offsets(text)
+	total_words = len(words)
+
+	if not total_words:
 		return []
 
 	chunks: List[TextChunk] = []
 	current_word_idx = 0
-	chunk_index = 0
-	
-	search_window = max(3, int(words_per_chunk * 0.25)) 
+
+	search_window = max(3, int(words_per_chunk * 0.25))
 
 	while current_word_idx < total_words:
 		target_end = current_word_idx + words_per_chunk
 		words_remaining_after = total_words - target_end
 		tail_threshold = max(min_words, int(words_per_chunk * 0.5)) # procent "toleracji" długości ostatniego chunka
-		
+
 		if words_remaining_after < tail_threshold and words_remaining_after > 0:
 			target_end = total_words
-			search_window_start = target_end - search_window 
+			search_window_start = target_end - search_window
 			search_window_end = total_words
 		else:
 			search_window_start = target_end - search_window
@@ -84,11 +123,11 @@ def build_chunks(text: str, *, words_per_chunk: int, stride_words: int | None =
 
 		safe_min_idx = current_word_idx + min_words
 		actual_min_search = max(safe_min_idx, search_window_start)
-		
+
 		cut_idx = find_nearest_sentence_boundary(
-			spans, 
-			target_idx=target_end, 
-			min_idx=actual_min_search, 
+			words,
+			target_idx=target_end,
+			min_idx=actual_min_search,
 			max_idx=search_window_end
 		)
 
@@ -96,20 +135,7 @@ def build_chunks(text: str, *, words_per_chunk: int, stride_words: int | None =
 		if cut_idx <= current_word_idx:
 			cut_idx = min(current_word_idx + words_per_chunk, total_words)
 
-		start_char = spans[current_word_idx].start
-		end_char = spans[cut_idx - 1].end
-		chunk_text = text[start_char:end_char]
-
-		chunks.append(TextChunk(
-			index=chunk_index,
-			start=start_char,
-			end=end_char,
-			text=chunk_text,
-			word_start=current_word_idx,
-			word_end=cut_idx,
-			word_count=cut_idx - current_word_idx
-		))
-		chunk_index += 1
+		chunks.append(_make_chunk(text, words, len(chunks), current_word_idx, cut_idx))
 
 		if cut_idx >= total_words:
 			break
@@ -117,13 +143,101 @@ def build_chunks(text: str, *, words_per_chunk: int, stride_words: int | None =
 		next_target_start = current_word_idx + resolved_stride
 		if resolved_stride < words_per_chunk:
 			smart_next_start = find_nearest_sentence_boundary(
-				spans,
+				words,
 				target_idx=next_target_start,
-				min_idx=current_word_idx + 1, 
+				min_idx=current_word_idx + 1,
 				max_idx=next_target_start + search_window
 			)
 			current_word_idx = smart_next_start
 		else:
 			current_word_idx = cut_idx
 
-	return chunks
\ No newline at end of file
+	return chunks
+
+def word_token_prefix(text: str, words: WordOffsets, tokenizer) -> array:
+	"""
+	Prefix sums of token counts per word: ``prefix[j] - prefix[i]`` tokens cover words ``i..j-1``.
+	The text is tokenized once and tokens are assigned to words by their char offsets, so it needs
+	a fast tokenizer.
+	"""
+	# noinspection PyCallingNonCallable
+	encoded = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True, truncation=False)
+	prefix = array("q", bytes(8 * (len(words) + 1)))
+
+	ends = words.ends
+	last_word = len(words) - 1
+	word_idx = 0
+	for token_start, token_end in encoded["offset_mapping"]:
+		if token_end <= token_start:
+			continue
+		while word_idx < last_word and ends[word_idx] <= token_start:
+			word_idx += 1
+		prefix[word_idx + 1] += 1
+
+	for idx in range(1, len(prefix)):
+		prefix[idx] += prefix[idx - 1]
+	return prefix
+
+def build_token_chunks(text: str, tokenizer, *, max_tokens: int, stride_tokens: int | None = None,
+	min_words: int = 1) -> List[TextChunk]:
+	"""
+	Chunks filled up to ``max_tokens`` model tokens (special tokens included) instead of a fixed
+	word count. A chunk ends on the last sentence end that keeps it at least ``_TOKEN_SNAP_MIN_FILL``
+	of the budget, otherwise on the last word that fits. Chunk boundaries stay on words, so the
+	char offsets are the same kind as from ``build_chunks``.
+	"""
+	budget = max_tokens - tokenizer.num_special_tokens_to_add(pair=False)
+	if budget <= 0:
+		raise ValueError("max_tokens must leave room for the special tokens")
+
+	resolved_stride = stride_tokens if stride_tokens is not None else budget
+	resolved_stride = max(1, min(resolved_stride, budget))
+
+	words = word_offsets(text)
+	total_words = len(words)
+
+	if not total_words:
+		return []
+
+	prefix = word_token_prefix(text, words, tokenizer)
+	min_fill = int(budget * _TOKEN_SNAP_MIN_FILL)
+
+	chunks: List[TextChunk] = []
+	current_word_idx = 0
+
+	while current_word_idx < total_words:
+		if chunks and total_words - current_word_idx < min_words:
+			# Zbyt krótki ogon - ostatni chunk to pełny budżet kończący się na końcu tekstu
+			tail_start = bisect_left(prefix, prefix[total_words] - budget)
+			current_word_idx = max(chunks[-1].word_start + 1, min(tail_start, current_word_idx))
+
+		start_tokens = prefix[current_word_idx]
+		# Najdalszy koniec mieszczący się w budżecie (co najmniej jedno słowo, nawet zbyt długie)
+		cut_idx = bisect_right(prefix, start_tokens + budget) - 1
+		cut_idx = min(max(cut_idx, current_word_idx + 1), total_words)
+
+		if cut_idx < total_words:
+			fill_floor = max(current_word_idx + min_words, bisect_left(prefix, start_tokens + min_fill))
+			sentence_cut = last_sentence_boundary(words, fill_floor, cut_idx)
+			if sentence_cut != -1:
+				cut_idx = sentence_cut
+
+		chunks.append(_make_chunk(text, words, len(chunks), current_word_idx, cut_idx))
+
+		if cut_idx >= total_words:
+			break
+
+		if resolved_stride < budget:
+			next_target_start = bisect_left(prefix, start_tokens + resolved_stride)
+			search_window = max(3, int((cut_idx - current_word_idx) * 0.25))
+			next_start = find_nearest_sentence_boundary(
+				words,
+				target_idx=next_target_start,
+				min_idx=max(current_word_idx, next_target_start - search_window),
+				max_idx=min(cut_idx, next_target_start + search_window)
+			)
+			current_word_idx = min(max(next_start, current_word_idx + 1), cut_idx)
+		else:
+			current_word_idx = cut_idx
+
+	return chunks
@@ -3,17 +3,45 @@ from pathlib import Path
 
 from .evaluation import evaluate_saved_model
 from .inference import predict_proba, predict_segmented_text
-from .training import train_model
+from .onnx_backend import export_onnx
+from .training import distill_model, train_model
 from .config import (
 	DEFAULT_DATA_PATH,
+	DEFAULT_INFERENCE_TIER,
 	DEFAULT_MODEL_PATH,
+	DISTILL_ALPHA,
+	DISTILL_TEMPERATURE,
+	INFERENCE_TIERS,
+	ONNX_MODEL_PATH,
+	ONNX_OPSET,
 	SEGMENT_AI_THRESHOLD,
+	SEGMENT_CASCADE,
+	SEGMENT_CHUNKING,
+	SEGMENT_CHUNKING_MODES,
 	SEGMENT_HUMAN_THRESHOLD,
 	SEGMENT_MIN_WORDS,
 	SEGMENT_STRIDE_WORDS,
 	SEGMENT_WORD_TARGET,
+	STUDENT_MODEL_PATH,
+	STUDENT_NUM_LAYERS,
 )
 
+def _print_training_artifacts(artifacts, training_duration: float) -> None:
+	print(f"Training finished after {training_duration:.2f} seconds. Artifacts saved to:")
+	print(f"  - run: {artifacts.run_name}")
+	print(f"  - model: {artifacts.model_path}")
+	print(f"  - metrics: {artifacts.metrics_path}")
+	print(f"  - confusion matrix: {artifacts.confusion_matrix_path}")
+	print(f"  - params: {artifacts.params_path}")
+	print(f"  - dataset stats: {artifacts.dataset_stats_path}")
+	print(f"  - length metrics: {artifacts.length_metrics_path}")
+	if artifacts.fails_path:
+		print(f"  - fails: {artifacts.fails_path}")
+	print(f"  - calibration params: {artifacts.calibration_path}")
+	print(f"  - calibration metrics: {artifacts.calibration_metrics_path}")
+	print(f"  - fitted temperature: {artifacts.temperature:.4f}")
+	print(f"  - report dir: {artifacts.report_dir}")
+
 def _cli_train(args: argparse.Namespace) -> None:
 	start_time = time.time()
 	artifacts = train_model(
@@ -32,21 +60,32 @@ def _cli_train(args: argparse.Namespace) -> None:
 		confusion_matrix_path=args.confusion_matrix_path,
 		run_name=args.run_name
 	)
-	training_duration = time.time() - start_time
-	print(f"Training finished after {training_duration:.2f} seconds. Artifacts saved to:")
-	print(f"  - run: {artifacts.run_name}")
-	print(f"  - model: {artifacts.model_path}")
-	print(f"  - metrics: {artifacts.metrics_path}")
-	print(f"  - confusion matrix: {artifacts.confusion_matrix_path}")
-	print(f"  - params: {artifacts.params_path}")
-	print(f"  - dataset stats: {artifacts.dataset_stats_path}")
-	print(f"  - length metrics: {artifacts.length_metrics_path}")
-	if artifacts.fails_path:
-		print(f"  - fails: {artifacts.fails_path}")
-	print(f"  - calibration params: {artifacts.calibration_path}")
-	print(f"  - calibration metrics: {artifacts.calibration_metrics_path}")
-	print(f"  - fitted temperature: {artifacts.temperature:.4f}")
-	print(f"  - report dir: {artifacts.report_dir}")
+	_print_training_artifacts(artifacts, time.time() - start_time)
+
+def _cli_distill(args: argparse.Namespace) -> None:
+	start_time = time.time()
+	artifacts = distill_model(
+		data_path=args.data_path,
+		teacher_model_path=args.model_path,
+		student_model_name=args.student_model_name,
+		student_layers=args.student_layers,
+		distill_temperature=args.distill_temperature,
+		alpha=args.distill_alpha,
+		epochs=args.epochs,
+		batch_size=args.batch_size,
+		learning_rate=args.learning_rate,
+		weight_decay=args.weight_decay,
+		warmup_ratio=args.warmup_ratio,
+		max_length=args.max_length,
+		test_size=args.test_size,
+		calibration_size=args.calibration_size,
+		random_state=args.random_state,
+		output_model_path=args.output_model_path,
+		metrics_path=args.metrics_path,
+		confusion_matrix_path=args.confusion_matrix_path,
+		run_name=args.run_name
+	)
+	_print_training_artifacts(artifacts, time.time() - start_time)
      
 def _cli_evaluate(args: argparse.Namespace) -> None:
 	metrics = evaluate_saved_model(
@@ -78,13 +117,17 @@ def _cli_predict(args: argparse.Namespace) -> None:
 			stride_words=stride_value,
 			min_words=args.segment_min_words,
 			max_length=args.segment_max_length,
+			chunking=args.segment_chunking,
+			cascade=args.cascade,
+			student_model_path=args.student_model_path,
 			ai_threshold=args.segment_ai_threshold,
 			human_threshold=args.segment_human_threshold,
+			tier=args.tier,
 		)
 		print(json.dumps(result, indent=2, ensure_ascii=False))
 		return
 
-	scores = predict_proba(args.text, model_path=args.model_path, return_details=True)
+	scores = predict_proba(args.text, model_path=args.model_path, return_details=True, tier=args.tier)
 	response = {
 		"text": args.text,
 		"ai_probability": scores["prob_generated"],
@@ -101,15 +144,28 @@ def _cli_predict(args: argparse.Namespace) -> None:
 			"mc_dropout_passes": scores["mc_dropout_passes"],
 			"temperature": scores["temperature"],
 		},
+		"inference_tier": scores["inference_tier"],
 	}
 	print(json.dumps(response, indent=2, ensure_ascii=False))
 
+def _cli_export(args: argparse.Namespace) -> None:
+	start_time = time.time()
+	result = export_onnx(
+		model_path=args.model_path,
+		output_path=args.onnx_path,
+		quantize=args.quantize,
+		mc_dropout=args.mc_dropout,
+		opset=args.opset,
+	)
+	result["duration_sec"] = round(time.time() - start_time, 2)
+	print(json.dumps(result, indent=2))
+
 def build_parser() -> argparse.ArgumentParser:
 	parser = argparse.ArgumentParser(description="NLP pipeline utilities")
-	parser.add_argument("command", choices=["train", "evaluate", "predict"], help="Operation to perform")
+	parser.add_argument("command", choices=["train", "distill", "evaluate", "predict", "export"], help="Operation to perform")
 	parser.add_argument("--data-path", default=DEFAULT_DATA_PATH, type=Path, help="Ścieżka do zbioru danych")
-	parser.add_argument("--model-path", default=DEFAULT_MODEL_PATH, type=Path, help="Ścieżka do modelu")
-	parser.add_argument("--output-model-path", default=None, type=Path, help="Ścieżka zapisu nowego modelu (tylko train)")
+	parser.add_argument("--model-path", default=DEFAULT_MODEL_PATH, type=Path, help="Ścieżka do modelu (w distill: model nauczyciela)")
+	parser.add_argument("--output-model-path", default=None, type=Path, help="Ścieżka zapisu nowego modelu (train, distill)")
 	parser.add_argument("--metrics-path", default=None, type=Path, help="Ścieżka do metryk")
 	parser.add_argument("--confusion-matrix-path", default=None, type=Path, help="Ścieżka do wykresu macierzy pomyłek")
 	parser.add_argument("--epochs", type=int, default=3, help="Liczba epok treningowych")
@@ -129,8 +185,20 @@ def build_parser() -> argparse.ArgumentParser:
 	parser.add_argument("--segment-stride-words", type=int, default=SEGMENT_STRIDE_WORDS, help="Krok przesuwny między segmentami (predict --detailed)")
 	parser.add_argument("--segment-min-words", type=int, default=SEGMENT_MIN_WORDS, help="Minimalna liczba słów w segmencie (predict --detailed)")
 	parser.add_argument("--segment-max-length", type=int, default=128, help="Maksymalna długość tokenów na segment (predict --detailed)")
+	parser.add_argument("--segment-chunking", choices=SEGMENT_CHUNKING_MODES, default=SEGMENT_CHUNKING, help="Podział na segmenty: po słowach lub wypełnienie do max_length tokenów (predict --detailed)")
 	parser.add_argument("--segment-ai-threshold", type=float, default=SEGMENT_AI_THRESHOLD, help="Próg uznania segmentu za AI (predict --detailed)")
+	parser.add_argument("--tier", choices=list(INFERENCE_TIERS), default=DEFAULT_INFERENCE_TIER, help="Tryb inferencji: fast (1 przebieg), standard (MC dropout), thorough (predict)")
 	parser.add_argument("--segment-human-threshold", type=float, default=SEGMENT_HUMAN_THRESHOLD, help="Próg uznania segmentu za human (predict --detailed)")
+	parser.add_argument("--cascade", action=argparse.BooleanOptionalAction, default=SEGMENT_CASCADE, help="Kaskada: mały model studenta ocenia segmenty, niepewne trafiają do pełnego modelu (predict --detailed)")
+	parser.add_argument("--student-model-path", default=STUDENT_MODEL_PATH, type=Path, help="Ścieżka do modelu studenta dla kaskady (predict --detailed)")
+	parser.add_argument("--student-model-name", type=str, default=None, help="Gotowy mały model HF zamiast kopii nauczyciela z mniejszą liczbą warstw, musi mieć ten sam tokenizer (tylko distill)")
+	parser.add_argument("--student-layers", type=int, default=STUDENT_NUM_LAYERS, help="Liczba warstw enkodera studenta (tylko distill)")
+	parser.add_argument("--distill-temperature", type=float, default=DISTILL_TEMPERATURE, help="Temperatura zmiękczenia logitów nauczyciela (tylko distill)")
+	parser.add_argument("--distill-alpha", type=float, default=DISTILL_ALPHA, help="Waga straty destylacyjnej względem straty na etykietach (tylko distill)")
+	parser.add_argument("--onnx-path", default=ONNX_MODEL_PATH, type=Path, help="Ścieżka zapisu modelu ONNX (tylko export)")
+	parser.add_argument("--quantize", action="store_true", help="Zapisz dodatkowo model INT8 (*.int8.onnx) (tylko export)")
+	parser.add_argument("--mc-dropout", action="store_true", help="Zachowaj dropout w grafie dla trybów MC dropout (tylko export)")
+	parser.add_argument("--opset", type=int, default=ONNX_OPSET, help="Wersja opset ONNX (tylko export)")
 
 	return parser
 
@@ -138,12 +206,16 @@ def dispatch_cli(args: argparse.Namespace) -> None:
 	command = args.command
 	if command == "train":
 		_cli_train(args)
+	elif command == "distill":
+		_cli_distill(args)
 	elif command == "evaluate":
 		_cli_evaluate(args)
 	elif command == "predict":
 		if not args.text:
 			raise ValueError("Provide --text for predict command")
 		_cli_predict(args)
+	elif command == "export":
+		_cli_export(args)
 	else:
 		raise ValueError(f"Unknown command: {command}")
 
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parents[1]
@@ -18,11 +19,59 @@ else:
 
 DEFAULT_DATA_PATH = DATA_DIR / "Training_Essay_Data.csv"
 DEFAULT_MODEL_PATH = MODEL_DIR / "roberta_finetuned.pt"
+DEFAULT_ONNX_PATH = MODEL_DIR / "roberta_finetuned.onnx"
+DEFAULT_STUDENT_PATH = MODEL_DIR / "roberta_student.pt"
+
+# Backend inferencji: "torch" (PyTorch eager) lub "onnx" (ONNX Runtime, model z polecenia export)
+INFERENCE_BACKENDS = ("torch", "onnx")
+INFERENCE_BACKEND = os.getenv("NLP_INFERENCE_BACKEND", "torch")
+ONNX_MODEL_PATH = Path(os.getenv("NLP_ONNX_MODEL_PATH", str(DEFAULT_ONNX_PATH)))
+# Wątki ONNX Runtime na sesję; 0 = tyle, ile rdzeni jest dostępnych dla procesu
+ONNX_INTRA_OP_THREADS = int(os.getenv("NLP_ONNX_THREADS", "0"))
+ONNX_OPSET = 17
+
+# Kaskada: destylowany student ocenia każdy segment, pełny model (MC dropout) dostaje tylko segmenty niepewne
+SEGMENT_CASCADE = os.getenv("NLP_CASCADE", "false").lower() == "true"
+STUDENT_MODEL_PATH = Path(os.getenv("NLP_STUDENT_MODEL_PATH", str(DEFAULT_STUDENT_PATH)))
+# Domyślny student = tyle warstw nauczyciela (równomiernie wybranych, z jego wagami); alternatywnie np. distilroberta-base
+STUDENT_NUM_LAYERS = 4
+DISTILL_TEMPERATURE = 2.0
+# Waga straty destylacji (KL do miękkich logitów nauczyciela) względem cross-entropy z etykietami
+DISTILL_ALPHA = 0.5
 
 SEGMENT_WORD_TARGET = 50
 SEGMENT_STRIDE_WORDS = 25
 SEGMENT_MIN_WORDS = 10
+# Podział na segmenty: "words" = stała liczba słów, "tokens" = segmenty wypełnione do max_length tokenów
+SEGMENT_CHUNKING_MODES = ("words", "tokens")
+SEGMENT_CHUNKING = "words"
 SEGMENT_AI_THRESHOLD = 0.65
 SEGMENT_HUMAN_THRESHOLD = 0.35
 
+MC_DROPOUT_PASSES = 16
+MC_DROPOUT_SEED = 42
+# Maksymalna liczba wierszy (segment x przebieg) w jednym forward passie MC dropout
+MC_DROPOUT_MAX_BATCH_ROWS = 256
+# Wiersze o podobnej długości trafiają do wspólnego kubełka; limit tokenów (z paddingiem) na kubełek
+INFERENCE_BATCH_MAX_TOKENS = 8192
+# Adaptacyjny MC dropout (opcjonalny): przebiegi w grupach, stop gdy błąd standardowy prob_generated <= tolerancja
+MC_DROPOUT_ADAPTIVE = os.getenv("NLP_MC_DROPOUT_ADAPTIVE", "false").lower() == "true"
+MC_DROPOUT_MIN_PASSES = 4
+MC_DROPOUT_PASS_GROUP = 4
+MC_DROPOUT_TOLERANCE = 0.01
+
+# Tryby inferencji: fast = jeden deterministyczny przebieg (eval), standard = MC dropout, thorough = więcej przebiegów
+INFERENCE_TIERS = {
+  "fast": {"mc_dropout": False, "passes": 1, "adaptive": False},
+  "standard": {"mc_dropout": True, "passes": MC_DROPOUT_PASSES, "adaptive": MC_DROPOUT_ADAPTIVE},
+  "thorough": {"mc_dropout": True, "passes": 32, "adaptive": False},
+}
+DEFAULT_INFERENCE_TIER = "standard"
+
+# Cache wyników per segment (LRU w pamięci procesu) - przy edycji dokumentu większość okien się nie zmienia
+CHUNK_CACHE_SIZE = 20000
+
+# Tryb strumieniowy: liczba segmentów na jeden przebieg modelu, po każdym zapisywane są wyniki częściowe
+STREAM_CHUNK_BATCH_SIZE = 8
+
 #Docelowo można by tutaj umieścić python-dotenv /tylko to chyba dopiero przy pełnej implementacji mikroserwisu
\ No newline at end of file
@@ -7,10 +7,10 @@ from sklearn.metrics import accuracy_score, classification_report, confusion_mat
 from sklearn.model_selection import train_test_split
 from torch.utils.data import DataLoader
 
-from .config import DEFAULT_DATA_PATH, DEFAULT_MODEL_PATH
+from .config import DEFAULT_DATA_PATH, DEFAULT_MODEL_PATH, INFERENCE_BATCH_MAX_TOKENS, MC_DROPOUT_PASSES
 from .data import EssayDataset
 from .model_utils import get_device, load_model_artifacts
-from .inference import run_model_inference
+from .inference import run_bucketed_inference
 
 def evaluate_model(
 	model: torch.nn.Module,
@@ -18,6 +18,7 @@ def evaluate_model(
 	*,
 	device: torch.device,
 	temperature: float | None = None,
+	max_batch_tokens: int | None = INFERENCE_BATCH_MAX_TOKENS,
 ) -> Dict[str, object]:
 	model.eval()
 	predictions: list[int] = []
@@ -41,9 +42,11 @@ def evaluate_model(
 				sample_ids_list = [None] * labels.shape[0]
 
 			inputs = {key: value for key, value in batch.items() if key not in {"labels", "sample_id"}}
-			inference = run_model_inference(
+			# Próbki z DataLoadera są dopełnione do max_length; kubełki obcinają padding przed MC dropout
+			inference = run_bucketed_inference(
 				model,
 				inputs,
+				max_batch_tokens=max_batch_tokens,
 				temperature=resolved_temperature,
 			)
 			mean_logits = inference["mean_logits"]
@@ -66,6 +69,7 @@ def evaluate_model(
 			std_probs_cpu = std_probs.detach().cpu()
 			entropy_cpu = entropy_values.detach().cpu()
 			variation_cpu = variation_values.detach().cpu()
+			passes_cpu = inference["passes"].detach().cpu()
 
 			for idx, (sid, true_label, pred_label) in enumerate(zip(sample_ids_list, target_batch, batch_predictions_list)):
 				record: Dict[str, object] = {
@@ -80,7 +84,7 @@ def evaluate_model(
 					"prob_entropy": float(entropy_cpu[idx]),
 					"prob_variation_ratio": float(variation_cpu[idx]),
 					"temperature": float(resolved_temperature),
-					"mc_dropout_passes": 16,
+					"mc_dropout_passes": int(passes_cpu[idx]),
 				}
 				if dataset_frame is not None and sid is not None:
 					text = dataset_frame.iloc[sid]["text"]
@@ -98,7 +102,7 @@ def evaluate_model(
 		"report": report,
 		"confusion_matrix": cm,
 		"records": prob_records,
-		"mc_dropout_passes": 16,
+		"mc_dropout_passes": MC_DROPOUT_PASSES,
 		"mc_dropout_enabled": True,
 	}
 
@@ -1,33 +1,113 @@
+from contextlib import nullcontext
 from pathlib import Path
-from typing import Dict, List
+from typing import Callable, Dict, List
 
 import torch
 import torch.nn.functional as F
 
-from .chunking import build_chunks
-from .model_utils import dropout_train_mode, load_model_artifacts
+from .chunk_cache import CHUNK_RESULT_FIELDS, ChunkResultCache, chunk_cache_key, stack_rows
+from .chunking import TextChunk, build_chunks, build_token_chunks
+from .model_utils import (
+    dropout_train_mode,
+    load_model_artifacts,
+    load_student_artifacts,
+    model_device,
+    model_identity,
+    model_inference_lock,
+)
+from .onnx_backend import load_onnx_artifacts, resolve_onnx_path
 from .config import (
+    CHUNK_CACHE_SIZE,
+    DEFAULT_INFERENCE_TIER,
     DEFAULT_MODEL_PATH,
+    INFERENCE_BACKEND,
+    INFERENCE_BACKENDS,
+    INFERENCE_BATCH_MAX_TOKENS,
+    INFERENCE_TIERS,
+    MC_DROPOUT_MAX_BATCH_ROWS,
+    MC_DROPOUT_MIN_PASSES,
+    MC_DROPOUT_PASS_GROUP,
+    MC_DROPOUT_PASSES,
+    MC_DROPOUT_SEED,
+    MC_DROPOUT_TOLERANCE,
     SEGMENT_AI_THRESHOLD,
+    SEGMENT_CASCADE,
+    SEGMENT_CHUNKING,
+    SEGMENT_CHUNKING_MODES,
     SEGMENT_HUMAN_THRESHOLD,
     SEGMENT_MIN_WORDS,
     SEGMENT_STRIDE_WORDS,
-    SEGMENT_WORD_TARGET
+    SEGMENT_WORD_TARGET,
+    STREAM_CHUNK_BATCH_SIZE,
+    STUDENT_MODEL_PATH
 )
 
 _PROB_EPS = 1e-12
 
+chunk_cache = ChunkResultCache(CHUNK_CACHE_SIZE)
+
 
 def _prob_entropy(probs: torch.Tensor) -> torch.Tensor:
     return -(probs * (probs + _PROB_EPS).log()).sum(dim=1)
 
 
-def _variation_ratio(predictions: torch.Tensor, num_classes: int) -> torch.Tensor:
-    if predictions.ndim < 2:
-        return torch.zeros(predictions.shape[-1], dtype=torch.float32, device=predictions.device)
-    frequencies = F.one_hot(predictions, num_classes=num_classes).float().mean(dim=0)
-    max_frequency = frequencies.max(dim=1).values
-    return 1.0 - max_frequency
+def _tile_encoded(encoded: Dict[str, torch.Tensor], replicas: int) -> Dict[str, torch.Tensor]:
+    # Układ "przebieg-major": wiersze [pass0: b0..bN, pass1: b0..bN, ...]
+    return {
+        key: value.repeat(replicas, *([1] * (value.ndim - 1)))
+        for key, value in encoded.items()
+    }
+
+
+def _mc_dropout_logits(
+        model: torch.nn.Module,
+        encoded: Dict[str, torch.Tensor],
+        *,
+        passes: int,
+        max_batch_rows: int | None,
+) -> torch.Tensor:
+    batch_size = next(iter(encoded.values())).shape[0]
+    if max_batch_rows is None or max_batch_rows <= 0:
+        passes_per_forward = passes
+    else:
+        passes_per_forward = max(1, min(passes, max_batch_rows // max(batch_size, 1)))
+
+    logit_groups: list[torch.Tensor] = []
+    done = 0
+    while done < passes:
+        replicas = min(passes_per_forward, passes - done)
+        tiled = _tile_encoded(encoded, replicas) if replicas > 1 else encoded
+        # Dropout losuje maskę per element, więc każda replika dostaje własną maskę
+        logits = model(**tiled).logits.detach()
+        logit_groups.append(logits.view(replicas, batch_size, -1))
+        done += replicas
+
+    return torch.cat(logit_groups, dim=0)
+
+
+def _masked_mean(values: torch.Tensor, mask: torch.Tensor, counts: torch.Tensor) -> torch.Tensor:
+    # values: (passes, batch, classes), mask: (passes, batch), counts: (batch,)
+    weights = mask.unsqueeze(-1).to(values.dtype)
+    return (values * weights).sum(dim=0) / counts.unsqueeze(-1).to(values.dtype)
+
+
+def _masked_std(values: torch.Tensor, mean: torch.Tensor, mask: torch.Tensor, counts: torch.Tensor) -> torch.Tensor:
+    weights = mask.unsqueeze(-1).to(values.dtype)
+    variance = (((values - mean.unsqueeze(0)) ** 2) * weights).sum(dim=0) / counts.unsqueeze(-1).to(values.dtype)
+    return variance.clamp(min=0.0).sqrt()
+
+
+def _converged_rows(
+        logits: torch.Tensor,
+        *,
+        temperature: float,
+        tolerance: float,
+) -> torch.Tensor:
+    # Błąd standardowy średniej prob_generated jako miara stabilności running mean
+    prob_generated = torch.softmax(logits / temperature, dim=2)[..., 1]
+    samples = prob_generated.shape[0]
+    std_error = prob_generated.std(dim=0, unbiased=False) / (samples ** 0.5)
+    return std_error <= tolerance
 
 
 def run_model_inference(
@@ -35,40 +115,81 @@ def run_model_inference(
         encoded: Dict[str, torch.Tensor],
         *,
         temperature: float,
+        passes: int = MC_DROPOUT_PASSES,
+        max_batch_rows: int | None = MC_DROPOUT_MAX_BATCH_ROWS,
+        seed: int = MC_DROPOUT_SEED,
+        adaptive: bool = False,
+        min_passes: int = MC_DROPOUT_MIN_PASSES,
+        pass_group: int = MC_DROPOUT_PASS_GROUP,
+        tolerance: float = MC_DROPOUT_TOLERANCE,
+        mc_dropout: bool = True,
 ) -> Dict[str, object]:
-    with torch.no_grad():
-        raw_prob_trials: list[torch.Tensor] = []
-        logit_trials: list[torch.Tensor] = []
-        prob_trials: list[torch.Tensor] = []
-        pred_trials: list[torch.Tensor] = []
-
-        with dropout_train_mode(model):
-            for pass_idx in range(16):
-                pass_seed = 42 + pass_idx
-                torch.manual_seed(pass_seed)
-
-                if torch.cuda.is_available():
-                    torch.cuda.manual_seed_all(pass_seed)
-
-                outputs = model(**encoded)
-                logits = outputs.logits.detach()
-                raw_prob_trials.append(torch.softmax(logits, dim=1))
-                calibrated_logits = (logits / temperature).detach()
-                logit_trials.append(calibrated_logits)
-                probs = torch.softmax(calibrated_logits, dim=1)
-                prob_trials.append(probs)
-                pred_trials.append(torch.argmax(probs, dim=1))
-
-        logits_tensor = torch.stack(logit_trials, dim=0)
-        probs_tensor = torch.stack(prob_trials, dim=0)
-        raw_probs_tensor = torch.stack(raw_prob_trials, dim=0)
-        mean_logits = logits_tensor.mean(dim=0)
-        mean_probs = probs_tensor.mean(dim=0)
-        std_probs = probs_tensor.std(dim=0, unbiased=False)
+    if passes <= 0:
+        raise ValueError("passes must be positive")
+    if not mc_dropout:
+        # Deterministyczny przebieg w trybie eval - wiele przebiegów dałoby identyczne logity
+        passes = 1
+        adaptive = False
+
+    batch_size = next(iter(encoded.values())).shape[0]
+    resolved_min_passes = max(1, min(min_passes, passes))
+    group_size = max(1, pass_group) if adaptive else passes
+
+    with model_inference_lock, torch.no_grad():
+        torch.manual_seed(seed)
+        if torch.cuda.is_available():
+            torch.cuda.manual_seed_all(seed)
+
+        device = next(iter(encoded.values())).device
+        raw_logits: torch.Tensor | None = None
+        pass_counts = torch.zeros(batch_size, dtype=torch.long, device=device)
+        active = torch.arange(batch_size, device=device)
+        done = 0
+
+        with dropout_train_mode(model) if mc_dropout else nullcontext():
+            while done < passes and active.numel() > 0:
+                step = min(group_size, passes - done)
+                if active.numel() == batch_size:
+                    active_encoded = encoded
+                else:
+                    active_encoded = {key: value[active] for key, value in encoded.items()}
+                group_logits = _mc_dropout_logits(
+                    model,
+                    active_encoded,
+                    passes=step,
+                    max_batch_rows=max_batch_rows,
+                )
+                if raw_logits is None:
+                    raw_logits = torch.zeros(
+                        (passes, batch_size, group_logits.shape[-1]),
+                        dtype=group_logits.dtype,
+                        device=group_logits.device,
+                    )
+                raw_logits[done:done + step, active] = group_logits
+                done += step
+                pass_counts[active] = done
+
+                if adaptive and done >= resolved_min_passes and done < passes:
+                    converged = _converged_rows(
+                        raw_logits[:done, active],
+                        temperature=temperature,
+                        tolerance=tolerance,
+                    )
+                    active = active[~converged]
+
+        raw_logits = raw_logits[:done]
+        pass_mask = torch.arange(done, device=device).unsqueeze(1) < pass_counts.unsqueeze(0)
+
+        logits_tensor = raw_logits / temperature
+        probs_tensor = torch.softmax(logits_tensor, dim=2)
+        raw_probs_tensor = torch.softmax(raw_logits, dim=2)
+        mean_logits = _masked_mean(logits_tensor, pass_mask, pass_counts)
+        mean_probs = _masked_mean(probs_tensor, pass_mask, pass_counts)
+        std_probs = _masked_std(probs_tensor, mean_probs, pass_mask, pass_counts)
         entropy_values = _prob_entropy(mean_probs)
-        pred_tensor = torch.stack(pred_trials, dim=0)
-        variation_values = _variation_ratio(pred_tensor, num_classes=mean_probs.shape[1])
-        raw_mean_probs = raw_probs_tensor.mean(dim=0)
+        pred_one_hot = F.one_hot(torch.argmax(probs_tensor, dim=2), num_classes=mean_probs.shape[1]).float()
+        variation_values = 1.0 - _masked_mean(pred_one_hot, pass_mask, pass_counts).max(dim=1).values
+        raw_mean_probs = _masked_mean(raw_probs_tensor, pass_mask, pass_counts)
 
     return {
         "mean_logits": mean_logits,
@@ -77,17 +198,146 @@ def run_model_inference(
         "std_probs": std_probs,
         "entropy": entropy_values,
         "variation": variation_values,
+        "passes": pass_counts,
     }
 
 
+def _length_buckets(lengths: List[int], max_batch_tokens: int) -> List[List[int]]:
+    # Rosnąco po długości, więc ostatni dodany wiersz wyznacza szerokość kubełka
+    buckets: List[List[int]] = []
+    current: List[int] = []
+    for idx in sorted(range(len(lengths)), key=lambda row: lengths[row]):
+        if current and (len(current) + 1) * lengths[idx] > max_batch_tokens:
+            buckets.append(current)
+            current = []
+        current.append(idx)
+    if current:
+        buckets.append(current)
+    return buckets
+
+
+def run_bucketed_inference(
+        model: torch.nn.Module,
+        encoded: Dict[str, torch.Tensor],
+        *,
+        max_batch_tokens: int | None = INFERENCE_BATCH_MAX_TOKENS,
+        **inference_kwargs,
+) -> Dict[str, object]:
+    """
+    ``run_model_inference`` over rows grouped by token length: each bucket holds at most
+    ``max_batch_tokens`` tokens and is cut to its own longest row, so one long row doesn't pad the
+    whole batch. Padding is masked out anyway, so only the scheduling changes; rows of the result
+    keep the order of ``encoded``.
+    """
+    attention_mask = encoded["attention_mask"]
+    lengths = attention_mask.sum(dim=1).tolist()
+    buckets = _length_buckets(lengths, max_batch_tokens) if max_batch_tokens else [list(range(len(lengths)))]
+
+    if len(buckets) == 1 and min(lengths, default=0) == attention_mask.shape[1]:
+        return run_model_inference(model, encoded, **inference_kwargs)
+
+    results = []
+    for bucket in buckets:
+        rows = torch.tensor(bucket, device=attention_mask.device)
+        # Kolumny z choć jednym prawdziwym tokenem - działa dla paddingu z prawej i z lewej
+        columns = attention_mask[rows].bool().any(dim=0)
+        bucket_encoded = {key: value[rows][:, columns] for key, value in encoded.items()}
+        results.append(run_model_inference(model, bucket_encoded, **inference_kwargs))
+
+    order = torch.tensor([idx for bucket in buckets for idx in bucket])
+    restore = torch.empty_like(order)
+    restore[order] = torch.arange(order.numel())
+
+    merged = {}
+    for key in results[0]:
+        values = torch.cat([result[key] for result in results])
+        merged[key] = values[restore.to(values.device)]
+    return merged
+
+
+def resolve_inference_tier(
+        tier: str | None = None,
+        *,
+        adaptive: bool | None = None,
+        max_passes: int | None = None,
+) -> Dict[str, object]:
+    resolved_tier = tier or DEFAULT_INFERENCE_TIER
+    if resolved_tier not in INFERENCE_TIERS:
+        raise ValueError(f"Unknown inference tier: {resolved_tier}. Expected one of: {', '.join(INFERENCE_TIERS)}")
+
+    settings = dict(INFERENCE_TIERS[resolved_tier])
+    if settings["mc_dropout"]:
+        if adaptive is not None:
+            settings["adaptive"] = adaptive
+        if max_passes is not None:
+            settings["passes"] = max_passes
+    settings["tier"] = resolved_tier
+    return settings
+
+
+def inference_backend(model_path: Path | str = DEFAULT_MODEL_PATH) -> str:
+    if Path(model_path).suffix == ".onnx":
+        return "onnx"
+    if INFERENCE_BACKEND not in INFERENCE_BACKENDS:
+        raise ValueError(f"Unknown inference backend: {INFERENCE_BACKEND}. Expected one of: {', '.join(INFERENCE_BACKENDS)}")
+    return INFERENCE_BACKEND
+
+
+def load_inference_artifacts(model_path: Path | str = DEFAULT_MODEL_PATH) -> tuple[object, torch.nn.Module]:
+    """Tokenizer and model of the configured backend: PyTorch checkpoint or exported ONNX model."""
+    if inference_backend(model_path) == "onnx":
+        return load_onnx_artifacts(model_path)
+    return load_model_artifacts(model_path)
+
+
+def inference_identity(model_path: Path | str = DEFAULT_MODEL_PATH) -> str:
+    """Identity of the model file that actually runs: the ONNX export with the onnx backend, else the checkpoint."""
+    if inference_backend(model_path) == "onnx":
+        return model_identity(resolve_onnx_path(model_path))
+    return model_identity(model_path)
+
+
+_cascade_warned: set[str] = set()
+
+
+def _cascade_enabled(cascade: bool, student_model_path: Path | str) -> bool:
+    if cascade and not Path(student_model_path).exists():
+        # Brak wytrenowanego studenta - wszystkie segmenty idą do pełnego modelu
+        if str(student_model_path) not in _cascade_warned:
+            _cascade_warned.add(str(student_model_path))
+            print(f"Cascade disabled: student model not found at {student_model_path}")
+        return False
+    return cascade
+
+
+def _supported_tier(tier_settings: Dict[str, object], model_path: Path | str) -> Dict[str, object]:
+    if tier_settings["mc_dropout"] and inference_backend(model_path) == "onnx":
+        _, model = load_inference_artifacts(model_path)
+        if not getattr(model, "supports_mc_dropout", True):
+            # Eksport ONNX bez dropoutu - zostaje jeden deterministyczny przebieg
+            return resolve_inference_tier("fast")
+    return tier_settings
+
+
+def effective_inference_tier(tier: str | None = None, model_path: Path | str = DEFAULT_MODEL_PATH) -> str:
+    """Tier that ``tier`` actually runs as with the configured backend (an ONNX export without dropout runs fast)."""
+    return _supported_tier(resolve_inference_tier(tier), model_path)["tier"]
+
+
 def predict_proba(
         text: str,
         model_path: Path | str = DEFAULT_MODEL_PATH,
         *,
-        return_details: bool = False
+        return_details: bool = False,
+        tier: str | None = None,
+        adaptive: bool | None = None,
+        min_passes: int = MC_DROPOUT_MIN_PASSES,
+        max_passes: int | None = None,
+        tolerance: float = MC_DROPOUT_TOLERANCE,
 ) -> float | Dict[str, float]:
-    tokenizer, model = load_model_artifacts(model_path)
-    device = next(model.parameters()).device
+    tier_settings = _supported_tier(resolve_inference_tier(tier, adaptive=adaptive, max_passes=max_passes), model_path)
+    tokenizer, model = load_inference_artifacts(model_path)
+    device = model_device(model)
     # noinspection PyCallingNonCallable
     encoded = tokenizer(
         text,
@@ -106,8 +356,12 @@ def predict_proba(
         model,
         encoded,
         temperature=temperature,
+        passes=tier_settings["passes"],
+        adaptive=tier_settings["adaptive"],
+        min_passes=min_passes,
+        tolerance=tolerance,
+        mc_dropout=tier_settings["mc_dropout"],
     )
-    mean_logits = inference["mean_logits"]
     mean_probs = inference["mean_probs"]
     raw_mean_probs = inference["raw_mean_probs"]
     std_probs = inference["std_probs"]
@@ -132,103 +386,37 @@ def predict_proba(
         "prob_human_std": float(std_probs[0, 0].detach().cpu().item()),
         "prob_entropy": entropy_value,
         "prob_variation_ratio": variation_value,
-        "mc_dropout_passes": 16,
+        "mc_dropout_passes": int(inference["passes"][0].item()) if tier_settings["mc_dropout"] else 0,
+        "inference_tier": tier_settings["tier"],
         "temperature": float(temperature),
     }
 
 
-def predict_segmented_text(
-        text: str,
-        model_path: Path | str = DEFAULT_MODEL_PATH,
-        *,
-        words_per_chunk: int = SEGMENT_WORD_TARGET,
-        stride_words: int | None = SEGMENT_STRIDE_WORDS,
-        min_words: int = SEGMENT_MIN_WORDS,
-        max_length: int = 128,
-        ai_threshold: float = SEGMENT_AI_THRESHOLD,
-        human_threshold: float = SEGMENT_HUMAN_THRESHOLD,
-) -> Dict[str, object]:
-    if ai_threshold <= human_threshold:
-        raise ValueError("ai_threshold must be greater than human_threshold")
-    if not text.strip():
-        return {
-            "overall": {
-                "prob_generated": 0.0,
-                "prob_human": 1.0,
-                "label": "human",
-                "confidence": 1.0,
-            },
-            "segments": [],
-            "params": {
-                "words_per_chunk": words_per_chunk,
-                "stride_words": stride_words if stride_words is not None else SEGMENT_STRIDE_WORDS,
-                "min_words": min_words,
-                "max_length": max_length,
-            },
-        }
-
-    resolved_stride = stride_words if stride_words is not None else SEGMENT_STRIDE_WORDS
-    chunk_list = build_chunks(
-        text,
-        words_per_chunk=words_per_chunk,
-        stride_words=resolved_stride,
-        min_words=min_words,
-    )
-    if not chunk_list:
-        base = predict_proba(
-            text,
-            model_path=model_path,
-            return_details=True,
-        )
-        return {
-            "overall": {
-                "prob_generated": base["prob_generated"],
-                "prob_human": base["prob_human"],
-                "label": "ai" if base["prob_generated"] >= ai_threshold else (
-                    "human" if base["prob_generated"] <= human_threshold else "uncertain"),
-                "confidence": max(0.0, min(1.0, abs(base["prob_generated"] - 0.5) * 2)),
-                "prob_entropy": base["prob_entropy"],
-                "prob_variation_ratio": base["prob_variation_ratio"],
-            },
-            "segments": [],
-            "params": {
-                "words_per_chunk": words_per_chunk,
-                "stride_words": resolved_stride,
-                "min_words": min_words,
-                "max_length": max_length,
-            },
-            "mc_dropout_passes": 16,
-            "temperature": base["temperature"],
-        }
-
-    tokenizer, model = load_model_artifacts(model_path)
-    device = next(model.parameters()).device
-    texts = [chunk.text for chunk in chunk_list]
-    # noinspection PyCallingNonCallable
-    encoded = tokenizer(
-        texts,
-        truncation=True,
-        padding=True,
-        max_length=max_length,
-        return_tensors="pt",
-    )
-    encoded = {key: value.to(device) for key, value in encoded.items()}
+def _label_for(prob_generated: float, ai_threshold: float, human_threshold: float) -> str:
+    if prob_generated >= ai_threshold:
+        return "ai"
+    if prob_generated <= human_threshold:
+        return "human"
+    return "uncertain"
 
-    temperature = float(getattr(model, "_factify_temperature", 1.0))
-    if temperature <= 0:
-        temperature = 1.0
 
-    inference = run_model_inference(
-        model,
-        encoded,
-        temperature=temperature,
-    )
-    mean_logits = inference["mean_logits"]
-    mean_probs = inference["mean_probs"]
-    raw_mean_probs = inference["raw_mean_probs"]
-    std_probs = inference["std_probs"]
-    entropy_values = inference["entropy"]
-    variation_values = inference["variation"]
+def _summarize_overall(
+        chunk_list: List[TextChunk],
+        inference: Dict[str, torch.Tensor],
+        rows: slice,
+        *,
+        ai_threshold: float,
+        human_threshold: float,
+        escalated: List[bool] | None = None,
+) -> Dict[str, object]:
+    """
+    Word-count weighted document score. With ``escalated`` (cascade) the std and variation ratio
+    are averaged over the full-model rows only: the student's single pass has no spread to report.
+    """
+    mean_logits = inference["mean_logits"][rows]
+    raw_mean_probs = inference["raw_mean_probs"][rows]
+    std_probs = inference["std_probs"][rows]
+    variation_values = inference["variation"][rows]
 
     weights_tensor = torch.tensor([chunk.word_count for chunk in chunk_list], dtype=mean_logits.dtype,
                                   device=mean_logits.device)
@@ -236,32 +424,78 @@ def predict_segmented_text(
     weighted_logits = (mean_logits * weights.unsqueeze(1)).sum(dim=0)
     overall_probs = torch.softmax(weighted_logits, dim=0)
     weighted_raw_probs = (raw_mean_probs * weights.unsqueeze(1)).sum(dim=0)
-    weighted_std = (std_probs * weights.unsqueeze(1)).sum(dim=0)
-    overall_variation = float((variation_values * weights).sum().detach().cpu().item())
+
+    uncertainty_weights = weights_tensor
+    if escalated is not None:
+        uncertainty_weights = weights_tensor * torch.tensor(escalated, dtype=weights_tensor.dtype,
+                                                            device=weights_tensor.device)
+    uncertainty_weights = uncertainty_weights / uncertainty_weights.sum().clamp_min(1e-12)
+    weighted_std = (std_probs * uncertainty_weights.unsqueeze(1)).sum(dim=0)
+    overall_variation = float((variation_values * uncertainty_weights).sum().detach().cpu().item())
     overall_prob_generated = float(overall_probs[1].detach().cpu().item())
     overall_prob_human = float(overall_probs[0].detach().cpu().item())
     overall_prob_generated_raw = float(weighted_raw_probs[1].detach().cpu().item())
     overall_prob_human_raw = float(weighted_raw_probs[0].detach().cpu().item())
     overall_std_generated = float(weighted_std[1].detach().cpu().item())
     overall_std_human = float(weighted_std[0].detach().cpu().item())
-    overall_label = "ai" if overall_prob_generated >= ai_threshold else (
-        "human" if overall_prob_generated <= human_threshold else "uncertain")
     overall_confidence = max(0.0, min(1.0, abs(overall_prob_generated - 0.5) * 2))
     overall_entropy = float(_prob_entropy(overall_probs.unsqueeze(0))[0].detach().cpu().item())
 
+    return {
+        "prob_generated": overall_prob_generated,
+        "prob_human": overall_prob_human,
+        "label": _label_for(overall_prob_generated, ai_threshold, human_threshold),
+        "confidence": overall_confidence,
+        "prob_entropy": overall_entropy,
+        "prob_generated_raw": overall_prob_generated_raw,
+        "prob_human_raw": overall_prob_human_raw,
+        "prob_generated_std": overall_std_generated,
+        "prob_human_std": overall_std_human,
+        "prob_variation_ratio": overall_variation,
+    }
+
+
+def _summarize_chunks(
+        chunk_list: List[TextChunk],
+        inference: Dict[str, torch.Tensor],
+        rows: slice,
+        *,
+        mc_dropout: bool,
+        ai_threshold: float,
+        human_threshold: float,
+        escalated: List[bool] | None = None,
+) -> Dict[str, object]:
+    """
+    Per-segment results and the document score for ``rows`` of ``inference``.
+
+    ``escalated`` flags the rows computed by the full model (one per chunk). Each segment records
+    its source as ``model`` ("full" or "student"); student segments come from one deterministic
+    pass, so they report no passes, std or variation ratio and the pass counts cover full rows only.
+    """
+    if escalated is None:
+        escalated = [True] * len(chunk_list)
+    mean_probs = inference["mean_probs"][rows]
+    raw_mean_probs = inference["raw_mean_probs"][rows]
+    std_probs = inference["std_probs"][rows]
+    entropy_values = inference["entropy"][rows]
+    variation_values = inference["variation"][rows]
+
     segments: List[Dict[str, object]] = []
     mean_probs_cpu = mean_probs.detach().cpu()
     raw_mean_cpu = raw_mean_probs.detach().cpu()
     std_probs_cpu = std_probs.detach().cpu()
     entropy_cpu = entropy_values.detach().cpu()
     variation_cpu = variation_values.detach().cpu()
+    passes_cpu = inference["passes"][rows].detach().cpu()
+    if not mc_dropout:
+        passes_cpu = torch.zeros_like(passes_cpu)
+    full_passes = passes_cpu[torch.tensor(escalated, dtype=torch.bool)]
 
     for idx, chunk in enumerate(chunk_list):
         prob_generated = float(mean_probs_cpu[idx][1])
         prob_human = float(mean_probs_cpu[idx][0])
-        label = "ai" if prob_generated >= ai_threshold else (
-            "human" if prob_generated <= human_threshold else "uncertain")
         confidence = max(0.0, min(1.0, abs(prob_generated - 0.5) * 2))
+        full = bool(escalated[idx])
         segments.append({
             "index": int(chunk.index),
             "start_char": int(chunk.start),
@@ -272,36 +506,616 @@ def predict_segmented_text(
             "prob_human": prob_human,
             "prob_generated_raw": float(raw_mean_cpu[idx][1]),
             "prob_human_raw": float(raw_mean_cpu[idx][0]),
-            "prob_generated_std": float(std_probs_cpu[idx][1]),
-            "prob_human_std": float(std_probs_cpu[idx][0]),
+            "prob_generated_std": float(std_probs_cpu[idx][1]) if full else None,
+            "prob_human_std": float(std_probs_cpu[idx][0]) if full else None,
             "prob_entropy": float(entropy_cpu[idx]),
-            "prob_variation_ratio": float(variation_cpu[idx]),
-            "label": label,
+            "prob_variation_ratio": float(variation_cpu[idx]) if full else None,
+            "mc_dropout_passes": int(passes_cpu[idx]) if full else 0,
+            "model": "full" if full else "student",
+            "label": _label_for(prob_generated, ai_threshold, human_threshold),
             "confidence": confidence,
         })
 
     return {
-        "overall": {
-            "prob_generated": overall_prob_generated,
-            "prob_human": overall_prob_human,
-            "label": overall_label,
-            "confidence": overall_confidence,
-            "prob_entropy": overall_entropy,
-            "prob_generated_raw": overall_prob_generated_raw,
-            "prob_human_raw": overall_prob_human_raw,
-            "prob_generated_std": overall_std_generated,
-            "prob_human_std": overall_std_human,
-            "prob_variation_ratio": overall_variation,
-        },
+        "overall": _summarize_overall(
+            chunk_list,
+            inference,
+            rows,
+            ai_threshold=ai_threshold,
+            human_threshold=human_threshold,
+            escalated=escalated,
+        ),
         "segments": segments,
-        "params": {
-            "words_per_chunk": words_per_chunk,
-            "stride_words": resolved_stride,
-            "min_words": min_words,
-            "max_length": max_length,
-            "ai_threshold": ai_threshold,
-            "human_threshold": human_threshold,
-        },
-        "mc_dropout_passes": 16,
-        "temperature": float(temperature),
+        "mc_dropout_passes": int(full_passes.max()) if full_passes.numel() else 0,
+        "mc_dropout_passes_mean": float(full_passes.float().mean()) if full_passes.numel() else 0.0,
+    }
+
+
+def _run_chunks(
+        chunk_texts: List[str],
+        tokenizer,
+        model: torch.nn.Module,
+        tier_settings: Dict[str, object],
+        *,
+        identity: str,
+        backend: str,
+        max_length: int,
+        min_passes: int,
+        tolerance: float,
+        use_chunk_cache: bool,
+) -> tuple[Dict[str, torch.Tensor], List[bool], float]:
+    """
+    Inference rows of ``model`` for ``chunk_texts`` (in order), the flags of rows taken from
+    ``chunk_cache`` and the temperature used.
+    """
+    device = model_device(model)
+
+    temperature = float(getattr(model, "_factify_temperature", 1.0))
+    if temperature <= 0:
+        temperature = 1.0
+
+    inference_params = {
+        "max_length": max_length,
+        "temperature": temperature,
+        "mc_dropout": tier_settings["mc_dropout"],
+        "passes": tier_settings["passes"],
+        "adaptive": tier_settings["adaptive"],
+        "min_passes": min_passes,
+        "pass_group": MC_DROPOUT_PASS_GROUP,
+        "tolerance": tolerance,
+        "seed": MC_DROPOUT_SEED,
+        "backend": backend,
     }
+
+    if use_chunk_cache:
+        keys = [chunk_cache_key(chunk_text, identity, inference_params) for chunk_text in chunk_texts]
+        rows = [chunk_cache.get(key) for key in keys]
+    else:
+        keys = [str(idx) for idx in range(len(chunk_texts))]
+        rows = [None] * len(chunk_texts)
+
+    # Każdy niepowtarzalny brakujący segment trafia do modelu tylko raz (również w obrębie jednego batcha)
+    missing: Dict[str, int] = {}
+    for idx, row in enumerate(rows):
+        if row is None:
+            missing.setdefault(keys[idx], idx)
+    from_cache = [row is not None for row in rows]
+
+    if missing:
+        fresh_indices = list(missing.values())
+        # noinspection PyCallingNonCallable
+        encoded = tokenizer(
+            [chunk_texts[idx] for idx in fresh_indices],
+            truncation=True,
+            padding=True,
+            max_length=max_length,
+            return_tensors="pt",
+        )
+        encoded = {key: value.to(device) for key, value in encoded.items()}
+
+        fresh = run_bucketed_inference(
+            model,
+            encoded,
+            temperature=temperature,
+            passes=tier_settings["passes"],
+            adaptive=tier_settings["adaptive"],
+            min_passes=min_passes,
+            tolerance=tolerance,
+            mc_dropout=tier_settings["mc_dropout"],
+        )
+
+        if use_chunk_cache:
+            chunk_cache.put_rows(list(missing), fresh)
+
+        if len(fresh_indices) == len(chunk_texts):
+            inference = fresh
+        else:
+            fresh_cpu = {field: fresh[field].detach().cpu() for field in CHUNK_RESULT_FIELDS}
+            fresh_position = {key: position for position, key in enumerate(missing)}
+            for idx, row in enumerate(rows):
+                if row is None:
+                    source = fresh_position[keys[idx]]
+                    rows[idx] = {field: values[source] for field, values in fresh_cpu.items()}
+            inference = stack_rows(rows)
+    else:
+        inference = stack_rows(rows)
+
+    return inference, from_cache, temperature
+
+
+def _infer_chunks(
+        chunk_texts: List[str],
+        model_path: Path | str,
+        tier_settings: Dict[str, object],
+        *,
+        max_length: int,
+        min_passes: int,
+        tolerance: float,
+        use_chunk_cache: bool,
+        cascade_band: tuple[float, float] | None = None,
+        student_model_path: Path | str = STUDENT_MODEL_PATH,
+) -> tuple[Dict[str, torch.Tensor], List[bool], float, List[bool]]:
+    """
+    Inference rows for ``chunk_texts`` (in order), the flags of rows taken from ``chunk_cache``,
+    the temperature of the full model and the flags of rows computed by the full model.
+
+    With ``cascade_band`` (human, ai threshold) the distilled student scores every chunk in one
+    deterministic pass first, and only chunks it leaves strictly inside the band go through the
+    full model with ``tier_settings``; the rest keep the student's rows.
+    """
+    tokenizer, model = load_inference_artifacts(model_path)
+    run_params = {
+        "max_length": max_length,
+        "min_passes": min_passes,
+        "tolerance": tolerance,
+        "use_chunk_cache": use_chunk_cache,
+    }
+
+    if cascade_band is None:
+        inference, from_cache, temperature = _run_chunks(
+            chunk_texts,
+            tokenizer,
+            model,
+            tier_settings,
+            identity=inference_identity(model_path),
+            backend=inference_backend(model_path),
+            **run_params,
+        )
+        return inference, from_cache, temperature, [True] * len(chunk_texts)
+
+    _, student = load_student_artifacts(student_model_path)
+    student_inference, from_cache, _ = _run_chunks(
+        chunk_texts,
+        tokenizer,
+        student,
+        resolve_inference_tier("fast"),
+        identity=f"student:{model_identity(student_model_path)}",
+        backend="torch",
+        **run_params,
+    )
+    rows = {field: student_inference[field].detach().cpu().clone() for field in CHUNK_RESULT_FIELDS}
+
+    human_threshold, ai_threshold = cascade_band
+    prob_generated = rows["mean_probs"][:, 1]
+    escalated = ((prob_generated > human_threshold) & (prob_generated < ai_threshold)).tolist()
+    escalated_indices = [idx for idx, flag in enumerate(escalated) if flag]
+
+    temperature = float(getattr(model, "_factify_temperature", 1.0))
+    if escalated_indices:
+        full_inference, full_from_cache, temperature = _run_chunks(
+            [chunk_texts[idx] for idx in escalated_indices],
+            tokenizer,
+            model,
+            tier_settings,
+            identity=inference_identity(model_path),
+            backend=inference_backend(model_path),
+            **run_params,
+        )
+        positions = torch.tensor(escalated_indices)
+        for field in CHUNK_RESULT_FIELDS:
+            rows[field][positions] = full_inference[field].detach().cpu().to(rows[field].dtype)
+        for idx, cached in zip(escalated_indices, full_from_cache):
+            from_cache[idx] = cached
+
+    return rows, from_cache, temperature, escalated
+
+
+def _build_text_chunks(
+        text: str,
+        model_path: Path | str,
+        *,
+        chunking: str,
+        words_per_chunk: int,
+        stride_words: int,
+        min_words: int,
+        max_length: int,
+) -> List[TextChunk]:
+    """
+    Chunks of ``text`` for segmented prediction. ``"words"`` cuts every ``words_per_chunk`` words;
+    ``"tokens"`` fills each chunk up to ``max_length`` tokens of the model's tokenizer, with the
+    same overlap ratio as ``stride_words / words_per_chunk``.
+    """
+    if chunking not in SEGMENT_CHUNKING_MODES:
+        raise ValueError(f"Unknown chunking mode: {chunking}. Available: {', '.join(SEGMENT_CHUNKING_MODES)}")
+
+    tokenizer = load_inference_artifacts(model_path)[0] if chunking == "tokens" else None
+
+    # Offsety tokenów daje tylko szybki tokenizer; dla wolnego zostaje podział po słowach
+    if tokenizer is None or not getattr(tokenizer, "is_fast", False):
+        return build_chunks(text, words_per_chunk=words_per_chunk, stride_words=stride_words, min_words=min_words)
+
+    if words_per_chunk <= 0:
+        raise ValueError("words_per_chunk must be positive")
+
+    budget = max_length - tokenizer.num_special_tokens_to_add(pair=False)
+    stride_ratio = min(stride_words, words_per_chunk) / words_per_chunk
+    return build_token_chunks(
+        text,
+        tokenizer,
+        max_tokens=max_length,
+        stride_tokens=max(1, round(budget * stride_ratio)),
+        min_words=min_words,
+    )
+
+
+def _result_params(
+        tier_settings: Dict[str, object],
+        *,
+        words_per_chunk: int,
+        stride_words: int,
+        min_words: int,
+        max_length: int,
+        chunking: str,
+        cascade: bool,
+        ai_threshold: float,
+        human_threshold: float,
+        min_passes: int,
+        tolerance: float,
+) -> Dict[str, object]:
+    return {
+        "words_per_chunk": words_per_chunk,
+        "stride_words": stride_words,
+        "min_words": min_words,
+        "max_length": max_length,
+        "chunking": chunking,
+        "cascade": cascade,
+        "ai_threshold": ai_threshold,
+        "human_threshold": human_threshold,
+        "inference_tier": tier_settings["tier"],
+        "mc_dropout_adaptive": tier_settings["adaptive"],
+        "mc_dropout_min_passes": min_passes,
+        "mc_dropout_max_passes": tier_settings["passes"] if tier_settings["mc_dropout"] else 0,
+        "mc_dropout_tolerance": tolerance,
+    }
+
+
+def predict_segmented_texts(
+        texts: List[str],
+        model_path: Path | str = DEFAULT_MODEL_PATH,
+        *,
+        words_per_chunk: int = SEGMENT_WORD_TARGET,
+        stride_words: int | None = SEGMENT_STRIDE_WORDS,
+        min_words: int = SEGMENT_MIN_WORDS,
+        max_length: int = 128,
+        chunking: str = SEGMENT_CHUNKING,
+        cascade: bool = SEGMENT_CASCADE,
+        student_model_path: Path | str = STUDENT_MODEL_PATH,
+        ai_threshold: float = SEGMENT_AI_THRESHOLD,
+        human_threshold: float = SEGMENT_HUMAN_THRESHOLD,
+        tier: str | None = None,
+        adaptive: bool | None = None,
+        min_passes: int = MC_DROPOUT_MIN_PASSES,
+        max_passes: int | None = None,
+        tolerance: float = MC_DROPOUT_TOLERANCE,
+        use_chunk_cache: bool = True,
+) -> List[Dict[str, object]]:
+    """
+    Segmented prediction for several texts at once.
+
+    Chunks of all texts are tokenized in one padded call and go through a single MC dropout run,
+    so a burst of short texts costs one batched forward instead of one per text. Results are
+    returned in the order of ``texts``. In the fast tier they match ``predict_segmented_text`` for
+    each text; with MC dropout the masks (and, with ``adaptive``, the pass counts) depend on which
+    chunks share the batch, so scores agree only within the MC dropout noise.
+
+    With ``use_chunk_cache`` only chunks not seen before (same text, model and inference params)
+    are run through the model; the others are taken from ``chunk_cache``.
+    """
+    if ai_threshold <= human_threshold:
+        raise ValueError("ai_threshold must be greater than human_threshold")
+    tier_settings = _supported_tier(resolve_inference_tier(tier, adaptive=adaptive, max_passes=max_passes), model_path)
+    cascade = _cascade_enabled(cascade, student_model_path)
+    resolved_stride = stride_words if stride_words is not None else SEGMENT_STRIDE_WORDS
+
+    results: List[Dict[str, object] | None] = [None] * len(texts)
+    chunked: List[tuple[int, List[TextChunk]]] = []
+
+    for position, text in enumerate(texts):
+        if not text.strip():
+            results[position] = {
+                "overall": {
+                    "prob_generated": 0.0,
+                    "prob_human": 1.0,
+                    "label": "human",
+                    "confidence": 1.0,
+                },
+                "segments": [],
+                "params": {
+                    "words_per_chunk": words_per_chunk,
+                    "stride_words": resolved_stride,
+                    "min_words": min_words,
+                    "max_length": max_length,
+                    "chunking": chunking,
+                    "cascade": cascade,
+                },
+                "inference_tier": tier_settings["tier"],
+            }
+            continue
+
+        chunk_list = _build_text_chunks(
+            text,
+            model_path,
+            chunking=chunking,
+            words_per_chunk=words_per_chunk,
+            stride_words=resolved_stride,
+            min_words=min_words,
+            max_length=max_length,
+        )
+        if chunk_list:
+            chunked.append((position, chunk_list))
+            continue
+
+        base = predict_proba(
+            text,
+            model_path=model_path,
+            return_details=True,
+            tier=tier_settings["tier"],
+            adaptive=tier_settings["adaptive"],
+            min_passes=min_passes,
+            max_passes=tier_settings["passes"],
+            tolerance=tolerance,
+        )
+        results[position] = {
+            "overall": {
+                "prob_generated": base["prob_generated"],
+                "prob_human": base["prob_human"],
+                "label": _label_for(base["prob_generated"], ai_threshold, human_threshold),
+                "confidence": max(0.0, min(1.0, abs(base["prob_generated"] - 0.5) * 2)),
+                "prob_entropy": base["prob_entropy"],
+                "prob_variation_ratio": base["prob_variation_ratio"],
+            },
+            "segments": [],
+            "params": {
+                "words_per_chunk": words_per_chunk,
+                "stride_words": resolved_stride,
+                "min_words": min_words,
+                "max_length": max_length,
+                "chunking": chunking,
+                "cascade": cascade,
+            },
+            "mc_dropout_passes": base["mc_dropout_passes"],
+            "inference_tier": tier_settings["tier"],
+            "temperature": base["temperature"],
+        }
+
+    if not chunked:
+        return results
+
+    chunk_texts = [chunk.text for _, chunk_list in chunked for chunk in chunk_list]
+    inference, from_cache, temperature, escalated = _infer_chunks(
+        chunk_texts,
+        model_path,
+        tier_settings,
+        max_length=max_length,
+        min_passes=min_passes,
+        tolerance=tolerance,
+        use_chunk_cache=use_chunk_cache,
+        cascade_band=(human_threshold, ai_threshold) if cascade else None,
+        student_model_path=student_model_path,
+    )
+
+    params = _result_params(
+        tier_settings,
+        words_per_chunk=words_per_chunk,
+        stride_words=resolved_stride,
+        min_words=min_words,
+        max_length=max_length,
+        chunking=chunking,
+        cascade=cascade,
+        ai_threshold=ai_threshold,
+        human_threshold=human_threshold,
+        min_passes=min_passes,
+        tolerance=tolerance,
+    )
+
+    offset = 0
+    for position, chunk_list in chunked:
+        chunk_rows = slice(offset, offset + len(chunk_list))
+        offset += len(chunk_list)
+        summary = _summarize_chunks(
+            chunk_list,
+            inference,
+            chunk_rows,
+            mc_dropout=tier_settings["mc_dropout"],
+            ai_threshold=ai_threshold,
+            human_threshold=human_threshold,
+            escalated=escalated[chunk_rows],
+        )
+        summary["params"] = dict(params)
+        summary["inference_tier"] = tier_settings["tier"]
+        summary["temperature"] = float(temperature)
+        summary["cached_segments"] = sum(from_cache[chunk_rows])
+        if cascade:
+            summary["escalated_segments"] = sum(escalated[chunk_rows])
+        results[position] = summary
+
+    return results
+
+
+def predict_segmented_text(
+        text: str,
+        model_path: Path | str = DEFAULT_MODEL_PATH,
+        *,
+        words_per_chunk: int = SEGMENT_WORD_TARGET,
+        stride_words: int | None = SEGMENT_STRIDE_WORDS,
+        min_words: int = SEGMENT_MIN_WORDS,
+        max_length: int = 128,
+        chunking: str = SEGMENT_CHUNKING,
+        cascade: bool = SEGMENT_CASCADE,
+        student_model_path: Path | str = STUDENT_MODEL_PATH,
+        ai_threshold: float = SEGMENT_AI_THRESHOLD,
+        human_threshold: float = SEGMENT_HUMAN_THRESHOLD,
+        tier: str | None = None,
+        adaptive: bool | None = None,
+        min_passes: int = MC_DROPOUT_MIN_PASSES,
+        max_passes: int | None = None,
+        tolerance: float = MC_DROPOUT_TOLERANCE,
+        use_chunk_cache: bool = True,
+) -> Dict[str, object]:
+    return predict_segmented_texts(
+        [text],
+        model_path=model_path,
+        words_per_chunk=words_per_chunk,
+        stride_words=stride_words,
+        min_words=min_words,
+        max_length=max_length,
+        chunking=chunking,
+        cascade=cascade,
+        student_model_path=student_model_path,
+        ai_threshold=ai_threshold,
+        human_threshold=human_threshold,
+        tier=tier,
+        adaptive=adaptive,
+        min_passes=min_passes,
+        max_passes=max_passes,
+        tolerance=tolerance,
+        use_chunk_cache=use_chunk_cache,
+    )[0]
+
+
+def predict_segmented_text_streaming(
+        text: str,
+        model_path: Path | str = DEFAULT_MODEL_PATH,
+        *,
+        words_per_chunk: int = SEGMENT_WORD_TARGET,
+        stride_words: int | None = SEGMENT_STRIDE_WORDS,
+        min_words: int = SEGMENT_MIN_WORDS,
+        max_length: int = 128,
+        chunking: str = SEGMENT_CHUNKING,
+        cascade: bool = SEGMENT_CASCADE,
+        student_model_path: Path | str = STUDENT_MODEL_PATH,
+        ai_threshold: float = SEGMENT_AI_THRESHOLD,
+        human_threshold: float = SEGMENT_HUMAN_THRESHOLD,
+        tier: str | None = None,
+        adaptive: bool | None = None,
+        min_passes: int = MC_DROPOUT_MIN_PASSES,
+        max_passes: int | None = None,
+        tolerance: float = MC_DROPOUT_TOLERANCE,
+        use_chunk_cache: bool = True,
+        chunk_batch_size: int = STREAM_CHUNK_BATCH_SIZE,
+        on_batch: Callable[[Dict[str, object]], None] | None = None,
+) -> Dict[str, object]:
+    """
+    Same result as ``predict_segmented_text``, but the chunks go through the model in batches of
+    ``chunk_batch_size`` and ``on_batch`` is called after each batch with its segments, the running
+    weighted overall of all segments done so far and ``processed_chunks`` / ``total_chunks``,
+    so a long document can be shown while the rest is still computing.
+    """
+    if ai_threshold <= human_threshold:
+        raise ValueError("ai_threshold must be greater than human_threshold")
+    tier_settings = _supported_tier(resolve_inference_tier(tier, adaptive=adaptive, max_passes=max_passes), model_path)
+    cascade = _cascade_enabled(cascade, student_model_path)
+    resolved_stride = stride_words if stride_words is not None else SEGMENT_STRIDE_WORDS
+
+    chunk_list = _build_text_chunks(
+        text,
+        model_path,
+        chunking=chunking,
+        words_per_chunk=words_per_chunk,
+        stride_words=resolved_stride,
+        min_words=min_words,
+        max_length=max_length,
+    ) if text.strip() else []
+
+    if not chunk_list:
+        # Pusty lub zbyt krótki tekst - nie ma czego strumieniować
+        return predict_segmented_text(
+            text,
+            model_path=model_path,
+            words_per_chunk=words_per_chunk,
+            stride_words=stride_words,
+            min_words=min_words,
+            max_length=max_length,
+            chunking=chunking,
+            cascade=cascade,
+            student_model_path=student_model_path,
+            ai_threshold=ai_threshold,
+            human_threshold=human_threshold,
+            tier=tier,
+            adaptive=adaptive,
+            min_passes=min_passes,
+            max_passes=max_passes,
+            tolerance=tolerance,
+            use_chunk_cache=use_chunk_cache,
+        )
+
+    batch_size = max(1, chunk_batch_size)
+    batches: List[Dict[str, torch.Tensor]] = []
+    from_cache: List[bool] = []
+    escalated: List[bool] = []
+    temperature = 1.0
+
+    for start in range(0, len(chunk_list), batch_size):
+        batch_chunks = chunk_list[start:start + batch_size]
+        batch_inference, batch_from_cache, temperature, batch_escalated = _infer_chunks(
+            [chunk.text for chunk in batch_chunks],
+            model_path,
+            tier_settings,
+            max_length=max_length,
+            min_passes=min_passes,
+            tolerance=tolerance,
+            use_chunk_cache=use_chunk_cache,
+            cascade_band=(human_threshold, ai_threshold) if cascade else None,
+            student_model_path=student_model_path,
+        )
+        batches.append({field: batch_inference[field].detach().cpu() for field in CHUNK_RESULT_FIELDS})
+        from_cache.extend(batch_from_cache)
+        escalated.extend(batch_escalated)
+
+        if on_batch is not None:
+            processed = start + len(batch_chunks)
+            processed_inference = {
+                field: torch.cat([batch[field] for batch in batches]) for field in CHUNK_RESULT_FIELDS
+            }
+            batch_summary = _summarize_chunks(
+                batch_chunks,
+                batches[-1],
+                slice(None),
+                mc_dropout=tier_settings["mc_dropout"],
+                ai_threshold=ai_threshold,
+                human_threshold=human_threshold,
+                escalated=batch_escalated,
+            )
+            on_batch({
+                "segments": batch_summary["segments"],
+                "overall": _summarize_overall(
+                    chunk_list[:processed],
+                    processed_inference,
+                    slice(None),
+                    ai_threshold=ai_threshold,
+                    human_threshold=human_threshold,
+                    escalated=escalated,
+                ),
+                "processed_chunks": processed,
+                "total_chunks": len(chunk_list),
+            })
+
+    inference = {field: torch.cat([batch[field] for batch in batches]) for field in CHUNK_RESULT_FIELDS}
+    summary = _summarize_chunks(
+        chunk_list,
+        inference,
+        slice(None),
+        mc_dropout=tier_settings["mc_dropout"],
+        ai_threshold=ai_threshold,
+        human_threshold=human_threshold,
+        escalated=escalated,
+    )
+    summary["params"] = _result_params(
+        tier_settings,
+        words_per_chunk=words_per_chunk,
+        stride_words=resolved_stride,
+        min_words=min_words,
+        max_length=max_length,
+        chunking=chunking,
+        cascade=cascade,
+        ai_threshold=ai_threshold,
+        human_threshold=human_threshold,
+        min_passes=min_passes,
+        tolerance=tolerance,
+    )
+    summary["inference_tier"] = tier_settings["tier"]
+    summary["temperature"] = float(temperature)
+    summary["cached_segments"] = sum(from_cache)
+    if cascade:
+        summary["escalated_segments"] = sum(escalated)
+    return summary
@@ -1,15 +1,20 @@
 import platform
+import threading
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Iterator, Tuple
+from typing import Dict, Iterator, Tuple
 
 import torch
-from transformers import AutoModelForSequenceClassification, AutoTokenizer
-from .config import DEFAULT_MODEL_PATH, NLP_MODEL_NAME
+from transformers import AutoConfig, AutoModelForSequenceClassification, AutoTokenizer
+from .config import DEFAULT_MODEL_PATH, NLP_MODEL_NAME, STUDENT_MODEL_PATH
 
 _tokenizer_cache: AutoTokenizer | None = None
 _model_cache: AutoModelForSequenceClassification | None = None
 _temperature_cache: float | None = None
+_student_cache: Dict[str, AutoModelForSequenceClassification] = {}
+# Przebiegi modelu przełączają dropout na współdzielonym modelu i ustawiają globalny seed torcha,
+# więc wątki workera wykonują je po kolei (tokenizacja i podział na segmenty dalej idą równolegle)
+model_inference_lock = threading.RLock()
 
 @contextmanager
 def dropout_train_mode(model: torch.nn.Module) -> Iterator[None]:
@@ -34,6 +39,49 @@ def get_device() -> torch.device:
         return torch.device("mps")
     return torch.device("cpu")
 
+def model_device(model: torch.nn.Module) -> torch.device:
+    """Device of the model's weights; CPU for backends without torch parameters (ONNX Runtime)."""
+    parameter = next(model.parameters(), None)
+    return parameter.device if parameter is not None else torch.device("cpu")
+
+def load_tokenizer() -> AutoTokenizer:
+    global _tokenizer_cache
+
+    if _tokenizer_cache is None:
+        _tokenizer_cache = AutoTokenizer.from_pretrained(NLP_MODEL_NAME)
+    return _tokenizer_cache
+
+def load_checkpoint(
+    model_path: Path | str = DEFAULT_MODEL_PATH,
+    *,
+    device: torch.device | None = None
+    ) -> Tuple[AutoModelForSequenceClassification, float]:
+    """Fine-tuned model (float weights, nothing quantized or cached) and its calibrated temperature."""
+    resolved_model_path = Path(model_path)
+    if device is None:
+        device = get_device()
+
+    model = AutoModelForSequenceClassification.from_pretrained(NLP_MODEL_NAME, num_labels=2)
+    temperature = 1.0
+    if resolved_model_path.exists():
+        checkpoint = torch.load(resolved_model_path, map_location=device)
+        if isinstance(checkpoint, dict) and "model_state_dict" in checkpoint:
+            state_dict = checkpoint["model_state_dict"]
+            temperature = float(checkpoint.get("temperature", 1.0))
+        else:
+            state_dict = checkpoint
+        model.load_state_dict(state_dict)
+        temperature = max(float(temperature), 1e-3)
+
+    return model.to(device), temperature
+
+def _quantize_for_cpu(model: torch.nn.Module) -> torch.nn.Module:
+    return torch.quantization.quantize_dynamic(
+        model,
+        {torch.nn.Linear},
+        dtype=torch.qint8
+    )
+
 def load_model_artifacts(
     model_path: Path | str = DEFAULT_MODEL_PATH,
     *,
@@ -42,7 +90,6 @@ def load_model_artifacts(
     ) -> Tuple[AutoTokenizer, AutoModelForSequenceClassification]:
     global _tokenizer_cache, _model_cache, _temperature_cache
 
-    resolved_model_path = Path(model_path)
     if device is None:
         device = get_device()
 
@@ -51,31 +98,15 @@ def load_model_artifacts(
         _model_cache = None
         _temperature_cache = None
 
-    if _tokenizer_cache is None:
-        _tokenizer_cache = AutoTokenizer.from_pretrained(NLP_MODEL_NAME)
+    load_tokenizer()
 
     if _model_cache is None:
-        model = AutoModelForSequenceClassification.from_pretrained(NLP_MODEL_NAME, num_labels=2)
-        temperature = 1.0
-        if resolved_model_path.exists():
-            checkpoint = torch.load(resolved_model_path, map_location=device)
-            if isinstance(checkpoint, dict) and "model_state_dict" in checkpoint:
-                state_dict = checkpoint["model_state_dict"]
-                temperature = float(checkpoint.get("temperature", 1.0))
-            else:
-                state_dict = checkpoint
-            model.load_state_dict(state_dict)
-            temperature = max(float(temperature), 1e-3)
-        _model_cache = model.to(device)
+        _model_cache, temperature = load_checkpoint(model_path, device=device)
 
         is_x86_64 = platform.machine().lower() in ("x86_64", "amd64")
 
         if device.type=='cpu' and is_x86_64:
-            _model_cache = torch.quantization.quantize_dynamic(
-                _model_cache,
-                {torch.nn.Linear},
-                dtype=torch.qint8
-            )
+            _model_cache = _quantize_for_cpu(_model_cache)
 
         _temperature_cache = temperature
         setattr(_model_cache, "_factify_temperature", temperature)
@@ -87,3 +118,47 @@ def load_model_artifacts(
             setattr(_model_cache, "_factify_temperature", 1.0)
 
     return _tokenizer_cache, _model_cache
+
+def load_student_artifacts(
+    model_path: Path | str = STUDENT_MODEL_PATH,
+    *,
+    force_reload: bool = False,
+    device: torch.device | None = None
+    ) -> Tuple[AutoTokenizer, AutoModelForSequenceClassification]:
+    """
+    Distilled student model (first stage of the cascade) with the teacher's tokenizer.
+    The checkpoint carries its own architecture config, since the student is smaller than the base model.
+    """
+    resolved_model_path = Path(model_path)
+    key = str(resolved_model_path.resolve())
+    if device is None:
+        device = get_device()
+
+    if force_reload:
+        _student_cache.pop(key, None)
+
+    if key not in _student_cache:
+        if not resolved_model_path.exists():
+            raise FileNotFoundError(f"Student model not found: {resolved_model_path}. Run the 'distill' command first.")
+
+        checkpoint = torch.load(resolved_model_path, map_location=device)
+        model = AutoModelForSequenceClassification.from_config(AutoConfig.for_model(**checkpoint["config"]))
+        model.load_state_dict(checkpoint["model_state_dict"])
+        model.to(device)
+
+        if device.type == 'cpu' and platform.machine().lower() in ("x86_64", "amd64"):
+            model = _quantize_for_cpu(model)
+
+        setattr(model, "_factify_temperature", max(float(checkpoint.get("temperature", 1.0)), 1e-3))
+        model.eval()
+        _student_cache[key] = model
+
+    return load_tokenizer(), _student_cache[key]
+
+def model_identity(model_path: Path | str = DEFAULT_MODEL_PATH) -> str:
+    """Identyfikator checkpointu (base model + nazwa, mtime i rozmiar pliku) - zmienia się przy każdym nowym treningu."""
+    resolved_model_path = Path(model_path)
+    if not resolved_model_path.exists():
+        return f"{NLP_MODEL_NAME}:untrained"
+    stat = resolved_model_path.stat()
+    return f"{NLP_MODEL_NAME}:{resolved_model_path.name}:{stat.st_mtime_ns}:{stat.st_size}"
@@ -0,0 +1,216 @@
+import os
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Dict, Tuple
+
+import numpy as np
+import torch
+from transformers import AutoTokenizer
+from transformers.modeling_outputs import SequenceClassifierOutput
+
+from .config import DEFAULT_MODEL_PATH, NLP_MODEL_NAME, ONNX_INTRA_OP_THREADS, ONNX_MODEL_PATH, ONNX_OPSET
+from .model_utils import dropout_train_mode, load_checkpoint, load_tokenizer, model_identity
+
+# Wejście grafu włączające dropout (tylko w eksporcie z --mc-dropout)
+MC_DROPOUT_INPUT = "mc_dropout"
+
+_session_cache: Dict[str, "OnnxClassifier"] = {}
+
+
+class _LogitsOnly(torch.nn.Module):
+    def __init__(self, model: torch.nn.Module) -> None:
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids: torch.Tensor, attention_mask: torch.Tensor) -> torch.Tensor:
+        return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+
+def quantized_onnx_path(onnx_path: Path | str) -> Path:
+    return Path(onnx_path).with_suffix(".int8.onnx")
+
+
+def _expose_dropout_switch(onnx_model) -> int:
+    """
+    Rewires the ``training_mode`` of every Dropout node to a boolean graph input, so one exported
+    model serves both the deterministic pass (False) and MC dropout (True).
+    """
+    import onnx
+
+    graph = onnx_model.graph
+    dropout_nodes = [node for node in graph.node if node.op_type == "Dropout"]
+    if not dropout_nodes:
+        raise RuntimeError("Exported graph has no Dropout nodes, MC dropout can't be enabled")
+
+    for node in dropout_nodes:
+        # Wejścia Dropout: data, ratio, training_mode (w eksporcie stała True)
+        node.input[2] = MC_DROPOUT_INPUT
+    graph.input.append(onnx.helper.make_tensor_value_info(MC_DROPOUT_INPUT, onnx.TensorProto.BOOL, []))
+
+    # Stałe training_mode nie mają już odbiorców
+    consumed = {name for node in graph.node for name in node.input}
+    unused = [node for node in graph.node if node.op_type == "Constant" and not set(node.output) & consumed]
+    for node in unused:
+        graph.node.remove(node)
+
+    return len(dropout_nodes)
+
+
+def _save_with_metadata(onnx_model, path: Path, metadata: Dict[str, str]) -> None:
+    import onnx
+
+    onnx.helper.set_model_props(onnx_model, metadata)
+    onnx.checker.check_model(onnx_model)
+    onnx.save(onnx_model, str(path))
+
+
+def export_onnx(
+        model_path: Path | str = DEFAULT_MODEL_PATH,
+        output_path: Path | str = ONNX_MODEL_PATH,
+        *,
+        quantize: bool = False,
+        mc_dropout: bool = False,
+        opset: int = ONNX_OPSET,
+) -> Dict[str, object]:
+    """
+    Exports the fine-tuned checkpoint to ONNX, with its calibrated temperature in the model metadata.
+
+    With ``mc_dropout`` the dropout layers stay in the graph behind the ``mc_dropout`` input, so
+    the ONNX backend can serve the MC dropout tiers; without it they are folded away and those
+    tiers fall back to a single deterministic pass. With ``quantize`` an INT8 copy (dynamic
+    quantization of the weights) is written next to it as ``*.int8.onnx``.
+    """
+    import onnx
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    model, temperature = load_checkpoint(model_path, device=torch.device("cpu"))
+    model.eval()
+    tokenizer = load_tokenizer()
+    # noinspection PyCallingNonCallable
+    sample = tokenizer("Factify ONNX export sample text.", return_tensors="pt")
+    inputs = (sample["input_ids"], sample["attention_mask"])
+
+    with dropout_train_mode(model) if mc_dropout else nullcontext():
+        torch.onnx.export(
+            _LogitsOnly(model),
+            inputs,
+            str(output_path),
+            input_names=["input_ids", "attention_mask"],
+            output_names=["logits"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "logits": {0: "batch"},
+            },
+            opset_version=opset,
+            # PRESERVE zostawia Dropouty w trybie train jako węzły grafu, EVAL je usuwa
+            training=torch.onnx.TrainingMode.PRESERVE if mc_dropout else torch.onnx.TrainingMode.EVAL,
+            do_constant_folding=not mc_dropout,
+        )
+
+    metadata = {
+        "temperature": repr(float(temperature)),
+        "base_model": str(NLP_MODEL_NAME),
+        "model_identity": model_identity(model_path),
+        "mc_dropout": "1" if mc_dropout else "0",
+        "quantized": "0",
+    }
+
+    onnx_model = onnx.load(str(output_path))
+    dropout_nodes = _expose_dropout_switch(onnx_model) if mc_dropout else 0
+    _save_with_metadata(onnx_model, output_path, metadata)
+
+    result: Dict[str, object] = {
+        "onnx_path": str(output_path),
+        "quantized_path": None,
+        "temperature": float(temperature),
+        "mc_dropout": mc_dropout,
+        "dropout_nodes": dropout_nodes,
+        "opset": opset,
+    }
+
+    # Kontrola zgodności z PyTorch na próbce (deterministyczny przebieg)
+    with torch.no_grad():
+        expected = model(**sample).logits.numpy()
+    actual = OnnxClassifier(output_path)(**sample).logits.numpy()
+    result["max_abs_diff"] = float(np.abs(expected - actual).max())
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantized_path = quantized_onnx_path(output_path)
+        quantize_dynamic(str(output_path), str(quantized_path), weight_type=QuantType.QInt8)
+        _save_with_metadata(onnx.load(str(quantized_path)), quantized_path, {**metadata, "quantized": "1"})
+        result["quantized_path"] = str(quantized_path)
+
+    return result
+
+
+def _available_cpus() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return max(1, os.cpu_count() or 1)
+
+
+class OnnxClassifier(torch.nn.Module):
+    """
+    ONNX Runtime session behind the interface of the HF classifier, so ``run_model_inference`` runs
+    it unchanged: it's called with the tokenizer output and returns ``.logits``.
+
+    ``dropout_train_mode`` switches the ``mc_switch`` dropout module on, which turns the graph's
+    dropout on for the MC passes. ONNX Runtime draws its own dropout masks, so MC results don't
+    follow ``torch.manual_seed``.
+    """
+
+    def __init__(self, onnx_path: Path | str, *, threads: int = ONNX_INTRA_OP_THREADS) -> None:
+        super().__init__()
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        # Jedna sesja na proces - wszystkie wątki na operacje wewnątrz grafu, bez równoległych gałęzi
+        options.intra_op_num_threads = threads if threads > 0 else _available_cpus()
+        options.inter_op_num_threads = 1
+
+        self.onnx_path = Path(onnx_path)
+        self.session = ort.InferenceSession(str(onnx_path), sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_names = {node.name for node in self.session.get_inputs()}
+        self.supports_mc_dropout = MC_DROPOUT_INPUT in self.input_names
+        self.mc_switch = torch.nn.Dropout()
+
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self._factify_temperature = max(float(metadata.get("temperature", 1.0)), 1e-3)
+        self.eval()
+
+    def forward(self, input_ids: torch.Tensor, attention_mask: torch.Tensor, **_) -> SequenceClassifierOutput:
+        feed = {
+            "input_ids": input_ids.detach().cpu().numpy().astype(np.int64, copy=False),
+            "attention_mask": attention_mask.detach().cpu().numpy().astype(np.int64, copy=False),
+        }
+        if self.supports_mc_dropout:
+            feed[MC_DROPOUT_INPUT] = np.array(self.mc_switch.training)
+
+        logits = self.session.run(["logits"], feed)[0]
+        return SequenceClassifierOutput(logits=torch.from_numpy(logits))
+
+
+def resolve_onnx_path(model_path: Path | str | None = None) -> Path:
+    """``model_path`` if it already points to an ONNX file, otherwise the configured ONNX model."""
+    if model_path is not None and Path(model_path).suffix == ".onnx":
+        return Path(model_path)
+    return ONNX_MODEL_PATH
+
+
+def load_onnx_artifacts(model_path: Path | str | None = None) -> Tuple[AutoTokenizer, OnnxClassifier]:
+    onnx_path = resolve_onnx_path(model_path)
+    if not onnx_path.exists():
+        raise FileNotFoundError(f"ONNX model not found: {onnx_path}. Run the 'export' command first.")
+
+    key = str(onnx_path.resolve())
+    if key not in _session_cache:
+        _session_cache[key] = OnnxClassifier(onnx_path)
+
+    return load_tokenizer(), _session_cache[key]
@@ -1,18 +1,26 @@
+import copy, re
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Dict, Optional, Tuple
 from torch import nn
 
 import numpy as np, torch
+import torch.nn.functional as F
 from transformers import AutoModelForSequenceClassification, get_linear_schedule_with_warmup
 
 from .config import (
 	DEFAULT_DATA_PATH,
+	DEFAULT_MODEL_PATH,
+	DISTILL_ALPHA,
+	DISTILL_TEMPERATURE,
+	MC_DROPOUT_PASSES,
+	MC_DROPOUT_SEED,
 	NLP_MODEL_NAME,
+	STUDENT_NUM_LAYERS,
 )
 from .data import create_dataloaders, prepare_splits
 from .evaluation import evaluate_model
-from .model_utils import get_device, load_model_artifacts
+from .model_utils import get_device, load_checkpoint, load_model_artifacts, load_student_artifacts, load_tokenizer, model_identity
 from .artifacts import build_run_artifact_paths, generate_run_name
 from .calibration import fit_temperature_scaling
 from .analysis import compute_dataset_stats,compute_length_bucket_metrics
@@ -41,6 +49,105 @@ class TrainingArtifacts:
 	calibration_metrics_path: Path
 	temperature: float
 
+def _train_epochs(
+	model: torch.nn.Module,
+	train_loader,
+	*,
+	epochs: int,
+	learning_rate: float,
+	weight_decay: float,
+	warmup_ratio: float,
+	device: torch.device,
+	compute_loss: Callable[[Dict[str, torch.Tensor], torch.Tensor], torch.Tensor],
+) -> None:
+	optimizer = torch.optim.AdamW(model.parameters(), lr=learning_rate, weight_decay=weight_decay)
+	total_steps = len(train_loader) * epochs
+	warmup_steps = int(total_steps * warmup_ratio)
+	scheduler = get_linear_schedule_with_warmup(
+		optimizer,
+		num_warmup_steps=max(0, warmup_steps),
+		num_training_steps=total_steps
+	)
+
+	for epoch in range(epochs):
+		model.train()
+		epoch_losses: list[float] = []
+		for batch in train_loader:
+			batch = {key: value.to(device) for key, value in batch.items()}
+			outputs = model(
+				input_ids=batch["input_ids"],
+				attention_mask=batch["attention_mask"],
+			)
+			logits = outputs.logits
+			loss = compute_loss(batch, logits)
+
+			loss.backward()
+			torch.nn.utils.clip_grad_norm_(model.parameters(), max_norm=1.0)
+			optimizer.step()
+			scheduler.step()
+			optimizer.zero_grad()
+			epoch_losses.append(loss.item())
+
+		avg_loss = float(np.mean(epoch_losses)) if epoch_losses else 0.0
+		print(f"Epoch {epoch + 1}/{epochs} — training loss: {avg_loss:.4f}")
+
+def _finish_run(
+	model: torch.nn.Module,
+	*,
+	calibration_loader,
+	test_loader,
+	device: torch.device,
+	model_output_path: Path,
+	metrics_output_path: Path,
+	confusion_output_path: Path,
+	run_paths,
+	dataset_stats,
+	params_payload: Dict[str, object],
+	checkpoint_extra: Dict[str, object] | None = None,
+) -> Tuple[float, Optional[Path]]:
+	"""Calibrates, evaluates and saves the model with all run reports; returns (temperature, fails path)."""
+	calibration_outcome = fit_temperature_scaling(model, calibration_loader, device=device)
+	temperature = calibration_outcome.temperature
+	setattr(model, "_factify_temperature", temperature)
+	metrics = evaluate_model(model, test_loader, device=device, temperature=temperature)
+	torch.save({
+		"model_state_dict": model.state_dict(),
+		"temperature": temperature,
+		**(checkpoint_extra or {}),
+	}, model_output_path)
+	save_metrics(metrics["report"], metrics["accuracy"], metrics_output_path)
+	plot_confusion_matrix(metrics["confusion_matrix"], ["human", "generated"], confusion_output_path)
+	save_dataset_stats(dataset_stats, run_paths.dataset_stats_path)
+	length_metrics = compute_length_bucket_metrics(metrics.get("records", []))
+	save_length_metrics(length_metrics, run_paths.length_metrics_path)
+	save_calibration_metadata({"temperature": temperature}, run_paths.calibration_path)
+	save_calibration_metadata(calibration_outcome.report, run_paths.calibration_metrics_path)
+	save_params(params_payload, run_paths.params_path)
+	fails_records = [record for record in metrics.get("records", []) if record.get("true_label") != record.get("pred_label")]
+	fails_path: Optional[Path] = None
+	if fails_records:
+		save_fails(fails_records, run_paths.fails_path)
+		fails_path = run_paths.fails_path
+
+	return temperature, fails_path
+
+def _run_outputs(
+	run_name: str,
+	output_model_path: Path | str | None,
+	metrics_path: Path | str | None,
+	confusion_matrix_path: Path | str | None,
+):
+	run_paths = build_run_artifact_paths(run_name)
+
+	model_output_path = Path(output_model_path) if output_model_path is not None else run_paths.model_path
+	metrics_output_path = Path(metrics_path) if metrics_path is not None else run_paths.metrics_path
+	confusion_output_path = Path(confusion_matrix_path) if confusion_matrix_path is not None else run_paths.confusion_matrix_path
+
+	for parent in {model_output_path.parent, metrics_output_path.parent, confusion_output_path.parent}:
+		parent.mkdir(parents=True, exist_ok=True)
+
+	return run_paths, model_output_path, metrics_output_path, confusion_output_path
+
 def train_model(
 	data_path: Path | str = DEFAULT_DATA_PATH,
 	*,
@@ -62,14 +169,12 @@ def train_model(
 	tokenizer, _ = load_model_artifacts(force_reload=True, device=device)
 
 	resolved_run_name = run_name or generate_run_name()
-	run_paths = build_run_artifact_paths(resolved_run_name)
-
-	model_output_path = Path(output_model_path) if output_model_path is not None else run_paths.model_path
-	metrics_output_path = Path(metrics_path) if metrics_path is not None else run_paths.metrics_path
-	confusion_output_path = Path(confusion_matrix_path) if confusion_matrix_path is not None else run_paths.confusion_matrix_path
-
-	for parent in {model_output_path.parent, metrics_output_path.parent, confusion_output_path.parent}:
-		parent.mkdir(parents=True, exist_ok=True)
+	run_paths, model_output_path, metrics_output_path, confusion_output_path = _run_outputs(
+		resolved_run_name,
+		output_model_path,
+		metrics_path,
+		confusion_matrix_path
+	)
 
 	train_frame, calibration_frame, test_frame = prepare_splits(
 		data_path,
@@ -93,56 +198,211 @@ def train_model(
 	label_smoothing_factor=0.1
 	loss_fn = nn.CrossEntropyLoss(label_smoothing=label_smoothing_factor)
 
-	optimizer = torch.optim.AdamW(model.parameters(), lr=learning_rate, weight_decay=weight_decay)
-	total_steps = len(train_loader) * epochs
-	warmup_steps = int(total_steps * warmup_ratio)
-	scheduler = get_linear_schedule_with_warmup(
-		optimizer,
-		num_warmup_steps=max(0, warmup_steps),
-		num_training_steps=total_steps
+	_train_epochs(
+		model,
+		train_loader,
+		epochs=epochs,
+		learning_rate=learning_rate,
+		weight_decay=weight_decay,
+		warmup_ratio=warmup_ratio,
+		device=device,
+		compute_loss=lambda batch, logits: loss_fn(logits, batch["labels"]),
 	)
 
-	for epoch in range(epochs):
-		model.train()
-		epoch_losses: list[float] = []
-		for batch in train_loader:
-			batch = {key: value.to(device) for key, value in batch.items()}
-			outputs = model(
-				input_ids=batch["input_ids"],
-				attention_mask=batch["attention_mask"],
-			)
-			logits = outputs.logits
-			loss = loss_fn(logits, batch["labels"])
+	params_payload = {
+		"run_name": resolved_run_name,
+		"model_name": NLP_MODEL_NAME,
+		"num_labels": 2,
+		"hyperparameters": {
+			"epochs": epochs,
+			"batch_size": batch_size,
+			"learning_rate": learning_rate,
+			"weight_decay": weight_decay,
+			"warmup_ratio": warmup_ratio,
+			"max_length": max_length,
+			"calibration_size": calibration_size,
+			"mc_dropout_enabled": True,
+			"mc_dropout_passes": MC_DROPOUT_PASSES,
+		},
+		"data": {
+			"path": str(Path(data_path)),
+			"test_size": test_size,
+			"random_state": random_state,
+		},
+		"seeds": {
+			"training": random_state,
+			"mc_dropout": MC_DROPOUT_SEED,
+		},
+	}
+	temperature, fails_path = _finish_run(
+		model,
+		calibration_loader=calibration_loader,
+		test_loader=test_loader,
+		device=device,
+		model_output_path=model_output_path,
+		metrics_output_path=metrics_output_path,
+		confusion_output_path=confusion_output_path,
+		run_paths=run_paths,
+		dataset_stats=dataset_stats,
+		params_payload=params_payload,
+	)
 
-			loss.backward()
-			torch.nn.utils.clip_grad_norm_(model.parameters(), max_norm=1.0)
-			optimizer.step()
-			scheduler.step()
-			optimizer.zero_grad()
-			epoch_losses.append(loss.item())
+	load_model_artifacts(model_path=model_output_path, force_reload=True, device=device)
 
-		avg_loss = float(np.mean(epoch_losses)) if epoch_losses else 0.0
-		print(f"Epoch {epoch + 1}/{epochs} — training loss: {avg_loss:.4f}")
+	return TrainingArtifacts(
+		run_name=resolved_run_name,
+		model_path=model_output_path,
+		metrics_path=metrics_output_path,
+		confusion_matrix_path=confusion_output_path,
+		params_path=run_paths.params_path,
+		dataset_stats_path=run_paths.dataset_stats_path,
+		length_metrics_path=run_paths.length_metrics_path,
+		report_dir=run_paths.report_dir,
+		fails_path=fails_path,
+		calibration_path=run_paths.calibration_path,
+		calibration_metrics_path=run_paths.calibration_metrics_path,
+		temperature=temperature
+	)
+
+def build_student_model(teacher: torch.nn.Module, num_layers: int = STUDENT_NUM_LAYERS) -> torch.nn.Module:
+	"""
+	Student with ``num_layers`` transformer layers initialised from the teacher: embeddings, classifier
+	and layers spread evenly over the teacher's stack (first and last always kept), as in DistilBERT.
+	"""
+	teacher_layers = teacher.config.num_hidden_layers
+	if not 0 < num_layers <= teacher_layers:
+		raise ValueError(f"num_layers must be between 1 and {teacher_layers}")
+
+	config = copy.deepcopy(teacher.config)
+	config.num_hidden_layers = num_layers
+	student = AutoModelForSequenceClassification.from_config(config)
+
+	picked = np.linspace(0, teacher_layers - 1, num_layers).round().astype(int).tolist()
+	layer_map = {teacher_layer: student_layer for student_layer, teacher_layer in enumerate(picked)}
+	layer_key = re.compile(rf"^{re.escape(teacher.base_model_prefix)}\.encoder\.layer\.(\d+)\.(.+)$")
+
+	state_dict = {}
+	for key, value in teacher.state_dict().items():
+		match = layer_key.match(key)
+		if match is None:
+			state_dict[key] = value
+		elif int(match.group(1)) in layer_map:
+			state_dict[f"{teacher.base_model_prefix}.encoder.layer.{layer_map[int(match.group(1))]}.{match.group(2)}"] = value
+	student.load_state_dict(state_dict)
+
+	return student
+
+def distillation_loss(student_logits: torch.Tensor, teacher_logits: torch.Tensor, temperature: float) -> torch.Tensor:
+	# KL między zmiękczonymi rozkładami; * T^2 utrzymuje skalę gradientów niezależną od temperatury
+	return F.kl_div(
+		F.log_softmax(student_logits / temperature, dim=-1),
+		F.softmax(teacher_logits / temperature, dim=-1),
+		reduction="batchmean",
+	) * temperature ** 2
+
+def distill_model(
+	data_path: Path | str = DEFAULT_DATA_PATH,
+	*,
+	teacher_model_path: Path | str = DEFAULT_MODEL_PATH,
+	student_model_name: str | None = None,
+	student_layers: int = STUDENT_NUM_LAYERS,
+	distill_temperature: float = DISTILL_TEMPERATURE,
+	alpha: float = DISTILL_ALPHA,
+	epochs: int = 1,
+	batch_size: int = 16,
+	learning_rate: float = 5e-5,
+	weight_decay: float = 0.01,
+	warmup_ratio: float = 0.1,
+	max_length: int = 128,
+	test_size: float = 0.2,
+	calibration_size: float = 0.1,
+	random_state: int = 42,
+	output_model_path: Path | str | None = None,
+	metrics_path: Path | str | None = None,
+	confusion_matrix_path: Path | str | None = None,
+	run_name: str | None = None
+) -> TrainingArtifacts:
+	"""
+	Distils the fine-tuned teacher into a small student for the first stage of the cascade.
+
+	The student learns from the teacher's softened logits (weight ``alpha``) and from the labels,
+	on the same splits as ``train_model``. By default it is a ``student_layers``-layer copy of the
+	teacher; ``student_model_name`` (e.g. ``distilroberta-base``) must share the teacher's tokenizer.
+	"""
+	if not 0 <= alpha <= 1:
+		raise ValueError("alpha must be between 0 and 1")
+	if distill_temperature <= 0:
+		raise ValueError("distill_temperature must be positive")
+
+	device = get_device()
+	tokenizer = load_tokenizer()
+	teacher, _ = load_checkpoint(teacher_model_path, device=device)
+	teacher.eval()
+
+	if student_model_name is None:
+		student = build_student_model(teacher, student_layers)
+	else:
+		student = AutoModelForSequenceClassification.from_pretrained(student_model_name, num_labels=2)
+		if student.config.vocab_size != teacher.config.vocab_size:
+			raise ValueError(f"{student_model_name} doesn't share the teacher's tokenizer (vocab size differs)")
+	student.to(device)
+
+	resolved_run_name = run_name or generate_run_name(prefix="roberta_student")
+	run_paths, model_output_path, metrics_output_path, confusion_output_path = _run_outputs(
+		resolved_run_name,
+		output_model_path,
+		metrics_path,
+		confusion_matrix_path
+	)
+
+	train_frame, calibration_frame, test_frame = prepare_splits(
+		data_path,
+		test_size=test_size,
+		calibration_size=calibration_size,
+		random_state=random_state
+	)
+	train_loader, calibration_loader, test_loader = create_dataloaders(
+		train_frame,
+		calibration_frame,
+		test_frame,
+		tokenizer,
+		max_length=max_length,
+		batch_size=batch_size
+	)
+	dataset_stats = compute_dataset_stats(train_frame, test_frame)
+
+	label_loss_fn = nn.CrossEntropyLoss(label_smoothing=0.1)
+
+	def compute_loss(batch: Dict[str, torch.Tensor], logits: torch.Tensor) -> torch.Tensor:
+		with torch.no_grad():
+			teacher_logits = teacher(input_ids=batch["input_ids"], attention_mask=batch["attention_mask"]).logits
+		soft_loss = distillation_loss(logits, teacher_logits, distill_temperature)
+		return alpha * soft_loss + (1 - alpha) * label_loss_fn(logits, batch["labels"])
+
+	_train_epochs(
+		student,
+		train_loader,
+		epochs=epochs,
+		learning_rate=learning_rate,
+		weight_decay=weight_decay,
+		warmup_ratio=warmup_ratio,
+		device=device,
+		compute_loss=compute_loss,
+	)
 
-	calibration_outcome = fit_temperature_scaling(model, calibration_loader, device=device)
-	temperature = calibration_outcome.temperature
-	setattr(model, "_factify_temperature", temperature)
-	metrics = evaluate_model(model, test_loader, device=device, temperature=temperature)
-	torch.save({
-		"model_state_dict": model.state_dict(),
-		"temperature": temperature
-	}, model_output_path)
-	save_metrics(metrics["report"], metrics["accuracy"], metrics_output_path)
-	plot_confusion_matrix(metrics["confusion_matrix"], ["human", "generated"], confusion_output_path)
-	save_dataset_stats(dataset_stats, run_paths.dataset_stats_path)
-	length_metrics = compute_length_bucket_metrics(metrics.get("records", []))
-	save_length_metrics(length_metrics, run_paths.length_metrics_path)
-	save_calibration_metadata({"temperature": temperature}, run_paths.calibration_path)
-	save_calibration_metadata(calibration_outcome.report, run_paths.calibration_metrics_path)
 	params_payload = {
 		"run_name": resolved_run_name,
-		"model_name": NLP_MODEL_NAME,
+		"model_name": student_model_name or f"{NLP_MODEL_NAME} ({student.config.num_hidden_layers} layers)",
 		"num_labels": 2,
+		"distillation": {
+			"teacher_model_path": str(Path(teacher_model_path)),
+			"teacher_identity": model_identity(teacher_model_path),
+			"temperature": distill_temperature,
+			"alpha": alpha,
+			"student_layers": student.config.num_hidden_layers,
+			"student_parameters": sum(parameter.numel() for parameter in student.parameters()),
+			"teacher_parameters": sum(parameter.numel() for parameter in teacher.parameters()),
+		},
 		"hyperparameters": {
 			"epochs": epochs,
 			"batch_size": batch_size,
@@ -152,7 +412,7 @@ def train_model(
 			"max_length": max_length,
 			"calibration_size": calibration_size,
 			"mc_dropout_enabled": True,
-			"mc_dropout_passes": 16,
+			"mc_dropout_passes": MC_DROPOUT_PASSES,
 		},
 		"data": {
 			"path": str(Path(data_path)),
@@ -161,17 +421,24 @@ def train_model(
 		},
 		"seeds": {
 			"training": random_state,
-			"mc_dropout": 42,
+			"mc_dropout": MC_DROPOUT_SEED,
 		},
 	}
-	save_params(params_payload, run_paths.params_path)
-	fails_records = [record for record in metrics.get("records", []) if record.get("true_label") != record.get("pred_label")]
-	fails_path: Optional[Path] = None
-	if fails_records:
-		save_fails(fails_records, run_paths.fails_path)
-		fails_path = run_paths.fails_path
+	temperature, fails_path = _finish_run(
+		student,
+		calibration_loader=calibration_loader,
+		test_loader=test_loader,
+		device=device,
+		model_output_path=model_output_path,
+		metrics_output_path=metrics_output_path,
+		confusion_output_path=confusion_output_path,
+		run_paths=run_paths,
+		dataset_stats=dataset_stats,
+		params_payload=params_payload,
+		checkpoint_extra={"config": student.config.to_dict()},
+	)
 
-	load_model_artifacts(model_path=model_output_path, force_reload=True, device=device)
+	load_student_artifacts(model_output_path, force_reload=True, device=device)
 
 	return TrainingArtifacts(
 		run_name=resolved_run_name,
@@ -0,0 +1,56 @@
+import pytest
+import torch
+from transformers import RobertaConfig, RobertaForSequenceClassification
+
+from ..detector.inference import _length_buckets, run_bucketed_inference, run_model_inference
+
+
+@pytest.fixture(scope="module")
+def tiny_model():
+    """Mały, losowo zainicjalizowany RoBERTa - wystarczy do sprawdzenia kolejności wierszy."""
+    torch.manual_seed(0)
+    config = RobertaConfig(vocab_size=100, hidden_size=32, num_hidden_layers=2, num_attention_heads=2,
+                           intermediate_size=64, max_position_embeddings=160, num_labels=2)
+    return RobertaForSequenceClassification(config).eval()
+
+
+def padded_batch(lengths):
+    generator = torch.Generator().manual_seed(1)
+    width = max(lengths)
+    input_ids = torch.ones(len(lengths), width, dtype=torch.long)
+    attention_mask = torch.zeros(len(lengths), width, dtype=torch.long)
+    for row, length in enumerate(lengths):
+        input_ids[row, :length] = torch.randint(5, 100, (length,), generator=generator)
+        attention_mask[row, :length] = 1
+    return {"input_ids": input_ids, "attention_mask": attention_mask}
+
+
+class TestLengthBuckets:
+    """Grupowanie wierszy według długości przed forward passem."""
+
+    def test_buckets_cover_every_row_once(self):
+        """Test czy każdy wiersz trafia do dokładnie jednego kubełka"""
+        lengths = [7, 120, 3, 64, 64, 15, 99, 1]
+        buckets = _length_buckets(lengths, 128)
+        assert sorted(idx for bucket in buckets for idx in bucket) == list(range(len(lengths)))
+
+    def test_buckets_respect_token_budget(self):
+        """Test czy kubełek wyrównany do najdłuższego wiersza mieści się w budżecie"""
+        lengths = [7, 120, 3, 64, 64, 15, 99, 1]
+        for bucket in _length_buckets(lengths, 128):
+            assert len(bucket) == 1 or len(bucket) * max(lengths[idx] for idx in bucket) <= 128
+
+    def test_row_longer_than_budget(self):
+        """Test czy zbyt długi wiersz dostaje własny kubełek zamiast zostać pominięty"""
+        assert _length_buckets([300, 10], 128) == [[1], [0]]
+
+    def test_restores_row_order(self, tiny_model):
+        """Test czy wyniki wracają w kolejności wejścia, tak jak przy jednym batchu z paddingiem"""
+        encoded = padded_batch([40, 5, 120, 17, 5, 88, 33])
+        expected = run_model_inference(tiny_model, encoded, temperature=1.3, mc_dropout=False)
+        bucketed = run_bucketed_inference(tiny_model, encoded, max_batch_tokens=128, temperature=1.3,
+                                          mc_dropout=False)
+
+        assert len(_length_buckets(encoded["attention_mask"].sum(dim=1).tolist(), 128)) > 1
+        for key, values in expected.items():
+            assert torch.allclose(bucketed[key].float(), values.float(), atol=1e-5), key
@@ -0,0 +1,100 @@
+import re
+
+import pytest
+
+from ..detector.chunking import build_chunks, build_token_chunks
+
+TEXT = (
+    "The committee met on Monday. Nobody expected the vote to pass!  Was it fair? "
+    "Several members said \"no comment.\" and left early (as usual.) The chair, however, "
+    "stayed until the end... e.g. the budget items 3.14 and 2.71 were discussed at length\n\n"
+    "Later that week the press asked again. Answers were short; most were vague. "
+    "In the end the proposal was rejected, then revived, then rejected again! "
+    "Observers called it a farce. Others called it democracy at work. "
+    "A final note: the minutes were published on Friday"
+)
+
+
+class RegexTokenizer:
+    """Szybki tokenizer w miniaturze: token = słowo albo znak interpunkcyjny, z offsetami znaków."""
+
+    def num_special_tokens_to_add(self, pair=False):
+        return 2
+
+    def __call__(self, text, add_special_tokens=True, return_offsets_mapping=False, truncation=True):
+        return {"offset_mapping": [match.span() for match in re.finditer(r"\w+|[^\w\s]", text)]}
+
+
+def word_ranges(chunks):
+    return [(chunk.word_start, chunk.word_end) for chunk in chunks]
+
+
+class TestBuildChunks:
+    """Podział na słowa - granice muszą być takie same jak przy starym skanowaniu słowo po słowie."""
+
+    @pytest.mark.parametrize("params, expected", [
+        (dict(words_per_chunk=12),
+         [(0, 11), (11, 24), (24, 36), (36, 49), (49, 61), (61, 72), (72, 87)]),
+        (dict(words_per_chunk=12, stride_words=6),
+         [(0, 11), (5, 19), (11, 24), (19, 31), (24, 36), (31, 43), (37, 49), (43, 55), (49, 61), (55, 67),
+          (61, 72), (67, 78), (72, 87)]),
+        (dict(words_per_chunk=20, min_words=8),
+         [(0, 19), (19, 39), (39, 55), (55, 78), (78, 87)]),
+        (dict(words_per_chunk=5, stride_words=3, min_words=2),
+         [(0, 5), (5, 11), (11, 14), (14, 19), (19, 24), (24, 31), (27, 32), (31, 36), (34, 39), (37, 42),
+          (40, 45), (43, 49), (49, 55), (55, 60), (58, 63), (61, 67), (67, 72), (72, 78), (78, 83), (81, 87)]),
+    ])
+    def test_matches_word_scan(self, params, expected):
+        """Test czy granice chunków zgadzają się z wynikiem starej implementacji"""
+        assert word_ranges(build_chunks(TEXT, **params)) == expected
+
+    def test_chunk_offsets(self):
+        """Test czy offsety, tekst i liczba słów chunków są spójne z tekstem"""
+        words = TEXT.split()
+        for index, chunk in enumerate(build_chunks(TEXT, words_per_chunk=12, stride_words=6)):
+            assert chunk.index == index
+            assert chunk.text == TEXT[chunk.start:chunk.end]
+            assert chunk.text.split() == words[chunk.word_start:chunk.word_end]
+            assert chunk.word_count == chunk.word_end - chunk.word_start
+
+    def test_empty_text(self):
+        """Test czy pusty tekst nie daje chunków"""
+        assert build_chunks("", words_per_chunk=12) == []
+        assert build_chunks(" \n\t", words_per_chunk=12) == []
+
+    def test_invalid_words_per_chunk(self):
+        """Test czy niedodatni rozmiar chunka jest odrzucany"""
+        with pytest.raises(ValueError):
+            build_chunks(TEXT, words_per_chunk=0)
+
+
+class TestBuildTokenChunks:
+    """Podział według budżetu tokenów - granice muszą być takie same jak przy starym skanowaniu słów."""
+
+    @pytest.mark.parametrize("params, expected", [
+        (dict(max_tokens=24),
+         [(0, 14), (14, 24), (24, 32), (32, 49), (49, 66), (66, 84), (84, 87)]),
+        (dict(max_tokens=24, stride_tokens=10),
+         [(0, 14), (11, 24), (19, 31), (24, 32), (31, 46), (36, 49), (44, 62), (55, 72), (67, 86), (78, 87)]),
+        (dict(max_tokens=40, min_words=10),
+         [(0, 24), (24, 49), (49, 78), (55, 87)]),
+        (dict(max_tokens=8),
+         [(0, 5), (5, 10), (10, 14), (14, 18), (18, 22), (22, 24), (24, 28), (28, 31), (31, 32), (32, 36),
+          (36, 40), (40, 46), (46, 49), (49, 54), (54, 59), (59, 63), (63, 67), (67, 72), (72, 77), (77, 81),
+          (81, 87)]),
+    ])
+    def test_matches_word_scan(self, params, expected):
+        """Test czy granice chunków zgadzają się z wynikiem starej implementacji"""
+        assert word_ranges(build_token_chunks(TEXT, RegexTokenizer(), **params)) == expected
+
+    def test_chunks_fit_budget(self):
+        """Test czy każdy chunk wieloczłonowy mieści się w budżecie tokenów"""
+        tokenizer = RegexTokenizer()
+        for chunk in build_token_chunks(TEXT, tokenizer, max_tokens=24):
+            tokens = len(tokenizer(chunk.text)["offset_mapping"]) + tokenizer.num_special_tokens_to_add()
+            assert chunk.word_count == 1 or tokens <= 24
+
+    def test_budget_without_room(self):
+        """Test czy budżet bez miejsca na tokeny specjalne jest odrzucany"""
+        with pytest.raises(ValueError):
+            build_token_chunks(TEXT, RegexTokenizer(), max_tokens=2)
@@ -0,0 +1,97 @@
+"""
+Micro-benchmark podziału tekstu na segmenty (build_chunks / build_token_chunks).
+
+Uruchomienie z katalogu cron/src/jobs/analyze:
+    python -m nlp.utils.benchmark_chunking --size-mb 1
+    python -m nlp.utils.benchmark_chunking --file książka.txt --tokenizer nlp/artifacts/base_model
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from pathlib import Path
+
+from ..detector.chunking import build_chunks, build_token_chunks
+from ..detector.config import SEGMENT_MIN_WORDS, SEGMENT_STRIDE_WORDS, SEGMENT_WORD_TARGET
+
+WORDS = (
+    "model", "text", "analysis", "the", "of", "and", "a", "sentence", "detector", "language",
+    "generated", "human", "probability", "segment", "document", "with", "is", "in", "results", "data",
+)
+
+
+def synthetic_text(size_bytes: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    parts = []
+    length = 0
+    while length < size_bytes:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 30)))
+        sentence = sentence.capitalize() + rng.choice((".", ".", ".", "?", "!", ".\""))
+        parts.append(sentence)
+        length += len(sentence) + 1
+        if rng.random() < 0.1:
+            parts.append("\n\n")
+    return " ".join(parts)[:size_bytes]
+
+
+def measure(label: str, func, repeats: int) -> None:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        chunks = func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    best = min(timings)
+    print(f"{label}: {len(chunks)} segmentów, najlepszy czas {best * 1000:.1f} ms, "
+          f"mediana {sorted(timings)[len(timings) // 2] * 1000:.1f} ms, szczyt pamięci {peak / 2 ** 20:.1f} MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark podziału tekstu na segmenty")
+    parser.add_argument("--size-mb", type=float, default=1.0, help="Rozmiar syntetycznego tekstu w MB")
+    parser.add_argument("--file", type=Path, help="Plik tekstowy zamiast tekstu syntetycznego")
+    parser.add_argument("--repeats", type=int, default=5, help="Liczba powtórzeń pomiaru")
+    parser.add_argument("--tokenizer", help="Ścieżka lub nazwa tokenizera - dodatkowo mierzy build_token_chunks")
+    parser.add_argument("--max-length", type=int, default=128, help="Budżet tokenów segmentu dla build_token_chunks")
+    args = parser.parse_args()
+
+    text = args.file.read_text(encoding="utf-8") if args.file else synthetic_text(int(args.size_mb * 2 ** 20))
+    print(f"Tekst: {len(text) / 2 ** 20:.2f} MB, {len(text.split())} słów")
+
+    measure(
+        "build_chunks",
+        lambda: build_chunks(
+            text,
+            words_per_chunk=SEGMENT_WORD_TARGET,
+            stride_words=SEGMENT_STRIDE_WORDS,
+            min_words=SEGMENT_MIN_WORDS,
+        ),
+        args.repeats,
+    )
+
+    if args.tokenizer:
+        from transformers import AutoTokenizer
+
+        tokenizer = AutoTokenizer.from_pretrained(args.tokenizer)
+        # Tokenizer ostrzega o tekście dłuższym niż model_max_length, a tu tokenizujemy cały dokument
+        tokenizer.model_max_length = len(text) + 1
+        measure(
+            "build_token_chunks",
+            lambda: build_token_chunks(
+                text,
+                tokenizer,
+                max_tokens=args.max_length,
+                stride_tokens=args.max_length // 2,
+                min_words=SEGMENT_MIN_WORDS,
+            ),
+            args.repeats,
+        )
+
+
+if __name__ == "__main__":
+    main()
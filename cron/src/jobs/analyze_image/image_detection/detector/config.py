@@ -47,4 +47,8 @@ VAL_TRANSFORM = transforms.Compose([
 ])
 
 
-CLASS_NAMES = ['ai', 'real']
\ No newline at end of file
+CLASS_NAMES = ['ai', 'real']
+
+# Inferencja wsadowa (predict_batch): rozmiar batcha i liczba wątków do preprocessingu
+INFERENCE_BATCH_SIZE = 32
+PREPROCESS_WORKERS = 4
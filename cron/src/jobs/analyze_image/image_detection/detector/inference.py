@@ -1,9 +1,14 @@
+import threading
+
 import torch
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
 from pathlib import Path
 
 # ZMIANA: użyj względnych importów
-from .config import DEVICE, VAL_TRANSFORM, CLASS_NAMES, BEST_MODEL_PATH
+from .config import (
+    DEVICE, VAL_TRANSFORM, CLASS_NAMES, BEST_MODEL_PATH, INFERENCE_BATCH_SIZE, PREPROCESS_WORKERS
+)
 from .model_utils import create_model
 
 
@@ -22,6 +27,8 @@ class ImageDetector:
         
         # Załaduj model
         self.model = self._load_model()
+        # Jeden model na proces, a zadania działają w kilku wątkach workera - forward passy po kolei
+        self._inference_lock = threading.Lock()
         
     def _load_model(self):
         """Załaduj wytrenowany model."""
@@ -34,8 +41,8 @@ class ImageDetector:
         from .model_utils import load_model
         return load_model(self.model_path, device=self.device)
     
-    def predict(self, image):
-       
+    def _load_image(self, image):
+        """Zamień ścieżkę lub PIL.Image na obraz RGB."""
         if isinstance(image, (str, Path)):
             image_path = Path(image)
             if not image_path.exists():
@@ -47,12 +54,20 @@ class ImageDetector:
         # Upewnij się, że obraz jest w RGB
         if image.mode != 'RGB':
             image = image.convert('RGB')
-        
+
+        return image
+
+    def _preprocess(self, image):
+        """Wczytaj obraz i zamień go na tensor (C, H, W) gotowy do modelu."""
+        return self.transform(self._load_image(image))
+
+    def predict(self, image):
+       
         # Przetwórz obraz
-        image_tensor = self.transform(image).unsqueeze(0).to(self.device)
+        image_tensor = self._preprocess(image).unsqueeze(0).to(self.device)
         
         # Predykcja
-        with torch.no_grad():
+        with self._inference_lock, torch.no_grad():
             outputs = self.model(image_tensor)
             probabilities = torch.softmax(outputs, dim=1)[0]
         
@@ -88,22 +103,73 @@ class ImageDetector:
             }
         }
     
-    def predict_batch(self, images):
+    def predict_batch(self, images, batch_size=None, num_workers=None):
         """
-        Przewiduj dla wielu obrazów.
+        Przewiduj dla wielu obrazów jednym forward passem na batch.
         
         Args:
             images: Lista PIL.Image lub ścieżek do obrazów
+            batch_size: Maksymalna liczba obrazów w jednym forward passie (domyślnie INFERENCE_BATCH_SIZE)
+            num_workers: Liczba wątków do preprocessingu (domyślnie PREPROCESS_WORKERS, 1 = bez wątków)
             
         Returns:
-            list: Lista wyników dla każdego obrazu
+            list: Lista wyników dla każdego obrazu ({'ai', 'real'} albo {'error'})
         """
-        results = []
-        for image in images:
+        batch_size = max(1, batch_size or INFERENCE_BATCH_SIZE)
+        num_workers = max(1, num_workers or PREPROCESS_WORKERS)
+        images = list(images)
+        results = [None] * len(images)
+
+        def preprocess(image):
             try:
-                result = self.predict(image)
-                results.append(result)
+                return self._preprocess(image)
             except Exception as e:
-                results.append({'error': str(e)})
+                return e
+
+        # Preprocessing (dekodowanie + transformacje) w wątkach - PIL i torchvision zwalniają GIL
+        if num_workers > 1 and len(images) > 1:
+            with ThreadPoolExecutor(max_workers=min(num_workers, len(images))) as executor:
+                tensors = list(executor.map(preprocess, images))
+        else:
+            tensors = [preprocess(image) for image in images]
+
+        valid = []
+        for idx, tensor in enumerate(tensors):
+            if isinstance(tensor, Exception):
+                results[idx] = {'error': str(tensor)}
+            else:
+                valid.append(idx)
+
+        for start in range(0, len(valid), batch_size):
+            indices = valid[start:start + batch_size]
+            try:
+                probabilities = self._forward([tensors[idx] for idx in indices])
+            except Exception:
+                # Błąd batcha (OOM, zły kształt jednego tensora) - każdy obraz osobno, żeby błąd dostały
+                # tylko te obrazy, które naprawdę nie przechodzą
+                for idx in indices:
+                    try:
+                        results[idx] = self._result(self._forward([tensors[idx]])[0])
+                    except Exception as e:
+                        results[idx] = {'error': str(e)}
+                continue
+
+            for idx, probs in zip(indices, probabilities):
+                results[idx] = self._result(probs)
         
         return results
+
+    def _forward(self, tensors):
+        """Jeden forward pass na stosie tensorów; prawdopodobieństwa klas dla każdego obrazu."""
+        batch = torch.stack(tensors).to(self.device)
+        with self._inference_lock, torch.no_grad():
+            outputs = self.model(batch)
+            # Jedna synchronizacja z urządzeniem na cały batch zamiast .item() na obraz
+            return torch.softmax(outputs, dim=1).cpu().tolist()
+
+    @staticmethod
+    def _result(probs):
+        return {
+            'ai': probs[0],  # ai_generated
+            'real': probs[1]  # real
+        }
@@ -83,4 +83,18 @@ def load_model(model_path, device='cpu'):
     model.to(device)
     model.eval()
     
-    return model
\ No newline at end of file
+    return model
+
+def model_identity(model_path):
+    """
+    Identyfikator wag modelu (nazwa, mtime i rozmiar pliku) - zmienia się po każdym nowym treningu.
+    
+    Args:
+        model_path: Ścieżka do modelu
+        
+    Returns:
+        str: Identyfikator modelu
+    """
+    model_path = Path(model_path)
+    stat = model_path.stat()
+    return f"efficientnet_b0:{model_path.name}:{stat.st_mtime_ns}:{stat.st_size}"
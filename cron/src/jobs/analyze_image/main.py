@@ -2,14 +2,35 @@ import io, base64
 
 from PIL import Image
 from datetime import datetime
+from pymongo.errors import ConnectionFailure
+
+from common.python.blob_store import read_blob
+from common.python.image_cache import AI_IMAGE_MODEL_INFO_ID, CACHED_IMAGE_FIELDS, ImageResultCache, image_sha256
 
 from context import TaskContext
+from retry import RetryPolicy
 from types_ import TaskPayload
 
 from .image_detection.detector import ImageDetector
-from config import DB_NAME, COL_ANALYSIS_AI_IMAGE
+from .image_detection.detector.model_utils import model_identity
+from config import (
+  DB_NAME, COL_ANALYSIS_AI_IMAGE, COL_IMAGE_CACHE, COL_CACHE_STATS, COL_MODEL_INFO, ANALYSIS_CACHE_TTL_SEC,
+  IMAGE_CACHE_DHASH_MAX_DISTANCE, IMAGE_CACHE_PERCEPTUAL
+)
 
 _detector = None
+_model_identity = None
+
+# An upload that fails to decode or predict fails the same way again; retry only when reading the GridFS
+# blob or writing the result loses the Mongo connection
+RETRY_POLICY = RetryPolicy(max_attempts=3, backoff_base_sec=2, retryable=(ConnectionFailure,))
+
+image_result_cache = ImageResultCache(
+  COL_IMAGE_CACHE,
+  COL_CACHE_STATS,
+  max_distance=IMAGE_CACHE_DHASH_MAX_DISTANCE,
+  ttl_seconds=ANALYSIS_CACHE_TTL_SEC,
+)
 
 def get_detector():
   global _detector
@@ -18,6 +39,35 @@ def get_detector():
   return _detector
 
 
+def publish_model_identity(database):
+  """Publishes the loaded model's identity once, so the backend can look up exact-hash cache hits too."""
+  global _model_identity
+
+  if _model_identity is None:
+    identity = model_identity(get_detector().model_path)
+    database[COL_MODEL_INFO].replace_one(
+      {"_id": AI_IMAGE_MODEL_INFO_ID},
+      {"_id": AI_IMAGE_MODEL_INFO_ID, "identity": identity, "updatedAt": datetime.utcnow()},
+      upsert=True,
+    )
+    _model_identity = identity
+
+  return _model_identity
+
+
+def compute_dhash(image, hash_size=8):
+  """64-bit difference hash: survives re-encoding and resizing, unlike a hash of the raw bytes."""
+  grey = image.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS)
+  pixels = list(grey.getdata())
+  value = 0
+  for row in range(hash_size):
+    for col in range(hash_size):
+      left = pixels[row * (hash_size + 1) + col]
+      right = pixels[row * (hash_size + 1) + col + 1]
+      value = (value << 1) | (1 if left > right else 0)
+  return value
+
+
 def generate_thumbnail(image, size=(300, 300)):
   try:
     thumb = image.copy()
@@ -31,25 +81,115 @@ def generate_thumbnail(image, size=(300, 300)):
   except Exception as e:
     print(f"Error generating thumbnail: {e}")
     return None
+
+
+def load_image_bytes(database, payload):
+  """Raw upload bytes: streamed from GridFS, or decoded from tasks queued before blobs were introduced."""
+  if payload.get("blob_id") is not None:
+    return read_blob(database, payload["blob_id"])
+  return base64.b64decode(payload["image_base64"])
+
+
+def lookup_cached(database, identity, image_bytes):
+  """
+  Returns (cached value or None, cache hit, sha256, dhash, image). The cache hit is True for the
+  same bytes and "perceptual" for a near-duplicate, which reuses another image's verdict. The
+  image is only decoded when the exact hash misses and the perceptual tier needs it.
+  """
+  sha256 = image_sha256(image_bytes)
+  cached = image_result_cache.find_exact(database, identity, sha256)
+  if cached is not None:
+    return cached, True, sha256, None, None
+
+  image = Image.open(io.BytesIO(image_bytes))
+  dhash = None
+  if IMAGE_CACHE_PERCEPTUAL:
+    try:
+      dhash = compute_dhash(image)
+    except Exception as e:
+      print(f"Error computing image dHash: {e}")
+  if dhash is not None:
+    cached = image_result_cache.find_similar(database, identity, dhash)
+  if cached is None:
+    image_result_cache.record_miss(database)
+    return None, None, sha256, dhash, image
+
+  return cached, "perceptual", sha256, dhash, image
+
   
 def task(payload: TaskPayload, ctx: TaskContext):
   filename = payload["filename"]
-  image_base64 = payload["image_base64"]
   user_id = payload["user_id"]
 
-  image_bytes = base64.b64decode(image_base64)
-  image = Image.open(io.BytesIO(image_bytes))
+  database = ctx.db.get_database(DB_NAME)
+  collection = database[COL_ANALYSIS_AI_IMAGE]
 
-  detector = get_detector()
-  result = detector.predict(image)
+  image_bytes = load_image_bytes(database, payload)
+
+  identity = publish_model_identity(database)
+  cached, cache_hit, sha256, dhash, image = lookup_cached(database, identity, image_bytes)
+
+  if cached is not None:
+    doc = build_cached_doc(filename, user_id, cached, cache_hit)
+  else:
+    detector = get_detector()
+    result = detector.predict(image)
+    doc = build_analysis_doc(filename, user_id, image, result)
+    image_result_cache.put(database, identity, sha256, dhash, {field: doc[field] for field in CACHED_IMAGE_FIELDS})
+
+  db_result = collection.insert_one(doc)
+  return db_result.inserted_id
 
-  ai_prob_pct = round(result["ai"] * 100, 2)
-  image_preview = generate_thumbnail(image)
 
+def task_batch(payloads: list[TaskPayload], ctx: TaskContext):
+  """
+  Drains several pending image tasks through one batched ImageDetector.predict_batch call.
+  Cached images skip the model and the thumbnail entirely.
+  Returns one entry per payload: the inserted id, or the exception that failed that payload.
+  """
   database = ctx.db.get_database(DB_NAME)
-  collection = database[COL_ANALYSIS_AI_IMAGE]
+  identity = publish_model_identity(database)
+
+  results: list = [None] * len(payloads)
+  docs = {}
+  decoded = []
+  for position, payload in enumerate(payloads):
+    try:
+      image_bytes = load_image_bytes(database, payload)
+      cached, cache_hit, sha256, dhash, image = lookup_cached(database, identity, image_bytes)
+      if cached is not None:
+        docs[position] = build_cached_doc(payload["filename"], payload["user_id"], cached, cache_hit)
+      else:
+        decoded.append((position, payload["filename"], payload["user_id"], image, sha256, dhash))
+    except Exception as e:
+      results[position] = e
+
+  if decoded:
+    detector = get_detector()
+    predictions = detector.predict_batch([image for _, _, _, image, _, _ in decoded])
+
+    for (position, filename, user_id, image, sha256, dhash), result in zip(decoded, predictions):
+      if "error" in result:
+        results[position] = RuntimeError(result["error"])
+        continue
+      doc = build_analysis_doc(filename, user_id, image, result)
+      image_result_cache.put(database, identity, sha256, dhash, {field: doc[field] for field in CACHED_IMAGE_FIELDS})
+      docs[position] = doc
+
+  if docs:
+    positions = list(docs)
+    db_result = database[COL_ANALYSIS_AI_IMAGE].insert_many([docs[position] for position in positions])
+    for position, inserted_id in zip(positions, db_result.inserted_ids):
+      results[position] = inserted_id
+
+  return results
 
-  doc = {
+
+def build_analysis_doc(filename, user_id, image, result):
+  ai_prob_pct = round(result["ai"] * 100, 2)
+  image_preview = generate_thumbnail(image)
+
+  return {
     "filename": filename,
     "ai_probability": ai_prob_pct,
     "user_id": user_id,
@@ -63,5 +203,13 @@ def task(payload: TaskPayload, ctx: TaskContext):
     "action": "image_analysis"    
   }
 
-  db_result = collection.insert_one(doc)
-  return db_result.inserted_id
\ No newline at end of file
+
+def build_cached_doc(filename, user_id, cached, cache_hit=True):
+  return {
+    **cached,
+    "filename": filename,
+    "user_id": user_id,
+    "timestamp": datetime.utcnow(),
+    "action": "image_analysis",
+    "cache_hit": cache_hit,
+  }
@@ -1,16 +1,24 @@
 import json
+import asyncio
+
+from pymongo.errors import ConnectionFailure
 
 from context import TaskContext
+from llm import LLMResponseFormatError, LLMTransientError
+from retry import RetryPolicy
 from types_ import TaskPayload
 from config import DB_NAME, COL_ANALYSIS_MANIPULATION
 
-def task(payload: TaskPayload, ctx: TaskContext):
-    text = payload["text"]
-    user_id = payload["user_id"]
+# LLM rate limits and outages usually pass within minutes; a malformed or cut-off JSON answer may come out
+# right next time
+RETRY_POLICY = RetryPolicy(
+    max_attempts=5,
+    backoff_base_sec=10,
+    retryable=(LLMTransientError, LLMResponseFormatError, ConnectionFailure, json.JSONDecodeError),
+)
 
-    print(f"[analyze_manipulation] Processing text:\n{text}")
-    response_json = ctx.llm.ask_json(
-        instructions="""
+
+INSTRUCTIONS = """
 You are an expert linguistic analyst specializing in forensic linguistics, media literacy, and the detection of cognitive biases and manipulative rhetoric.
 
 Your task is to analyze the provided text for specific categories of bias and manipulation. You must output the results strictly as a JSON object. Do not include any conversational filler, markdown formatting outside of the JSON block, or introductory/concluding remarks.
@@ -40,10 +48,39 @@ Your task is to analyze the provided text for specific categories of bias and ma
     ]
   }
 }
-        """,
-        input_text=text
+        """
+
+
+def task(payload: TaskPayload, ctx: TaskContext):
+    text = payload["text"]
+    user_id = payload["user_id"]
+
+    print(f"[analyze_manipulation] Processing text:\n{text}")
+    response_json = ctx.llm.ask_json(
+        instructions=INSTRUCTIONS,
+        input_text=text,
+        use_cache=not payload.get("bypass_cache", False),
+    )
+
+    return save_result(ctx, text, user_id, response_json)
+
+
+async def task_async(payload: TaskPayload, ctx: TaskContext):
+    """Same as ``task``, run on the worker's shared event loop so many LLM calls can wait at once."""
+    text = payload["text"]
+    user_id = payload["user_id"]
+
+    print(f"[analyze_manipulation] Processing text:\n{text}")
+    response_json = await ctx.async_llm.ask_json(
+        instructions=INSTRUCTIONS,
+        input_text=text,
+        use_cache=not payload.get("bypass_cache", False),
     )
 
+    return await asyncio.to_thread(save_result, ctx, text, user_id, response_json)
+
+
+def save_result(ctx: TaskContext, text, user_id, response_json):
     print(f"[analyze_manipulation] LLM response:")
     print(json.dumps(response_json, indent=4))
 
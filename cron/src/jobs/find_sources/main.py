@@ -1,16 +1,25 @@
 import json
+import asyncio
+
+from pymongo.errors import ConnectionFailure
 
 from context import TaskContext
+from llm import LLMResponseFormatError, LLMTransientError
+from retry import RetryPolicy
 from types_ import TaskPayload
 from config import DB_NAME, COL_ANALYSIS_SOURCES
 
-def task(payload: TaskPayload, ctx: TaskContext):
-    text = payload["text"]
-    user_id = payload["user_id"]
+# Search-grounded calls hit provider rate limits and timeouts that pass within minutes; the long source
+# lists are also where a truncated answer shows up (no closing fence, or JSON that doesn't parse),
+# and a new call usually fixes it
+RETRY_POLICY = RetryPolicy(
+    max_attempts=5,
+    backoff_base_sec=10,
+    retryable=(LLMTransientError, LLMResponseFormatError, ConnectionFailure, json.JSONDecodeError),
+)
 
-    print(f"[find_sources] Processing text:\n{text}")
-    response_json = ctx.llm.ask_json_with_search(
-        instructions="""
+
+INSTRUCTIONS = """
 You are an expert fact-checker and forensic linguist. Your task is to analyze the provided text for misinformation, factual inaccuracies, and manipulative rhetoric using external search grounding.
 
 ### OPERATIONAL PROTOCOL:
@@ -46,10 +55,39 @@ The JSON must be an array of objects. Each object must contain:
     "sources": ["..."]
   }
 ]
-        """,
-        input_text=text
+        """
+
+
+def task(payload: TaskPayload, ctx: TaskContext):
+    text = payload["text"]
+    user_id = payload["user_id"]
+
+    print(f"[find_sources] Processing text:\n{text}")
+    response_json = ctx.llm.ask_json_with_search(
+        instructions=INSTRUCTIONS,
+        input_text=text,
+        use_cache=not payload.get("bypass_cache", False),
+    )
+
+    return save_result(ctx, text, user_id, response_json)
+
+
+async def task_async(payload: TaskPayload, ctx: TaskContext):
+    """Same as ``task``, run on the worker's shared event loop so many LLM calls can wait at once."""
+    text = payload["text"]
+    user_id = payload["user_id"]
+
+    print(f"[find_sources] Processing text:\n{text}")
+    response_json = await ctx.async_llm.ask_json_with_search(
+        instructions=INSTRUCTIONS,
+        input_text=text,
+        use_cache=not payload.get("bypass_cache", False),
     )
 
+    return await asyncio.to_thread(save_result, ctx, text, user_id, response_json)
+
+
+def save_result(ctx: TaskContext, text, user_id, response_json):
     print(f"[find_sources] LLM response:")
     print(json.dumps(response_json, indent=4))
 
@@ -1,14 +1,127 @@
 import os
 import json
 import re
+import asyncio
+from typing import Awaitable, Callable, TypeVar
 
-from openai import OpenAI as OpenAIClient
-from google.genai import Client as GeminiClient, types
+import httpx
+import openai
+from openai import AsyncOpenAI as AsyncOpenAIClient, OpenAI as OpenAIClient
+from google.genai import Client as GeminiClient, errors as gemini_errors, types
+
+from common.python import db
+from common.python.analysis_cache import ResultCache, make_cache_key
+from config import DB_NAME, COL_LLM_CACHE, COL_CACHE_STATS
 
 LM_USE_GEMINI = os.getenv("LM_USE_GEMINI", "false").lower() == "true"
 LM_API_BASE_URL = os.getenv("LM_API_BASE_URL")
 LM_API_KEY = os.getenv("LM_API_KEY")
 LM_MODEL = os.getenv("LM_MODEL")
+# AsyncLLM: max LLM calls in flight per process (also the size of the HTTP connection pool) and per-call timeout
+LM_MAX_CONCURRENCY = max(1, int(os.getenv("LM_MAX_CONCURRENCY", "16")))
+LM_TIMEOUT_SEC = float(os.getenv("LM_TIMEOUT_SEC", "120"))
+# Cache of parsed JSON answers: in-process LRU size, Mongo TTL (seconds) and max stored entries
+LM_CACHE_ENABLED = os.getenv("LM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+LM_CACHE_SIZE = int(os.getenv("LM_CACHE_SIZE", "512"))
+LM_CACHE_TTL_SEC = int(os.getenv("LM_CACHE_TTL_SEC", str(7 * 24 * 3600)))
+LM_CACHE_MAX_ENTRIES = int(os.getenv("LM_CACHE_MAX_ENTRIES", "20000"))
+
+T = TypeVar("T")
+
+
+class LLMTransientError(Exception):
+    """Rate limit, timeout or server error of the LLM provider - the same request may succeed later."""
+
+
+class LLMResponseFormatError(ValueError):
+    """The answer has no fenced JSON block, usually because the model's output was cut off."""
+
+
+def _is_transient(error: Exception) -> bool:
+    if isinstance(error, (
+        openai.RateLimitError,
+        openai.APIConnectionError,
+        openai.InternalServerError,
+        gemini_errors.ServerError,
+    )):
+        return True
+
+    return isinstance(error, gemini_errors.ClientError) and error.code == 429
+
+
+# Shared by LLM and AsyncLLM, and through Mongo by all cron processes. Only answers that parsed are
+# stored, so a malformed one is still asked again on retry.
+response_cache = ResultCache(
+    "llm",
+    COL_LLM_CACHE,
+    COL_CACHE_STATS,
+    maxsize=LM_CACHE_SIZE,
+    ttl_seconds=LM_CACHE_TTL_SEC,
+    max_entries=LM_CACHE_MAX_ENTRIES,
+)
+
+
+def response_cache_key(model_id: str | None, instructions: str, input_text: str, search: bool) -> str:
+    return make_cache_key("llm", model_id, instructions, input_text, search)
+
+
+def _cache_key(model_id: str | None, instructions: str, input_text: str, search: bool, use_cache: bool) -> str | None:
+    """Key of a cacheable call, or None when the cache is off or bypassed for this call."""
+    if not (use_cache and LM_CACHE_ENABLED):
+        return None
+    return response_cache_key(model_id, instructions, input_text, search)
+
+
+def _cache_get(key: str) -> dict | list | None:
+    cached = response_cache.get(db.get_database(DB_NAME), key)
+    if cached is not None:
+        print(f"[LLM] 💾 Cache hit ({key[:16]}...)")
+    return cached
+
+
+def _cache_put(key: str, value: dict | list) -> None:
+    response_cache.put(db.get_database(DB_NAME), key, value)
+
+
+def _parse_json(response_text: str) -> dict | list:
+    try:
+        return json.loads(response_text)
+    except (json.JSONDecodeError, TypeError) as e:
+        print(f"[LLM] ⚠️ Failed to parse JSON response:\n{response_text}")
+
+        raise e
+
+
+def _parse_fenced_json(response_text: str) -> dict | list:
+    json_match = re.search(r"```json\s+(.*?)\s+```", response_text, re.DOTALL)
+
+    if json_match:
+        json_string = json_match.group(1)
+        print(f"[LLM] 🙏 Found JSON string in response:\n{json_string}")
+
+        try:
+            return json.loads(json_string)
+        except (json.JSONDecodeError, TypeError) as e:
+            print(f"[LLM] ⚠️ Failed to parse JSON from response:\n{response_text}")
+
+            raise e
+    else:
+        print(f"[LLM] ⚠️ No JSON found in response:\n{response_text}")
+
+        raise LLMResponseFormatError("No JSON found in response")
+
+
+def _search_config(instructions: str) -> types.GenerateContentConfig:
+    return types.GenerateContentConfig(
+        system_instruction=instructions,
+        tools=[types.Tool(google_search=types.GoogleSearch())],
+    )
+
+
+def _log_candidates(response) -> None:
+    print(f"[LLM] 🎯 Candidates count: {len(response.candidates)}")
+    for i, candidate in enumerate(response.candidates):
+        print(f"[LLM] Candidate {i}: {candidate.grounding_metadata}")
 
 
 class LLM:
@@ -49,66 +162,186 @@ class LLM:
         return response.text
 
     def _ask_gemini_with_search(self, instructions: str, input_text: str) -> str:
-        grounding_tool = types.Tool(
-            google_search=types.GoogleSearch()
-        )
-
         response = self._gemini_client.models.generate_content(
             model=self._model_id,
-            config=types.GenerateContentConfig(
-                system_instruction=instructions,
-                tools=[grounding_tool],
-            ),
+            config=_search_config(instructions),
             contents=input_text,
         )
 
-        print(f"[LLM] 🎯 Candidates count: {len(response.candidates)}")
-        for i, candidate in enumerate(response.candidates):
-            print(f"[LLM] Candidate {i}: {candidate.grounding_metadata}")
+        _log_candidates(response)
 
         return response.text
 
     def ask(self, instructions: str, input_text: str) -> str:
-        if self._openai_client is not None:
-            return self._ask_openai_client(instructions, input_text)
+        try:
+            if self._openai_client is not None:
+                return self._ask_openai_client(instructions, input_text)
 
-        return self._ask_gemini(instructions, input_text)
+            return self._ask_gemini(instructions, input_text)
+        except Exception as e:
+            if _is_transient(e):
+                raise LLMTransientError(str(e)) from e
+            raise
 
-    def ask_json(self, instructions: str, input_text: str) -> dict | list:
-        response_text = self.ask(instructions, input_text)
+    def _cached(self, key: str | None, compute: Callable[[], dict | list]) -> dict | list:
+        cached = _cache_get(key) if key is not None else None
+        if cached is not None:
+            return cached
 
-        try:
-            return json.loads(response_text)
-        except (json.JSONDecodeError, TypeError) as e:
-            print(f"[LLM] ⚠️ Failed to parse JSON response:\n{response_text}")
+        value = compute()
+        if key is not None:
+            _cache_put(key, value)
+        return value
 
-            raise e
+    def ask_json(self, instructions: str, input_text: str, *, use_cache: bool = True) -> dict | list:
+        """Parsed JSON answer; repeated questions are answered from the cache unless ``use_cache`` is False."""
+        return self._cached(
+            _cache_key(self._model_id, instructions, input_text, False, use_cache),
+            lambda: _parse_json(self.ask(instructions, input_text)),
+        )
 
     def ask_with_search(self, instructions: str, input_text: str) -> str:
         if self._gemini_client is None:
             raise Exception("Gemini is required for search functionality")
 
-        return self._ask_gemini_with_search(instructions, input_text)
+        try:
+            return self._ask_gemini_with_search(instructions, input_text)
+        except Exception as e:
+            if _is_transient(e):
+                raise LLMTransientError(str(e)) from e
+            raise
 
-    def ask_json_with_search(self, instructions: str, input_text: str) -> dict | list:
+    def ask_json_with_search(self, instructions: str, input_text: str, *, use_cache: bool = True) -> dict | list:
         if self._gemini_client is None:
             raise Exception("Gemini is required for search functionality")
 
-        response_text = self.ask_with_search(instructions, input_text)
+        return self._cached(
+            _cache_key(self._model_id, instructions, input_text, True, use_cache),
+            lambda: _parse_fenced_json(self.ask_with_search(instructions, input_text)),
+        )
 
-        json_match = re.search(r"```json\s+(.*?)\s+```", response_text, re.DOTALL)
 
-        if json_match:
-            json_string = json_match.group(1)
-            print(f"[LLM] 🙏 Found JSON string in response:\n{json_string}")
+class AsyncLLM:
+    """
+    Async counterpart of ``LLM`` for handlers running on the worker's shared event loop (``task_async``).
 
-            try:
-                return json.loads(json_string)
-            except (json.JSONDecodeError, TypeError) as e:
-                print(f"[LLM] ⚠️ Failed to parse JSON from response:\n{response_text}")
+    One instance per process: all calls share one pooled HTTP client, at most ``max_concurrency`` of them
+    are in flight at a time (the rest wait for a slot), and each call is cancelled after ``timeout`` seconds.
+    Cancelling the awaiting task cancels the HTTP request too.
+    """
 
-                raise e
+    _openai_client: AsyncOpenAIClient | None = None
+    _gemini_client: GeminiClient | None = None
+    _http_client: httpx.AsyncClient | None = None
+
+    _model_id: str
+
+    def __init__(self, *, max_concurrency: int = LM_MAX_CONCURRENCY, timeout: float = LM_TIMEOUT_SEC):
+        self._model_id = LM_MODEL
+        self._timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+        if LM_USE_GEMINI:
+            self._gemini_client = GeminiClient(api_key=LM_API_KEY)
         else:
-            print(f"[LLM] ⚠️ No JSON found in response:\n{response_text}")
+            self._http_client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+                timeout=httpx.Timeout(timeout),
+            )
+            self._openai_client = AsyncOpenAIClient(
+                base_url=LM_API_BASE_URL,
+                api_key=LM_API_KEY,
+                http_client=self._http_client,
+            )
+
+    async def _call(self, request: Callable[[], Awaitable[T]], timeout: float | None) -> T:
+        timeout = self._timeout if timeout is None else timeout
+
+        async with self._semaphore:
+            try:
+                return await asyncio.wait_for(request(), timeout)
+            except asyncio.TimeoutError as e:
+                raise LLMTransientError(f"LLM call timed out after {timeout:g}s") from e
+            except Exception as e:
+                if _is_transient(e):
+                    raise LLMTransientError(str(e)) from e
+                raise
+
+    async def _ask_openai_client(self, instructions: str, input_text: str) -> str:
+        response = await self._openai_client.responses.create(
+            model=self._model_id,
+            instructions=instructions,
+            input=input_text,
+        )
+
+        return response.output_text
+
+    async def _ask_gemini(self, instructions: str, input_text: str) -> str:
+        response = await self._gemini_client.aio.models.generate_content(
+            model=self._model_id,
+            config=types.GenerateContentConfig(
+                system_instruction=instructions,
+            ),
+            contents=input_text,
+        )
+
+        return response.text
+
+    async def _ask_gemini_with_search(self, instructions: str, input_text: str) -> str:
+        response = await self._gemini_client.aio.models.generate_content(
+            model=self._model_id,
+            config=_search_config(instructions),
+            contents=input_text,
+        )
+
+        _log_candidates(response)
+
+        return response.text
+
+    async def ask(self, instructions: str, input_text: str, *, timeout: float | None = None) -> str:
+        if self._openai_client is not None:
+            return await self._call(lambda: self._ask_openai_client(instructions, input_text), timeout)
+
+        return await self._call(lambda: self._ask_gemini(instructions, input_text), timeout)
+
+    async def _cached(self, key: str | None, compute: Callable[[], Awaitable[dict | list]]) -> dict | list:
+        # The cache talks to Mongo synchronously, so it runs in a thread instead of blocking the loop
+        cached = await asyncio.to_thread(_cache_get, key) if key is not None else None
+        if cached is not None:
+            return cached
+
+        value = await compute()
+        if key is not None:
+            await asyncio.to_thread(_cache_put, key, value)
+        return value
+
+    async def ask_json(
+        self, instructions: str, input_text: str, *, timeout: float | None = None, use_cache: bool = True
+    ) -> dict | list:
+        async def compute():
+            return _parse_json(await self.ask(instructions, input_text, timeout=timeout))
+
+        return await self._cached(_cache_key(self._model_id, instructions, input_text, False, use_cache), compute)
+
+    async def ask_with_search(self, instructions: str, input_text: str, *, timeout: float | None = None) -> str:
+        if self._gemini_client is None:
+            raise Exception("Gemini is required for search functionality")
+
+        return await self._call(lambda: self._ask_gemini_with_search(instructions, input_text), timeout)
+
+    async def ask_json_with_search(
+        self, instructions: str, input_text: str, *, timeout: float | None = None, use_cache: bool = True
+    ) -> dict | list:
+        if self._gemini_client is None:
+            raise Exception("Gemini is required for search functionality")
+
+        async def compute():
+            return _parse_fenced_json(await self.ask_with_search(instructions, input_text, timeout=timeout))
+
+        return await self._cached(_cache_key(self._model_id, instructions, input_text, True, use_cache), compute)
 
-            raise Exception("No JSON found in response")
+    async def aclose(self) -> None:
+        if self._http_client is not None:
+            await self._http_client.aclose()
+        if self._gemini_client is not None:
+            await self._gemini_client.aio.aclose()
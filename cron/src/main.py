@@ -1,30 +1,108 @@
 import sys
 import time
+import asyncio
 import os
+import socket
+import signal
+import threading
 import traceback
-from datetime import datetime, timezone
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
 from typing import Any, Callable
 import importlib
 
+from bson import ObjectId
 from pymongo import ReturnDocument
 from pymongo.collection import Collection
 
 from common.python import db
-from llm import LLM
+from common.python.blob_store import collect_task_blobs
+from common.python.task_queue import CLAIM_SORT, TaskQueue
+from llm import LLM, AsyncLLM
+from async_runner import AsyncRunner
 from context import TaskContext
 from types_ import TaskPayload
-from config import DB_NAME, COL_CRON_TASKS
+from config import DB_NAME, COL_ANALYSIS_AI_TEXT, COL_CRON_TASKS, COL_DEAD_LETTER_TASKS, COL_TASK_FAIRNESS
 from sync_reports import sync_all_reports
+from scheduler import ResourceClass, ResourceScheduler, default_resource_classes
+from dispatcher import TaskDispatcher
+from retry import NO_RETRY, RetryPolicy
 
 TaskHandlerFunction = Callable[[TaskPayload, TaskContext], Any]
+# Optional batched handler: one result per payload, or the exception that failed that payload
+TaskBatchHandlerFunction = Callable[[list[TaskPayload], TaskContext], list[Any]]
 
 DB_NAME = os.getenv("MONGODB_DB", DB_NAME)
 TASKS_COLLECTION = COL_CRON_TASKS
+# "auto" = change stream on cron_tasks, falling back to polling when unavailable; "polling" = always poll
+DISPATCH_MODE = os.getenv("CRON_DISPATCH_MODE", "auto").lower()
+# Polling backs off exponentially from the min to the max interval while there's nothing to claim
+POLL_MIN_INTERVAL_SEC = float(os.getenv("CRON_POLL_MIN_INTERVAL_SEC", "0.1"))
 POLL_INTERVAL_SEC = float(os.getenv("CRON_POLL_INTERVAL_SEC", "2"))
+# With change streams, idle workers still re-check this often as a safety net
+IDLE_TIMEOUT_SEC = float(os.getenv("CRON_IDLE_TIMEOUT_SEC", "60"))
+STATUS_INTERVAL_SEC = float(os.getenv("CRON_STATUS_INTERVAL_SEC", "30"))
+# Micro-batching for handlers exposing `task_batch`: claim up to N tasks of the same name,
+# waiting at most this many milliseconds for more to arrive
+BATCH_MAX_TASKS = max(1, int(os.getenv("CRON_BATCH_MAX_TASKS", "8")))
+BATCH_WAIT_MS = max(0.0, float(os.getenv("CRON_BATCH_WAIT_MS", "50")))
+# How often blobs (GridFS task inputs) of finished tasks are garbage-collected
+BLOB_GC_INTERVAL_SEC = float(os.getenv("CRON_BLOB_GC_INTERVAL_SEC", "300"))
+# A claimed task is leased until `leaseUntil`; the worker's heartbeat extends it while the task runs.
+# Tasks whose lease expired (crashed or killed worker) are claimed again, up to TASK_MAX_ATTEMPTS times.
+LEASE_SEC = max(1.0, float(os.getenv("CRON_LEASE_SEC", "60")))
+HEARTBEAT_INTERVAL_SEC = float(os.getenv("CRON_HEARTBEAT_INTERVAL_SEC", str(LEASE_SEC / 3)))
+TASK_MAX_ATTEMPTS = max(1, int(os.getenv("CRON_TASK_MAX_ATTEMPTS", "3")))
+# Max tasks of one user in flight at the same time (0 = no limit), so one big upload can't take every slot;
+# a micro-batch counts once
+USER_MAX_IN_FLIGHT = max(0, int(os.getenv("CRON_USER_MAX_IN_FLIGHT", "2")))
+# Handlers that publish a partial analysis document (``progress.analysis_id``) while their task runs
+PARTIAL_ANALYSIS_COLLECTIONS = {"analyze": COL_ANALYSIS_AI_TEXT}
+
+# Handlers exposing `task_async` (LLM-bound jobs) run concurrently on one shared event loop instead of a thread each
+ASYNC_HANDLERS = os.getenv("CRON_ASYNC_HANDLERS", "true").lower() in ("1", "true", "yes")
+
+PROCESS_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+task_queue = TaskQueue(COL_CRON_TASKS, COL_TASK_FAIRNESS)
 
 handlers_cache = {}
+handlers_lock = threading.Lock()
+
+stop_event = threading.Event()
+
+scheduler = ResourceScheduler(default_resource_classes(async_io=ASYNC_HANDLERS))
+dispatcher: TaskDispatcher | None = None
+WORKER_COUNT = max(1, int(os.getenv("CRON_WORKERS", str(scheduler.total_concurrency))))
 
 llm = LLM()
+async_llm = AsyncLLM()
+async_runner = AsyncRunner()
+
+
+@dataclass
+class WorkerStatus:
+    worker_id: int
+    state: str = "starting"
+    task_name: str | None = None
+    task_id: Any = None
+    processed: int = 0
+    errors: int = 0
+
+    def line(self) -> str:
+        current = f"{self.task_name} (id={self.task_id})" if self.task_name else "-"
+        return (
+            f"[worker-{self.worker_id}] {self.state} | current={current} "
+            f"| processed={self.processed} | errors={self.errors}"
+        )
+
+
+worker_statuses: dict[int, WorkerStatus] = {}
+
+# Task ids currently leased by this process (with the worker that claimed them), kept alive by the heartbeat
+held_leases: dict[Any, str] = {}
+held_leases_lock = threading.Lock()
+heartbeat_stop_event = threading.Event()
 
 
 def utcnow() -> datetime:
@@ -35,99 +113,672 @@ def ensure_indexes(col: Collection) -> None:
     col.create_index([("createdAt", 1)])
     col.create_index([("status", 1)])
     col.create_index([("name", 1)], unique=False)
+    col.create_index([("status", 1), ("name", 1), ("createdAt", 1)])
+    col.create_index([("status", 1), ("leaseUntil", 1), ("createdAt", 1)])
+    # Claim order (see CLAIM_SORT): per handler name for the resource classes, and without it for the catch-all
+    col.create_index([("status", 1), ("name", 1), ("priority", -1), ("fairSeq", 1), ("createdAt", 1)])
+    col.create_index([("status", 1), ("priority", -1), ("fairSeq", 1), ("createdAt", 1)])
+    # Tasks submitted through the batch API: claimed together and counted for the batch status
+    col.create_index(
+        [("batchId", 1), ("status", 1)],
+        partialFilterExpression={"batchId": {"$exists": True}},
+    )
 
 
-def claim_due_task(col: Collection) -> dict[str, Any] | None:
+def worker_name(worker_id: int) -> str:
+    return f"{PROCESS_ID}/worker-{worker_id}"
+
+
+def lease_until(now: datetime) -> datetime:
+    return now + timedelta(seconds=LEASE_SEC)
+
+
+def saturated_users(col: Collection, now: datetime, claim_id: Any = None) -> list[Any]:
+    """
+    Users who already have USER_MAX_IN_FLIGHT tasks in flight; their other tasks wait so everyone else
+    gets a turn. Claims are counted rather than tasks, so a micro-batch (one ``claimId``) takes one slot,
+    while every async task a worker hands off to the event loop takes its own. Tasks of ``claim_id``
+    itself are left out, so a batch being topped up isn't blocked by its own slot.
+    """
+    if USER_MAX_IN_FLIGHT <= 0:
+        return []
+
+    pipeline = [
+        {"$match": {"status": "in_progress", "leaseUntil": {"$gte": now}, "userId": {"$ne": None},
+                    "claimId": {"$ne": claim_id}}},
+        # Tasks claimed before claim ids existed count one slot each
+        {"$group": {"_id": "$userId", "claims": {"$addToSet": {"$ifNull": ["$claimId", "$_id"]}}}},
+        {"$match": {f"claims.{USER_MAX_IN_FLIGHT - 1}": {"$exists": True}}},
+    ]
+    return [doc["_id"] for doc in col.aggregate(pipeline)]
+
+
+def claim_due_task(
+    col: Collection,
+    name_filter: dict[str, Any] | str | None = None,
+    worker: str | None = None,
+    batch_id: Any = None,
+    advance_clock: bool = True,
+    claim_id: Any = None,
+) -> dict[str, Any] | None:
+    """
+    Claims the next due task. With ``advance_clock`` off the caller advances the fair-share virtual
+    time itself once it keeps the task (see ``claim_batch``, which may give it back). ``claim_id``
+    adds the task to an existing claim (a micro-batch) instead of starting a new one.
+    """
     now = utcnow()
-
-    query = {"status": "scheduled"}
+    if claim_id is None:
+        claim_id = ObjectId()
+    scope = {"name": name_filter} if name_filter is not None else {}
+    if batch_id is not None:
+        scope["batchId"] = batch_id
 
     update = {
-        "$set": {"status": "in_progress", "startedAt": now},
+        "$set": {"status": "in_progress", "startedAt": now, "leaseUntil": lease_until(now), "workerId": worker,
+                 "claimId": claim_id},
+        "$inc": {"attempts": 1},
     }
 
-    return col.find_one_and_update(
+    # Tasks whose worker stopped renewing the lease (crashed or killed) while attempts are left
+    task = col.find_one_and_update(
+        {"status": "in_progress", "leaseUntil": {"$lt": now}, "attempts": {"$lt": TASK_MAX_ATTEMPTS}, **scope},
+        update,
+        sort=[("leaseUntil", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+    if task is not None:
+        return task
+
+    # Scheduled tasks (once a retry's backoff has passed) by priority, then round-robin across users
+    query: dict[str, Any] = {"status": "scheduled", "notBefore": {"$not": {"$gt": now}}, **scope}
+
+    saturated = saturated_users(col, now, claim_id)
+    if saturated:
+        query["userId"] = {"$nin": saturated}
+
+    task = col.find_one_and_update(
         query,
         update,
-        sort=[("createdAt", 1)],
+        sort=CLAIM_SORT,
         return_document=ReturnDocument.AFTER,
     )
 
+    if task is not None and advance_clock:
+        task_queue.advance_virtual_time(col.database, task)
+
+    return task
+
 
 def get_handler_module(name: str):
     global handlers_cache
 
-    if name in handlers_cache:
-        return handlers_cache[name]
-    else:
-        mod = importlib.import_module(f"jobs.{name}")
-        handlers_cache[name] = mod
-        return mod
+    with handlers_lock:
+        if name in handlers_cache:
+            return handlers_cache[name]
+        else:
+            mod = importlib.import_module(f"jobs.{name}")
+            handlers_cache[name] = mod
+            return mod
+
+
+def resolve_handler_module(name: str):
+    try:
+        return get_handler_module(name)
+    except ImportError:
+        print(traceback.format_exc(), file=sys.stderr)
+        return None
+
+
+def retry_policy(name: str) -> RetryPolicy:
+    handler_mod = resolve_handler_module(name)
+    return getattr(handler_mod, "RETRY_POLICY", NO_RETRY) if handler_mod else NO_RETRY
 
 
-def process_task(col: Collection, task: dict[str, Any], ctx: TaskContext) -> None:
+def owned_by_worker(task: dict[str, Any]) -> dict[str, Any]:
+    # Only the worker holding the lease may finish the task; if it expired and the task was
+    # claimed again, that worker's result wins
+    return {"_id": task["_id"], "status": "in_progress", "workerId": task.get("workerId")}
+
+
+def retry_task(col: Collection, task: dict[str, Any], started_at: datetime, error_info: str, delay: float) -> None:
+    result = col.update_one(owned_by_worker(task), {
+        "$set": {
+            "status": "scheduled",
+            "lastRunAt": started_at,
+            "lastError": error_info,
+            "notBefore": utcnow() + timedelta(seconds=delay),
+        },
+        "$unset": {"startedAt": "", "leaseUntil": "", "workerId": ""},
+    })
+
+    if result.matched_count and dispatcher is not None:
+        # Idle workers may be waiting for a change stream event that won't come when the backoff ends
+        timer = threading.Timer(delay, dispatcher.notify)
+        timer.daemon = True
+        timer.start()
+
+
+def dead_letter_task(col: Collection, task: dict[str, Any], reason: str, error_info: str | None) -> None:
+    """Keeps a copy of a task that failed for good, for admins to inspect and requeue."""
+    col.database[COL_DEAD_LETTER_TASKS].replace_one({"_id": task["_id"]}, {
+        "_id": task["_id"],
+        "name": task.get("name"),
+        "payload": task.get("payload"),
+        "userId": task.get("userId"),
+        "priority": task.get("priority"),
+        "attempts": task.get("attempts"),
+        "reason": reason,
+        "lastError": error_info,
+        "createdAt": task.get("createdAt"),
+        "failedAt": utcnow(),
+        # Kept so a requeued task still belongs to its batch
+        **{field: task[field] for field in ("batchId", "batchIndex", "batchItem") if field in task},
+    }, upsert=True)
+
+
+def finish_task(
+    col: Collection,
+    task: dict[str, Any],
+    started_at: datetime,
+    error_info: str | None,
+    handler_return_value: Any | None,
+    error: BaseException | None = None,
+) -> bool:
+    dead_letter_reason = None
+
+    if error_info:
+        policy = retry_policy(task.get("name"))
+        if policy.is_retryable(error):
+            attempt = task.get("attempts", 1)
+            if attempt < policy.max_attempts:
+                delay = policy.delay(attempt)
+                print(f"🔁 Retrying task '{task.get('name')}' (id={task.get('_id')}) in {delay:.1f}s "
+                      f"(attempt {attempt}/{policy.max_attempts} failed)")
+                retry_task(col, task, started_at, error_info, delay)
+                return False
+            dead_letter_reason = f"Retries exhausted after {attempt} attempts"
+
+    update = {
+        "$set": {
+            "lastRunAt": started_at,
+            "completedAt": utcnow(),
+            "status": "error" if error_info else "success",
+        },
+    }
+
+    if error_info:
+        update["$set"]["lastError"] = error_info
+
+    if handler_return_value:
+        update["$set"]["return_value"] = handler_return_value
+
+    result = col.update_one(owned_by_worker(task), update)
+
+    if result.matched_count == 0:
+        print(f"⚠️  Lease on task '{task.get('name')}' (id={task.get('_id')}) was lost, result discarded",
+              file=sys.stderr)
+    elif dead_letter_reason:
+        dead_letter_task(col, task, dead_letter_reason, error_info)
+
+    return error_info is None
+
+
+def hold_leases(tasks: list[dict[str, Any]], worker: str) -> None:
+    with held_leases_lock:
+        for task in tasks:
+            held_leases[task["_id"]] = worker
+
+
+def drop_leases(tasks: list[dict[str, Any]]) -> None:
+    with held_leases_lock:
+        for task in tasks:
+            held_leases.pop(task["_id"], None)
+
+
+def async_handler(name: str):
+    if not ASYNC_HANDLERS:
+        return None
+    handler_mod = resolve_handler_module(name)
+    return getattr(handler_mod, "task_async", None) if handler_mod else None
+
+
+def process_task(col: Collection, task: dict[str, Any], ctx: TaskContext) -> bool:
     name = task.get("name")
     payload = task.get("payload")
     now = utcnow()
 
-    try:
-        handler_mod = get_handler_module(name)
-    except ImportError:
-        print(traceback.format_exc(), file=sys.stderr)
-        handler_mod = None
+    handler_mod = resolve_handler_module(name)
 
     handler_fn: TaskHandlerFunction | None = handler_mod.task if handler_mod else None
     error_info: str | None = None
+    error: Exception | None = None
     handler_return_value: Any | None = None
 
     if handler_fn is None:
         error_info = f"No handler for task '{name}'"
     else:
+        ctx.task_id = task.get("_id")
+        ctx.tasks = col
         try:
             handler_return_value = handler_fn(payload, ctx)
-        except Exception:
+        except Exception as e:
+            error = e
             error_info = traceback.format_exc()
             print(f"❌ Error processing task '{name}':\n{error_info}", file=sys.stderr)
+        finally:
+            ctx.task_id = None
 
-    update = {
-        "$set": {
-            "lastRunAt": now,
-            "completedAt": now,
-            "status": "error" if error_info else "success",
-        },
-    }
+    return finish_task(col, task, now, error_info, handler_return_value, error)
 
-    if error_info:
-        update["$set"]["lastError"] = error_info
 
-    if handler_return_value:
-        update["$set"]["return_value"] = handler_return_value
+def process_task_batch(col: Collection, tasks: list[dict[str, Any]], ctx: TaskContext) -> list[bool]:
+    if len(tasks) == 1:
+        return [process_task(col, tasks[0], ctx)]
 
-    col.update_one({"_id": task["_id"]}, update)
+    name = tasks[0].get("name")
+    now = utcnow()
+    batch_fn: TaskBatchHandlerFunction = get_handler_module(name).task_batch
+
+    try:
+        results = batch_fn([task.get("payload") for task in tasks], ctx)
+        if len(results) != len(tasks):
+            raise RuntimeError(f"task_batch for '{name}' returned {len(results)} results for {len(tasks)} tasks")
+    except Exception as e:
+        error_info = traceback.format_exc()
+        print(f"❌ Error processing batch of {len(tasks)} '{name}' tasks:\n{error_info}", file=sys.stderr)
+        return [finish_task(col, task, now, error_info, None, e) for task in tasks]
+
+    outcomes = []
+    for task, result in zip(tasks, results):
+        if isinstance(result, Exception):
+            error_info = "".join(traceback.format_exception(type(result), result, result.__traceback__))
+            print(f"❌ Error processing task '{name}' (id={task.get('_id')}):\n{error_info}", file=sys.stderr)
+            outcomes.append(finish_task(col, task, now, error_info, None, result))
+        else:
+            outcomes.append(finish_task(col, task, now, None, result))
 
+    return outcomes
 
-def loop(col: Collection) -> None:
-    processed_any = False
 
+async def process_task_async(col: Collection, task: dict[str, Any], ctx: TaskContext) -> bool:
+    name = task.get("name")
+    now = utcnow()
+    error_info: str | None = None
+    error: Exception | None = None
+    handler_return_value: Any | None = None
+
+    try:
+        handler_return_value = await async_handler(name)(task.get("payload"), ctx)
+    except Exception as e:
+        error = e
+        error_info = traceback.format_exc()
+        print(f"❌ Error processing task '{name}':\n{error_info}", file=sys.stderr)
+
+    # Blocking Mongo calls go to a thread, so they don't hold up the other coroutines on the loop
+    return await asyncio.to_thread(finish_task, col, task, now, error_info, handler_return_value, error)
+
+
+def start_async_task(
+    col: Collection,
+    task: dict[str, Any],
+    resource_class: ResourceClass,
+    worker: str,
+    status: WorkerStatus,
+) -> None:
+    """
+    Hands a task with an async handler over to the shared event loop and returns right away. The lease
+    and the resource class slot are held until the coroutine finishes, so the class's concurrency limit
+    still caps how many such tasks run at once.
+    """
     ctx = TaskContext()
     ctx.db = db.get_client()
     ctx.llm = llm
+    ctx.async_llm = async_llm
+    ctx.task_id = task.get("_id")
+    ctx.tasks = col
+
+    prefix = f"[worker-{status.worker_id}]"
+    started = time.monotonic()
+    hold_leases([task], worker)
+
+    def on_done(future) -> None:
+        drop_leases([task])
+        elapsed = time.monotonic() - started
+        scheduler.release(resource_class, elapsed=elapsed)
+        # A slot is free again; wake idle workers that found the class full
+        if dispatcher is not None:
+            dispatcher.notify()
+
+        if future.cancelled():
+            # Still leased in the database, so it's claimed again once the lease expires
+            print(f"{prefix} 🛑 Cancelled task: {task.get('name')} (id={task.get('_id')})", file=sys.stderr)
+            return
+
+        succeeded = future.exception() is None and future.result()
+        if future.exception() is not None:
+            print(f"{prefix} ❌ Failed to finish task '{task.get('name')}' (id={task.get('_id')}): "
+                  f"{future.exception()!r}", file=sys.stderr)
+
+        status.processed += 1
+        status.errors += 0 if succeeded else 1
+        print(f"{prefix} {'✅' if succeeded else '❌'} Finished task: {task.get('name')} "
+              f"(id={task.get('_id')}) in {elapsed:.2f}s")
+
+    try:
+        future = async_runner.submit(process_task_async(col, task, ctx))
+    except Exception:
+        drop_leases([task])
+        scheduler.release(resource_class, found_work=False)
+        raise
+
+    future.add_done_callback(on_done)
+    print(f"{prefix} ⚡ Started async task: {task.get('name')} (id={task.get('_id')}, class={resource_class.name}, "
+          f"in flight={async_runner.in_flight})")
+
+
+def claim_batch(col: Collection, first: dict[str, Any]) -> list[dict[str, Any]]:
+    """Tops up an already claimed task with more pending tasks of the same name, if its handler batches."""
+    name = first.get("name")
+    handler_mod = resolve_handler_module(name)
+    if BATCH_MAX_TASKS <= 1 or handler_mod is None or not hasattr(handler_mod, "task_batch"):
+        return [first]
+
+    # Handlers may keep some tasks out of batches (e.g. long documents that stream partial results)
+    is_batchable = getattr(handler_mod, "is_batchable", None)
+    if is_batchable is not None and not is_batchable(first.get("payload")):
+        return [first]
+
+    batch = [first]
+    deadline = time.monotonic() + BATCH_WAIT_MS / 1000
+    # Tasks submitted together through the batch API are taken first, then anything else pending
+    batch_id = first.get("batchId")
+
+    while len(batch) < BATCH_MAX_TASKS:
+        task = None
+        try:
+            if batch_id is not None:
+                task = claim_due_task(col, name, first.get("workerId"), batch_id=batch_id, advance_clock=False,
+                                      claim_id=first.get("claimId"))
+                if task is None:
+                    batch_id = None
+            if task is None:
+                task = claim_due_task(col, name, first.get("workerId"), advance_clock=False,
+                                      claim_id=first.get("claimId"))
+        except Exception:
+            # Topping up is optional, the tasks claimed so far still run
+            print(f"[batch] ❌ Failed to claim more {name} tasks:\n{traceback.format_exc()}", file=sys.stderr)
+            break
+        if task and is_batchable is not None and not is_batchable(task.get("payload")):
+            # Give it back, so another worker can pick it up on its own
+            col.update_one(
+                {"_id": task["_id"], "workerId": task.get("workerId")},
+                {"$set": {"status": "scheduled"},
+                 "$unset": {"startedAt": "", "leaseUntil": "", "workerId": "", "claimId": ""},
+                 "$inc": {"attempts": -1}},
+            )
+            break
+        if task:
+            task_queue.advance_virtual_time(col.database, task)
+            batch.append(task)
+            continue
 
-    while True:
-        task = claim_due_task(col)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or stop_event.is_set():
+            break
+        stop_event.wait(min(remaining, 0.01))
+
+    return batch
+
+
+def claim_next_task(col: Collection, worker: str) -> tuple[dict[str, Any] | None, ResourceClass | None]:
+    known_names = scheduler.known_task_names
+
+    for cls in scheduler.candidates():
+        if not scheduler.acquire(cls):
+            continue
+
+        try:
+            task = claim_due_task(col, cls.name_filter(known_names), worker)
+        except Exception:
+            scheduler.release(cls, found_work=False)
+            raise
+
+        if task:
+            scheduler.claimed(cls)
+            return task, cls
+
+        scheduler.release(cls, found_work=False)
+
+    return None, None
+
+
+def worker_loop(worker_id: int, col: Collection) -> None:
+    status = worker_statuses[worker_id]
+    prefix = f"[worker-{worker_id}]"
+    worker = worker_name(worker_id)
+
+    ctx = TaskContext()
+    ctx.db = db.get_client()
+    ctx.llm = llm
+    ctx.async_llm = async_llm
+
+    idle_rounds = 0
+
+    while not stop_event.is_set():
+        generation = dispatcher.generation()
+        try:
+            task, resource_class = claim_next_task(col, worker)
+        except Exception:
+            print(f"{prefix} ❌ Failed to claim task:\n{traceback.format_exc()}", file=sys.stderr)
+            task, resource_class = None, None
 
         if not task:
+            if status.state != "idle":
+                print(f"{prefix} ⏳ Waiting for tasks...")
+            status.state = "idle"
+            status.task_name = None
+            status.task_id = None
+            dispatcher.wait(generation, idle_rounds)
+            idle_rounds += 1
+            continue
+
+        idle_rounds = 0
+
+        if async_handler(task.get("name")) is not None:
+            try:
+                start_async_task(col, task, resource_class, worker, status)
+            except Exception:
+                print(f"{prefix} ❌ Failed to start async task:\n{traceback.format_exc()}", file=sys.stderr)
+            continue
+
+        status.state = f"busy[{resource_class.name}]"
+        status.task_name = task.get("name")
+        status.task_id = task.get("_id")
+
+        started = time.monotonic()
+        batch = [task]
+        outcomes = None
+        try:
+            batch = claim_batch(col, task)
+            hold_leases(batch, worker)
+            if len(batch) > 1:
+                print(f"{prefix} ⚙️  Processing batch of {len(batch)} tasks: {task.get('name')} "
+                      f"(class={resource_class.name})")
+            else:
+                print(f"{prefix} ⚙️  Processing task: {task.get('name')} "
+                      f"(id={task.get('_id')}, class={resource_class.name})")
+            outcomes = process_task_batch(col, batch, ctx)
+        except Exception:
+            # Keeps the thread alive; the tasks keep their lease until it expires and are then claimed again
+            print(f"{prefix} ❌ Failed to process {len(batch)} {task.get('name')} task(s), "
+                  f"leaving them to lease recovery:\n{traceback.format_exc()}", file=sys.stderr)
+        finally:
+            drop_leases(batch)
+            elapsed = time.monotonic() - started
+            scheduler.release(resource_class, elapsed=elapsed)
+
+        if outcomes is None:
+            status.errors += len(batch)
+            continue
+
+        status.processed += len(outcomes)
+        status.errors += outcomes.count(False)
+        for finished, succeeded in zip(batch, outcomes):
+            print(f"{prefix} {'✅' if succeeded else '❌'} Finished task: {finished.get('name')} "
+                  f"(id={finished.get('_id')}) in {elapsed:.2f}s")
+
+    status.state = "stopped"
+    status.task_name = None
+    status.task_id = None
+    print(f"{prefix} 🛑 Stopped.")
+
+
+def heartbeat_loop(col: Collection) -> None:
+    """
+    Extends the leases of the tasks this process is working on, so long model or LLM runs keep them.
+    Keeps going after a shutdown request until the in-flight tasks are done.
+    """
+    while not heartbeat_stop_event.wait(HEARTBEAT_INTERVAL_SEC):
+        leases: dict[str, list[Any]] = {}
+        with held_leases_lock:
+            for task_id, worker in held_leases.items():
+                leases.setdefault(worker, []).append(task_id)
+
+        for worker, task_ids in leases.items():
+            try:
+                col.update_many(
+                    {"_id": {"$in": task_ids}, "status": "in_progress", "workerId": worker},
+                    {"$set": {"leaseUntil": lease_until(utcnow())}},
+                )
+            except Exception:
+                print(f"[heartbeat] ❌ Failed to extend leases of {worker}:\n{traceback.format_exc()}", file=sys.stderr)
+
+
+def drop_partial_analysis(col: Collection, task: dict[str, Any]) -> None:
+    """Removes the unfinished analysis document of a task that won't run again."""
+    collection_name = PARTIAL_ANALYSIS_COLLECTIONS.get(task.get("name"))
+    analysis_id = (task.get("progress") or {}).get("analysis_id")
+    if collection_name is not None and analysis_id is not None:
+        col.database[collection_name].delete_one({"_id": analysis_id, "partial": True})
+
+
+def fail_exhausted_tasks(col: Collection) -> int:
+    """
+    Marks tasks whose lease expired on their last allowed attempt as failed and dead-letters them,
+    instead of retrying them forever.
+    """
+    now = utcnow()
+    expired = {"status": "in_progress", "leaseUntil": {"$lt": now}, "attempts": {"$gte": TASK_MAX_ATTEMPTS}}
+    error_info = f"Worker lease expired on attempt {TASK_MAX_ATTEMPTS} of {TASK_MAX_ATTEMPTS}"
+    failed = 0
+
+    for task in col.find(expired):
+        result = col.update_one(
+            {"_id": task["_id"], **expired},
+            {"$set": {"status": "error", "completedAt": now, "lastError": error_info}},
+        )
+        if result.modified_count:
+            dead_letter_task(col, task, "Lease expired on the last attempt", error_info)
+            drop_partial_analysis(col, task)
+            failed += 1
+
+    return failed
+
+
+def maintenance_loop(col: Collection) -> None:
+    next_blob_gc = time.monotonic() + BLOB_GC_INTERVAL_SEC
+
+    while not stop_event.wait(min(LEASE_SEC, BLOB_GC_INTERVAL_SEC)):
+        try:
+            failed = fail_exhausted_tasks(col)
+            if failed:
+                print(f"[maintenance] ❌ Failed {failed} task(s) that ran out of attempts after lost leases")
+        except Exception:
+            print(f"[maintenance] ❌ Lease check failed:\n{traceback.format_exc()}", file=sys.stderr)
+
+        if time.monotonic() < next_blob_gc:
+            continue
+        next_blob_gc = time.monotonic() + BLOB_GC_INTERVAL_SEC
+
+        try:
+            deleted = collect_task_blobs(col.database, col.name, retained_collection_name=COL_DEAD_LETTER_TASKS)
+            if deleted:
+                print(f"[maintenance] 🧹 Removed {deleted} blob(s) of finished tasks")
+        except Exception:
+            print(f"[maintenance] ❌ Blob cleanup failed:\n{traceback.format_exc()}", file=sys.stderr)
+
+
+def request_shutdown(signum, _frame) -> None:
+    if not stop_event.is_set():
+        print(f"🛑 Received signal {signum}, finishing in-flight tasks before shutdown...")
+    stop_event.set()
+
+
+def run_workers(col: Collection, count: int) -> None:
+    global dispatcher
+
+    dispatcher = TaskDispatcher(
+        col,
+        stop_event,
+        mode=DISPATCH_MODE,
+        min_poll_interval=POLL_MIN_INTERVAL_SEC,
+        max_poll_interval=POLL_INTERVAL_SEC,
+        idle_timeout=IDLE_TIMEOUT_SEC,
+    )
+    dispatcher.start()
+    async_runner.start()
+
+    threads: list[threading.Thread] = []
+
+    for worker_id in range(1, count + 1):
+        worker_statuses[worker_id] = WorkerStatus(worker_id=worker_id)
+        thread = threading.Thread(target=worker_loop, args=(worker_id, col), name=f"worker-{worker_id}")
+        thread.start()
+        threads.append(thread)
+
+    maintenance = threading.Thread(target=maintenance_loop, args=(col,), name="maintenance")
+    maintenance.start()
+    threads.append(maintenance)
+
+    heartbeat = threading.Thread(target=heartbeat_loop, args=(col,), name="heartbeat")
+    heartbeat.start()
+
+    print(f"🚀 Started {count} worker(s). Resource classes: {scheduler.status_line()}")
+
+    while any(thread.is_alive() for thread in threads):
+        if stop_event.wait(STATUS_INTERVAL_SEC):
             break
+        for status in worker_statuses.values():
+            print(status.line())
+        print(f"[scheduler] {scheduler.status_line()} | async in flight={async_runner.in_flight}")
+        print(f"[dispatcher] mode={dispatcher.mode}")
 
-        processed_any = True
-        print(f"⚙️  Processing task: {task.get('name')} (id={task.get('_id')})")
-        process_task(col, task, ctx)
+    # Idle workers sleep on the dispatcher, not on stop_event, so wake them up to notice the shutdown
+    stop_event.set()
+    dispatcher.stop()
 
-    if not processed_any:
-        print("⏳ Waiting for tasks...")
+    for thread in threads:
+        thread.join()
+
+    # Async tasks still running on the shared loop are finished too, like the workers' own tasks
+    if async_runner.in_flight:
+        print(f"🛑 Waiting for {async_runner.in_flight} async task(s)...")
+    async_runner.drain()
+    async_runner.run(async_llm.aclose())
+    async_runner.stop()
+
+    heartbeat_stop_event.set()
+    heartbeat.join()
+
+    for status in worker_statuses.values():
+        print(status.line())
 
 
 if __name__ == "__main__":
+    signal.signal(signal.SIGTERM, request_shutdown)
+    signal.signal(signal.SIGINT, request_shutdown)
+
     db.init_standalone()
 
     try:
@@ -142,6 +793,4 @@ if __name__ == "__main__":
     tasks = database[TASKS_COLLECTION]
     ensure_indexes(tasks)
 
-    while True:
-        loop(tasks)
-        time.sleep(POLL_INTERVAL_SEC)
+    run_workers(tasks, WORKER_COUNT)
@@ -0,0 +1,29 @@
+import random
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    How a handler's failed tasks are retried, exposed by a job module as ``RETRY_POLICY``.
+
+    ``max_attempts`` counts the first run too. Only exceptions of the ``retryable`` types are retried,
+    after ``backoff_base_sec * 2 ** (attempt - 1)`` seconds (capped, with jitter) - anything else is a
+    bug or bad input that would fail the same way again.
+    """
+
+    max_attempts: int = 1
+    backoff_base_sec: float = 5.0
+    backoff_max_sec: float = 600.0
+    retryable: tuple[type[BaseException], ...] = ()
+
+    def is_retryable(self, error: BaseException | None) -> bool:
+        return error is not None and isinstance(error, self.retryable)
+
+    def delay(self, attempt: int) -> float:
+        delay = min(self.backoff_max_sec, self.backoff_base_sec * 2 ** max(attempt - 1, 0))
+        # Jitter, so tasks that failed together (e.g. on a rate limit) don't all come back at once
+        return delay / 2 + random.uniform(0, delay / 2)
+
+
+NO_RETRY = RetryPolicy()
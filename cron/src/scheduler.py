@@ -0,0 +1,123 @@
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Any
+
+
+@dataclass
+class ResourceClass:
+    name: str
+    task_names: tuple[str, ...]
+    concurrency: int
+    weight: float
+    # Handlers of this class run as coroutines on the shared event loop (``task_async``), so a slot
+    # doesn't tie up a worker thread for the whole task
+    runs_async: bool = False
+    in_flight: int = 0
+    # Weighted service time received so far (seconds / weight), used for fair ordering
+    served: float = 0.0
+    idle: bool = True
+
+    def name_filter(self, known_names: tuple[str, ...]) -> dict[str, Any]:
+        if self.task_names:
+            return {"$in": list(self.task_names)}
+        # Catch-all class for handlers not assigned anywhere else
+        return {"$nin": list(known_names)}
+
+
+def _env_int(name: str, default: int) -> int:
+    return max(1, int(os.getenv(name, str(default))))
+
+
+def _env_float(name: str, default: float) -> float:
+    return max(0.01, float(os.getenv(name, str(default))))
+
+
+def default_resource_classes(*, async_io: bool = True) -> list[ResourceClass]:
+    return [
+        ResourceClass(
+            name="cpu_model",
+            task_names=("analyze", "analyze_image"),
+            concurrency=_env_int("CRON_CPU_MODEL_CONCURRENCY", 1),
+            weight=_env_float("CRON_CPU_MODEL_WEIGHT", 1.0),
+        ),
+        ResourceClass(
+            name="llm_io",
+            task_names=("analyze_manipulation", "find_sources"),
+            concurrency=_env_int("CRON_LLM_IO_CONCURRENCY", 16 if async_io else 4),
+            weight=_env_float("CRON_LLM_IO_WEIGHT", 1.0),
+            runs_async=async_io,
+        ),
+        ResourceClass(
+            name="default",
+            task_names=(),
+            concurrency=_env_int("CRON_DEFAULT_CONCURRENCY", 1),
+            weight=_env_float("CRON_DEFAULT_WEIGHT", 1.0),
+        ),
+    ]
+
+
+@dataclass
+class ResourceScheduler:
+    """
+    Decides which resource class a free worker should claim from next.
+
+    Each class has its own concurrency limit. Among classes with a free slot, the one that has
+    received the least weighted service time goes first (weighted fair queuing), so a busy class
+    can't starve the others.
+    """
+    classes: list[ResourceClass]
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def known_task_names(self) -> tuple[str, ...]:
+        return tuple(name for cls in self.classes for name in cls.task_names)
+
+    @property
+    def total_concurrency(self) -> int:
+        """Worker threads needed to fill every slot; async classes only need one to claim their tasks."""
+        return sum(1 if cls.runs_async else cls.concurrency for cls in self.classes)
+
+    def class_for(self, task_name: str | None) -> ResourceClass:
+        for cls in self.classes:
+            if task_name in cls.task_names:
+                return cls
+        return next(cls for cls in self.classes if not cls.task_names)
+
+    def candidates(self) -> list[ResourceClass]:
+        with self._lock:
+            eligible = [cls for cls in self.classes if cls.in_flight < cls.concurrency]
+            return sorted(eligible, key=lambda cls: cls.served)
+
+    def acquire(self, cls: ResourceClass) -> bool:
+        with self._lock:
+            if cls.in_flight >= cls.concurrency:
+                return False
+            cls.in_flight += 1
+            return True
+
+    def claimed(self, cls: ResourceClass) -> None:
+        with self._lock:
+            if cls.idle:
+                # A class returning from idle starts at the current fair-share level instead of
+                # cashing in the service it "saved" while it had nothing to do
+                busy = [other.served for other in self.classes if not other.idle and other is not cls]
+                if busy:
+                    cls.served = max(cls.served, min(busy))
+                cls.idle = False
+
+    def release(self, cls: ResourceClass, *, elapsed: float = 0.0, found_work: bool = True) -> None:
+        with self._lock:
+            cls.in_flight = max(0, cls.in_flight - 1)
+
+            if found_work:
+                cls.served += elapsed / cls.weight
+            elif cls.in_flight == 0:
+                cls.idle = True
+
+    def status_line(self) -> str:
+        with self._lock:
+            return " | ".join(
+                f"{cls.name}: {cls.in_flight}/{cls.concurrency} served={cls.served:.1f}"
+                for cls in self.classes
+            )
@@ -0,0 +1,22 @@
+import os
+
+import pytest
+
+# main.py creates its LLM clients on import; no test talks to them
+os.environ.setdefault("LM_API_KEY", "test")
+
+
+@pytest.fixture
+def database():
+    """Fresh in-memory Mongo database (mongomock) per test."""
+    mongomock = pytest.importorskip("mongomock")
+    return mongomock.MongoClient()["factify_test"]
+
+
+@pytest.fixture
+def tasks(database):
+    import main
+
+    col = database[main.TASKS_COLLECTION]
+    main.ensure_indexes(col)
+    return col
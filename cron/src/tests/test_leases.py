@@ -0,0 +1,81 @@
+from datetime import timedelta
+
+import main
+from config import COL_ANALYSIS_AI_TEXT, COL_DEAD_LETTER_TASKS
+
+
+def schedule(tasks, name="analyze", **fields):
+    return tasks.insert_one({
+        "name": name,
+        "payload": {},
+        "status": "scheduled",
+        "createdAt": main.utcnow(),
+        **fields,
+    }).inserted_id
+
+
+def expire_lease(tasks, task_id):
+    tasks.update_one({"_id": task_id}, {"$set": {"leaseUntil": main.utcnow() - timedelta(seconds=1)}})
+
+
+class TestLeases:
+    def test_claim_takes_a_lease(self, tasks):
+        task_id = schedule(tasks)
+
+        task = main.claim_due_task(tasks, "analyze", "worker-a")
+
+        assert task["_id"] == task_id
+        assert task["status"] == "in_progress"
+        assert task["workerId"] == "worker-a"
+        assert task["attempts"] == 1
+        assert task["leaseUntil"] > task["startedAt"]
+
+    def test_live_lease_is_not_reclaimed(self, tasks):
+        schedule(tasks)
+        main.claim_due_task(tasks, "analyze", "worker-a")
+
+        assert main.claim_due_task(tasks, "analyze", "worker-b") is None
+
+    def test_expired_lease_is_reclaimed(self, tasks):
+        task_id = schedule(tasks)
+        main.claim_due_task(tasks, "analyze", "worker-a")
+        expire_lease(tasks, task_id)
+
+        task = main.claim_due_task(tasks, "analyze", "worker-b")
+
+        assert task["_id"] == task_id
+        assert task["workerId"] == "worker-b"
+        assert task["attempts"] == 2
+
+    def test_stale_worker_cannot_finish(self, tasks):
+        task_id = schedule(tasks)
+        stale = main.claim_due_task(tasks, "analyze", "worker-a")
+        expire_lease(tasks, task_id)
+        current = main.claim_due_task(tasks, "analyze", "worker-b")
+
+        main.finish_task(tasks, stale, main.utcnow(), None, "from-a")
+        assert tasks.find_one({"_id": task_id})["status"] == "in_progress"
+
+        main.finish_task(tasks, current, main.utcnow(), None, "from-b")
+        finished = tasks.find_one({"_id": task_id})
+        assert finished["status"] == "success"
+        assert finished["return_value"] == "from-b"
+
+    def test_last_attempt_is_dead_lettered(self, tasks):
+        database = tasks.database
+        analysis_id = database[COL_ANALYSIS_AI_TEXT].insert_one({"segments": [], "partial": True}).inserted_id
+        task_id = schedule(
+            tasks,
+            status="in_progress",
+            attempts=main.TASK_MAX_ATTEMPTS,
+            leaseUntil=main.utcnow() - timedelta(seconds=1),
+            progress={"analysis_id": analysis_id, "percent": 40.0},
+        )
+
+        assert main.claim_due_task(tasks, "analyze", "worker-b") is None
+        assert main.fail_exhausted_tasks(tasks) == 1
+
+        assert tasks.find_one({"_id": task_id})["status"] == "error"
+        assert database[COL_DEAD_LETTER_TASKS].find_one({"_id": task_id})["reason"] == "Lease expired on the last attempt"
+        # The unfinished analysis of the dead task doesn't stay behind
+        assert database[COL_ANALYSIS_AI_TEXT].find_one({"_id": analysis_id}) is None
@@ -0,0 +1,51 @@
+import importlib
+
+import pytest
+
+from llm import LLMResponseFormatError, _parse_fenced_json
+from retry import NO_RETRY, RetryPolicy
+
+
+class TestRetryPolicy:
+    @pytest.mark.parametrize("attempt, base", [(1, 2.0), (2, 4.0), (3, 8.0), (4, 16.0)])
+    def test_delay_doubles_with_jitter(self, attempt, base):
+        policy = RetryPolicy(max_attempts=5, backoff_base_sec=2.0)
+        for _ in range(50):
+            assert base / 2 <= policy.delay(attempt) <= base
+
+    def test_delay_is_capped(self):
+        policy = RetryPolicy(max_attempts=20, backoff_base_sec=2.0, backoff_max_sec=10.0)
+        for _ in range(50):
+            assert 5.0 <= policy.delay(15) <= 10.0
+
+    def test_delay_before_first_attempt(self):
+        policy = RetryPolicy(backoff_base_sec=2.0)
+        for _ in range(50):
+            assert 1.0 <= policy.delay(0) <= 2.0
+
+    def test_retryable_types(self):
+        policy = RetryPolicy(max_attempts=3, retryable=(ConnectionError, TimeoutError))
+        assert policy.is_retryable(ConnectionError())
+        assert policy.is_retryable(ConnectionResetError())
+        assert policy.is_retryable(TimeoutError())
+        assert not policy.is_retryable(ValueError())
+        assert not policy.is_retryable(None)
+
+    def test_no_retry(self):
+        assert NO_RETRY.max_attempts == 1
+        assert not NO_RETRY.is_retryable(ConnectionError())
+
+
+class TestLLMAnswerRetries:
+    @pytest.mark.parametrize("handler", ["find_sources", "analyze_manipulation"])
+    def test_cut_off_answer_is_retryable(self, handler):
+        policy = importlib.import_module(f"jobs.{handler}.main").RETRY_POLICY
+
+        # Output cut off mid-answer: the closing fence never arrives
+        with pytest.raises(LLMResponseFormatError) as error:
+            _parse_fenced_json('Here are the sources:\n```json\n{"sources": [{"url": "https://exa')
+
+        assert policy.is_retryable(error.value)
+
+    def test_fenced_answer_parses(self):
+        assert _parse_fenced_json('```json\n{"sources": []}\n```') == {"sources": []}
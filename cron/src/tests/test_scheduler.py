@@ -0,0 +1,83 @@
+from scheduler import ResourceClass, ResourceScheduler
+
+
+def make_scheduler(cpu_weight: float = 1.0, io_weight: float = 1.0) -> ResourceScheduler:
+    return ResourceScheduler([
+        ResourceClass(name="cpu", task_names=("analyze",), concurrency=1, weight=cpu_weight),
+        ResourceClass(name="io", task_names=("find_sources",), concurrency=2, weight=io_weight),
+        ResourceClass(name="default", task_names=(), concurrency=1, weight=1.0),
+    ])
+
+
+def run(scheduler: ResourceScheduler, cls: ResourceClass, elapsed: float) -> None:
+    assert scheduler.acquire(cls)
+    scheduler.claimed(cls)
+    scheduler.release(cls, elapsed=elapsed)
+
+
+class TestResourceScheduler:
+    def test_acquire_respects_concurrency(self):
+        scheduler = make_scheduler()
+        cpu = scheduler.class_for("analyze")
+
+        assert scheduler.acquire(cpu)
+        assert not scheduler.acquire(cpu)
+        assert cpu not in scheduler.candidates()
+
+        scheduler.release(cpu, elapsed=1.0)
+        assert cpu in scheduler.candidates()
+        assert scheduler.acquire(cpu)
+
+    def test_least_served_class_goes_first(self):
+        scheduler = make_scheduler()
+        cpu, io = scheduler.class_for("analyze"), scheduler.class_for("find_sources")
+        scheduler.claimed(io)
+
+        run(scheduler, cpu, elapsed=5.0)
+        assert scheduler.candidates()[0] is not cpu
+
+        run(scheduler, io, elapsed=6.0)
+        assert [cls.name for cls in scheduler.candidates()][:2] == ["default", "cpu"]
+
+    def test_weight_scales_service(self):
+        scheduler = make_scheduler(cpu_weight=2.0)
+        cpu, io = scheduler.class_for("analyze"), scheduler.class_for("find_sources")
+        scheduler.claimed(cpu)
+        scheduler.claimed(io)
+
+        run(scheduler, cpu, elapsed=4.0)
+        run(scheduler, io, elapsed=4.0)
+        assert cpu.served == 2.0
+        assert io.served == 4.0
+
+    def test_idle_class_rejoins_at_fair_share(self):
+        scheduler = make_scheduler()
+        cpu, io = scheduler.class_for("analyze"), scheduler.class_for("find_sources")
+        run(scheduler, cpu, elapsed=30.0)
+
+        # io had nothing to do so far; once it gets work it starts level with the busy class
+        # instead of getting 30 seconds of catch-up
+        run(scheduler, io, elapsed=1.0)
+        assert io.served == 31.0
+
+    def test_release_without_work_marks_idle(self):
+        scheduler = make_scheduler()
+        io = scheduler.class_for("find_sources")
+        run(scheduler, io, elapsed=1.0)
+        assert not io.idle
+
+        assert scheduler.acquire(io)
+        assert scheduler.acquire(io)
+        scheduler.release(io, found_work=False)
+        assert not io.idle
+        scheduler.release(io, found_work=False)
+        assert io.idle
+        assert io.served == 1.0
+
+    def test_unknown_tasks_use_catch_all(self):
+        scheduler = make_scheduler()
+        default = scheduler.class_for("sync_reports")
+
+        assert default.name == "default"
+        assert default.name_filter(scheduler.known_task_names) == {"$nin": ["analyze", "find_sources"]}
+        assert scheduler.class_for("analyze").name_filter(scheduler.known_task_names) == {"$in": ["analyze"]}
@@ -0,0 +1,142 @@
+from types import SimpleNamespace
+
+import pytest
+
+import main
+from common.python.task_queue import PRIORITY_BULK, PRIORITY_INTERACTIVE, VIRTUAL_TIME_ID
+from config import COL_TASK_FAIRNESS
+
+queue = main.task_queue
+
+
+def virtual_time(database):
+    clock = database[COL_TASK_FAIRNESS].find_one({"_id": VIRTUAL_TIME_ID})
+    return clock["seq"] if clock else 0
+
+
+def claim_users(tasks, count):
+    users = []
+    for _ in range(count):
+        task = main.claim_due_task(tasks, None, "worker-a")
+        users.append(task["userId"])
+        tasks.update_one({"_id": task["_id"]}, {"$set": {"status": "success"}})
+    return users
+
+
+class TestNextFairSeq:
+    def test_numbers_each_user_separately(self, database):
+        assert [queue.next_fair_seq(database, "alice") for _ in range(3)] == [1, 2, 3]
+        assert queue.next_fair_seq(database, "bob") == 1
+        assert queue.next_fair_seq(database, None) == 1
+
+    def test_reserves_consecutive_numbers(self, database):
+        assert queue.next_fair_seq(database, "alice", count=5) == 1
+        assert queue.next_fair_seq(database, "alice") == 6
+
+    def test_idle_user_starts_at_virtual_time(self, database):
+        queue.next_fair_seq(database, "alice")
+        queue.advance_virtual_time(database, {"fairSeq": 10})
+
+        assert queue.next_fair_seq(database, "alice") == 11
+        assert queue.next_fair_seq(database, "bob") == 11
+
+    def test_virtual_time_never_goes_back(self, database):
+        queue.advance_virtual_time(database, {"fairSeq": 10})
+        queue.advance_virtual_time(database, {"fairSeq": 4})
+        queue.advance_virtual_time(database, {})
+
+        assert virtual_time(database) == 10
+
+
+class TestFairClaiming:
+    def test_users_take_turns(self, tasks):
+        database = tasks.database
+        queue.schedule_many(database, "analyze", [{"i": i} for i in range(20)], user_id="alice",
+                            priority=PRIORITY_INTERACTIVE)
+        queue.schedule(database, "analyze", {}, user_id="bob")
+
+        assert "bob" in claim_users(tasks, 2)
+
+    def test_priority_goes_first(self, tasks):
+        database = tasks.database
+        queue.schedule(database, "analyze", {}, user_id="alice", priority=PRIORITY_BULK)
+        queue.schedule(database, "analyze", {}, user_id="bob")
+
+        assert claim_users(tasks, 2) == ["bob", "alice"]
+
+
+@pytest.fixture
+def batching_handler(monkeypatch):
+    """Fake ``analyze`` handler that batches everything except payloads marked ``long``."""
+    handler = SimpleNamespace(
+        task=lambda payload, ctx: None,
+        task_batch=lambda payloads, ctx: [None] * len(payloads),
+        is_batchable=lambda payload: not (payload or {}).get("long"),
+    )
+    monkeypatch.setitem(main.handlers_cache, "analyze", handler)
+    return handler
+
+
+class TestClaimBatch:
+    def test_tops_up_batch(self, tasks, batching_handler):
+        database = tasks.database
+        queue.schedule_many(database, "analyze", [{"i": i} for i in range(3)], user_id="alice")
+
+        first = main.claim_due_task(tasks, "analyze", "worker-a")
+        batch = main.claim_batch(tasks, first)
+
+        assert [task["payload"]["i"] for task in batch] == [0, 1, 2]
+        assert virtual_time(database) == 3
+
+    def test_gives_back_unbatchable_task(self, tasks, batching_handler):
+        database = tasks.database
+        queue.schedule(database, "analyze", {"i": 0}, user_id="alice")
+        long_id = queue.schedule(database, "analyze", {"long": True}, user_id="alice")
+
+        first = main.claim_due_task(tasks, "analyze", "worker-a")
+        batch = main.claim_batch(tasks, first)
+
+        assert [task["_id"] for task in batch] == [first["_id"]]
+        returned = tasks.find_one({"_id": long_id})
+        assert returned["status"] == "scheduled"
+        assert returned["attempts"] == 0
+        assert "workerId" not in returned and "leaseUntil" not in returned
+        # The fair-share clock only follows tasks the worker kept
+        assert virtual_time(database) == first["fairSeq"]
+
+        assert main.claim_due_task(tasks, "analyze", "worker-b")["_id"] == long_id
+
+
+class TestUserInFlightCap:
+    @pytest.fixture(autouse=True)
+    def cap(self, monkeypatch):
+        monkeypatch.setattr(main, "USER_MAX_IN_FLIGHT", 2)
+
+    def test_async_tasks_on_one_worker_respect_cap(self, tasks):
+        database = tasks.database
+        queue.schedule_many(database, "find_sources", [{"i": i} for i in range(5)], user_id="alice",
+                            priority=PRIORITY_INTERACTIVE)
+        queue.schedule(database, "find_sources", {}, user_id="bob", priority=PRIORITY_BULK)
+
+        # The worker hands every async task off and claims again straight away, without finishing any
+        claimed = []
+        while (task := main.claim_due_task(tasks, "find_sources", "worker-a")) is not None:
+            claimed.append(task["userId"])
+
+        assert claimed.count("alice") == 2
+        assert "bob" in claimed
+
+    def test_micro_batch_takes_one_slot(self, tasks, batching_handler):
+        database = tasks.database
+        queue.schedule(database, "analyze", {"i": 0}, user_id="alice")
+        main.claim_due_task(tasks, "analyze", "worker-a")
+        queue.schedule_many(database, "analyze", [{"i": i} for i in range(1, 4)], user_id="alice")
+
+        first = main.claim_due_task(tasks, "analyze", "worker-b")
+        batch = main.claim_batch(tasks, first)
+
+        assert [task["payload"]["i"] for task in batch] == [1, 2, 3]
+        assert len({task["claimId"] for task in batch}) == 1
+
+        queue.schedule(database, "analyze", {"i": 4}, user_id="alice")
+        assert main.claim_due_task(tasks, "analyze", "worker-c") is None